@@ -4,18 +4,24 @@ try:
     import ujson as json
     import utime as time
     from micropython import const
-    from utime import sleep_ms
+    from utime import sleep_ms, ticks_add, ticks_diff, ticks_ms, ticks_us
+
+    # Debug log events are not even built on the board, guard debug call sites with `if LOG_DEBUG:`
+    LOG_DEBUG = const(0)
 
     class DummyLogger:
         def __init__(self):
             pass
 
         def __getattr__(self, name):
-            return self.dummy()
+            return self.dummy
 
         def dummy(self, *args, **kwargs):
             return None
 
+        def isEnabledFor(self, level):
+            return False
+
     DUMMY_LOGGER = DummyLogger()
     MAIN_LOGGER = DUMMY_LOGGER
 
@@ -30,10 +36,21 @@ try:
         gc.collect()
         return gc.mem_alloc(), gc.mem_free()
 
+    def mem_alloc():
+        """Bytes allocated on the heap, without collection, so deltas show allocations in between"""
+        return gc.mem_alloc()
+
+    # MicroPython ports may use 2000-01-01 epoch
+    _EPOCH_OFFSET = 946684800 if time.gmtime(0)[0] == 2000 else 0
+
+    def unix_time():
+        return time.time() + _EPOCH_OFFSET
+
 except ImportError:
     import json  # type: ignore # noqa: F401
     import logging
     import time
+    import tracemalloc
 
     import psutil
 
@@ -41,9 +58,26 @@ except ImportError:
         """const() replacement for non-micropython environment"""
         return val
 
+    LOG_DEBUG = True  # logging module checks the level
+
     def sleep_ms(val):
         return time.sleep(val / 1000.0)
 
+    def ticks_ms():
+        return time.monotonic_ns() // 1_000_000
+
+    def ticks_us():
+        return time.perf_counter_ns() // 1_000
+
+    def ticks_add(ticks, delta):
+        return ticks + delta
+
+    def ticks_diff(ticks1, ticks2):
+        return ticks1 - ticks2
+
+    def unix_time():
+        return time.time()
+
     def getLogger(name):
         return logging.getLogger(name)
 
@@ -53,3 +87,9 @@ except ImportError:
     def mem_stats():
         mem_info = psutil.virtual_memory()  # mem_info.total, mem_info.available,
         return mem_info.used, mem_info.free
+
+    def mem_alloc():
+        """Bytes allocated by Python, tracing starts on the first call"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        return tracemalloc.get_traced_memory()[0]
@@ -1,3 +1,12 @@
+from ph4_sense.support.batch import (
+    batch_iter,
+    batch_wrap,
+    get_numpy,
+    is_missing,
+    is_ndarray,
+)
+
+
 def compute_median(arr, ln=None):
     arr.sort()
     length = ln if ln is not None else len(arr)
@@ -13,6 +22,30 @@ def compute_median(arr, ln=None):
     return median
 
 
+def bisect_left(arr, x):
+    """Index where to insert x into sorted arr, left of any existing entries equal to x (no bisect module on MP)"""
+    lo, hi = 0, len(arr)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if arr[mid] < x:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def bisect_right(arr, x):
+    """Index where to insert x into sorted arr, right of any existing entries equal to x"""
+    lo, hi = 0, len(arr)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if x < arr[mid]:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
 class Deque:
     def __init__(self, iterable, maxlen: int):
         self._deque = [None] * maxlen
@@ -61,40 +94,126 @@ class ExpAverage:
             self.average = self.alpha * value + (1 - self.alpha) * self.average
         return self.average
 
+    def update_many(self, values):
+        """
+        Batch update, returns the filtered series, identical to sequential update() calls.
+        Accepts list, array or numpy array, returns the same container type.
+        Missing samples (None, NaN) are skipped, the current average is returned for them.
+        The recursion is inherently sequential, so it runs as a tight loop over Python floats.
+        """
+        alpha = self.alpha
+        beta = 1 - self.alpha
+        average = self.average
+        res = []
+        for value in batch_iter(values):
+            if is_missing(value):
+                pass
+            elif average is None:
+                average = value
+            else:
+                average = alpha * value + beta * average
+            res.append(average)
+
+        self.average = average
+        return batch_wrap(values, res)
+
+    def get_state(self):
+        return {"average": self.average}
+
+    def set_state(self, state):
+        self.average = state["average"]
+
     @property
     def cur(self):
         return self.average
 
 
 class FloatingMedian:
+    """
+    Sliding-window median.
+    Window is kept in sorted order, each sample costs one bisect insert and one bisect delete,
+    so the median is read directly from the middle of the sorted window.
+    """
+
     def __init__(self, window_size=5):
         self.window_size = window_size
         self.data = Deque((), window_size)  # deque((), window_size)
-        self.buffer = [0] * window_size
+        self.sorted = []
         self._median = None
 
     def add(self, value):
         if value is None:
             return
         self._median = None
+        if len(self.data) >= self.window_size:
+            self.sorted.pop(bisect_left(self.sorted, self.data.popleft()))
         self.data.append(value)
+        self.sorted.insert(bisect_right(self.sorted, value), value)
 
     def update(self, value):
         self.add(value)
         return self.median()
 
+    def update_many(self, values):
+        """
+        Batch update, returns the series of medians, identical to sequential update() calls.
+        Accepts list, array or numpy array, returns the same container type.
+        Missing samples (None, NaN) are skipped, the current median is returned for them.
+        With numpy input, full windows are evaluated at once on a sliding window view.
+        """
+        if is_ndarray(values):
+            return self._update_many_np(get_numpy(), values)
+
+        res = []
+        for value in batch_iter(values):
+            res.append(self.update(None if is_missing(value) else value))
+        return batch_wrap(values, res)
+
+    def _update_many_np(self, np, values, chunk: int = 1 << 16):
+        values = np.asarray(values, dtype=float)
+        valid = ~np.isnan(values)
+        samples = values[valid]
+        prev_median = self.median()
+        medians = np.empty(len(samples))
+
+        # Fill the window sequentially, then evaluate each full window
+        head = min(len(samples), self.window_size - len(self.data))
+        for ix, value in enumerate(samples[:head].tolist()):
+            medians[ix] = self.update(value)
+
+        if head < len(samples):
+            series = np.concatenate((np.array(list(self.data), dtype=float), samples[head:]))
+            windows = np.lib.stride_tricks.sliding_window_view(series, self.window_size)
+            # The first window is the current one, its median was already returned
+            for offset in range(1, len(windows), chunk):
+                block = windows[offset : offset + chunk]
+                medians[head + offset - 1 : head + offset - 1 + len(block)] = np.median(block, axis=1)
+            self.set_state({"window": series[-self.window_size :].tolist()})
+
+        # Map medians back to input positions, missing samples repeat the last median
+        idx = np.cumsum(valid) - 1
+        res = np.full(len(values), np.nan if prev_median is None else float(prev_median))
+        has = idx >= 0
+        res[has] = medians[idx[has]]
+        return res
+
+    def get_state(self):
+        return {"window": list(self.data)}
+
+    def set_state(self, state):
+        window = state["window"][-self.window_size :]
+        self.data = Deque(window, self.window_size)
+        self.sorted = sorted(window)
+        self._median = None
+
     def median(self):
-        ldata = len(self.data)
+        ldata = len(self.sorted)
         if self._median is None and ldata > 0:
-            # As deque on micropython is not iterable, we just repull elements. Custom deque implementation would be better
-            # for ix in range(ldata):
-            #    self.buffer[ix] = self.data.popleft()
-            # for ix in range(ldata):
-            #    self.data.append(self.buffer[ix])
-            for ix, x in enumerate(self.data):
-                self.buffer[ix] = x
-
-            self._median = compute_median(self.buffer, ldata)
+            mid = ldata // 2
+            if ldata % 2 == 0:
+                self._median = (self.sorted[mid] + self.sorted[mid - 1]) / 2
+            else:
+                self._median = self.sorted[mid]
 
         return self._median
 
@@ -114,6 +233,21 @@ class SensorFilter:
             return self.exp_average.update(r)
         return None
 
+    def update_many(self, values):
+        """
+        Batch update, returns the filtered series, identical to sequential update() calls.
+        Accepts list, array or numpy array, returns the same container type.
+        Use get_state() / set_state() to process long series chunk by chunk.
+        """
+        return self.exp_average.update_many(self.floating_median.update_many(values))
+
+    def get_state(self):
+        return {"median": self.floating_median.get_state(), "average": self.exp_average.get_state()}
+
+    def set_state(self, state):
+        self.floating_median.set_state(state["median"])
+        self.exp_average.set_state(state["average"])
+
     @property
     def cur(self):
         return self.exp_average.cur
@@ -1,5 +1,17 @@
+from ph4_sense.adapters import const
+
+# Levels compiled in, disabled levels are removed by the MicroPython compiler, call sites pay only the call.
+# Set to 1 and rebuild to get debug events on the board.
+_LOG_DEBUG = const(0)
+_LOG_INFO = const(1)
+
+
 class MpLogger:
     """
+    Minimal logging.Logger replacement, log events are formatted lazily by log_fnc(level, msg, *args),
+    only when the level is enabled, so pass arguments instead of pre-formatted messages:
+    logger.error("SGP30 err: %s", e)
+
     Levels:
 
     CRITICAL = 50
@@ -12,26 +24,47 @@ class MpLogger:
     NOTSET = 0
     """
 
-    def __init__(self, log_fnc):
+    def __init__(self, log_fnc, level: int = 20):
         self.log_fnc = log_fnc
+        self.level = level
+
+    def setLevel(self, level: int):
+        self.level = level
+
+    def isEnabledFor(self, level: int) -> bool:
+        if level < 20 and not _LOG_DEBUG:
+            return False
+        if level < 30 and not _LOG_INFO:
+            return False
+        return level >= self.level
+
+    def log(self, level: int, msg, *args, **kwargs):
+        if self.isEnabledFor(level):
+            self.log_fnc(level, msg, *args, **kwargs)
 
     def critical(self, msg, *args, **kwargs):
-        self.log_fnc(50, msg, *args, **kwargs)
+        if self.level <= 50:
+            self.log_fnc(50, msg, *args, **kwargs)
 
     def error(self, msg, *args, **kwargs):
-        self.log_fnc(40, msg, *args, **kwargs)
+        if self.level <= 40:
+            self.log_fnc(40, msg, *args, **kwargs)
 
     def exception(self, msg, *args, exc_info=True, **kwargs):
-        self.log_fnc(40, msg, *args, **kwargs)
+        if self.level <= 40:
+            self.log_fnc(40, msg, *args, **kwargs)
 
     def warning(self, msg, *args, **kwargs):
-        self.log_fnc(30, msg, *args, **kwargs)
+        if self.level <= 30:
+            self.log_fnc(30, msg, *args, **kwargs)
 
     def warn(self, msg, *args, **kwargs):
-        self.log_fnc(30, msg, *args, **kwargs)
+        self.warning(msg, *args, **kwargs)
 
     def info(self, msg, *args, **kwargs):
-        self.log_fnc(20, msg, *args, **kwargs)
+        if _LOG_INFO and self.level <= 20:
+            self.log_fnc(20, msg, *args, **kwargs)
 
     def debug(self, msg, *args, **kwargs):
-        self.log_fnc(10, msg, *args, **kwargs)
+        if _LOG_DEBUG and self.level <= 10:
+            self.log_fnc(10, msg, *args, **kwargs)
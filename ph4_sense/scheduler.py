@@ -0,0 +1,147 @@
+from ph4_sense.adapters import ticks_add, ticks_diff, ticks_ms
+
+try:
+    from typing import Callable, List, Optional
+except ImportError:
+    pass
+
+
+class ScheduledTask:
+    def __init__(self, name: str, period_ms: int, fnc: Callable, next_due: int, start: Optional[Callable] = None):
+        self.name = name
+        self.period_ms = period_ms
+        self.fnc = fnc
+        self.start = start
+        self.next_due = next_due
+        self.event = False  # runs when signaled (e.g., data-ready interrupt), period_ms is a fallback timeout
+        self.signaled = False
+        self.stage = None  # StageStats timing fnc, when instrumented
+        self.start_stage = None
+
+    def run(self):
+        if self.stage is None:
+            return self.fnc()
+        return self.stage.call(self.fnc)
+
+    def run_start(self):
+        if self.start_stage is None:
+            return self.start()
+        return self.start_stage.call(self.start)
+
+
+class Scheduler:
+    """
+    Deadline-based task scheduler.
+    Each task has its own period and next-due time, only due tasks are executed.
+    Caller sleeps until the earliest deadline, see time_to_next_ms().
+
+    Tasks run in the order they were added, so dependent measurements
+    (e.g., temperature used for compensation) should be added first.
+
+    Tasks may have a split-phase start callback. Start callbacks of all due tasks are called first
+    (e.g., sensor measurement triggers), then task functions collect the results, so sensor conversion
+    times overlap instead of adding up.
+
+    Event tasks run when signaled, e.g., from a data-ready GPIO interrupt, instead of periodically.
+    Their period serves as a fallback timeout in case an interrupt is missed.
+
+    With set_perf(), task functions and start callbacks are timed as stages named after the task.
+    """
+
+    def __init__(self):
+        self.tasks: List[ScheduledTask] = []
+        self.perf = None
+
+    def set_perf(self, perf):
+        self.perf = perf
+        for task in self.tasks:
+            self.instrument(task)
+
+    def instrument(self, task: ScheduledTask):
+        if self.perf is None:
+            task.stage = task.start_stage = None
+            return
+        task.stage = self.perf.stage(task.name)
+        task.start_stage = self.perf.stage(task.name + "_start") if task.start is not None else None
+
+    def add(
+        self, name: str, period_ms: int, fnc: Callable, start: Optional[Callable] = None, delay_ms: int = 0
+    ) -> ScheduledTask:
+        task = ScheduledTask(name, max(1, int(period_ms)), fnc, ticks_add(ticks_ms(), delay_ms), start)
+        self.tasks.append(task)
+        self.instrument(task)
+        return task
+
+    def remove(self, name: str) -> Optional[ScheduledTask]:
+        task = self.get(name)
+        if task is not None:
+            self.tasks.remove(task)
+        return task
+
+    def get(self, name: str) -> Optional[ScheduledTask]:
+        for task in self.tasks:
+            if task.name == name:
+                return task
+        return None
+
+    def is_due(self, task: ScheduledTask, now: int) -> bool:
+        return task.signaled or ticks_diff(task.next_due, now) <= 0
+
+    def set_event(self, task: ScheduledTask, timeout_ms: int):
+        """Switches task to event mode, it runs when signaled or after timeout_ms without a signal"""
+        task.event = True
+        task.period_ms = max(1, int(timeout_ms))
+
+    def signal(self, task: ScheduledTask):
+        """Marks task as due, safe to call from micropython.schedule() callbacks"""
+        task.signaled = True
+
+    def has_signaled(self) -> bool:
+        for task in self.tasks:
+            if task.signaled:
+                return True
+        return False
+
+    def reschedule(self, task: ScheduledTask, now: int):
+        if task.event:
+            task.signaled = False
+            task.next_due = ticks_add(now, task.period_ms)
+            return
+
+        # Keep the cadence anchored to the previous deadline to avoid drift.
+        # If we fell behind by more than one period, re-anchor to now instead of bursting.
+        task.next_due = ticks_add(task.next_due, task.period_ms)
+        if ticks_diff(task.next_due, now) <= 0:
+            task.next_due = ticks_add(now, task.period_ms)
+
+    def run_due(self, now: Optional[int] = None) -> int:
+        """Runs all due tasks, returns number of executed tasks"""
+        now = ticks_ms() if now is None else now
+        for task in self.tasks:
+            if task.start is not None and self.is_due(task, now):
+                task.run_start()
+
+        executed = 0
+        for task in self.tasks:
+            if not self.is_due(task, now):
+                continue
+
+            self.reschedule(task, now)
+            task.run()
+            executed += 1
+        return executed
+
+    def time_to_next_ms(self, now: Optional[int] = None) -> int:
+        """Milliseconds until the earliest deadline, 0 if some task is already due"""
+        if not self.tasks:
+            return 0
+
+        now = ticks_ms() if now is None else now
+        res = None
+        for task in self.tasks:
+            if task.signaled:
+                return 0
+            diff = ticks_diff(task.next_due, now)
+            if res is None or diff < res:
+                res = diff
+        return max(0, res)
@@ -1,17 +1,68 @@
-from ph4_sense.adapters import getLogger, json, mem_stats, sleep_ms, time
-from ph4_sense.filters import ExpAverage, SensorFilter
-from ph4_sense.sensors.common import ccs811_err_to_str
+from ph4_sense.adapters import (
+    LOG_DEBUG,
+    getLogger,
+    json,
+    mem_alloc,
+    mem_stats,
+    sleep_ms,
+    ticks_add,
+    ticks_diff,
+    ticks_ms,
+    time,
+    unix_time,
+)
+from ph4_sense.scheduler import Scheduler
 from ph4_sense.support.sensor_helper import SensorHelper
-from ph4_sense.udplogger import UdpLogger
+from ph4_sense.support.split_measurement import SplitMeasurement
 from ph4_sense.utils import dval, try_fnc
 
 try:
-    from typing import List
+    from typing import List, Optional
 except ImportError:
     pass
 
 
 class Sensei:
+    PUBLISH_TOPICS = "topics"  # each sensor reading published to its own topic
+    PUBLISH_COMBINED = "combined"  # all readings combined to a single message per cycle
+    PUBLISH_PACKED = "packed"  # as combined, packed binary format, see telemetry.py
+
+    # Offline queue record kinds, high nibble is the telemetry version of packed records
+    RECORD_JSON = 0  # topic length byte, topic, JSON message, payloads without a telemetry layout
+    RECORD_READING = 1  # telemetry block of a single sensor reading, published to its own topic
+    RECORD_READINGS = 2  # telemetry blocks of a combined message
+
+    # UDP logger levels of print() and print_error() lines, see udplogger.LEVELS
+    LEVEL_INFO = 20
+    LEVEL_ERROR = 40
+
+    # Sensor log line templates, formatted in place each report cycle
+    LOG_SGP30 = "CO2eq: {:4.1f} (r={:4.1f}) ppm, TVOC: {:4d} ppb"
+    LOG_SGP41 = "SGP41: {:4d} (r={:5d}), NOX: {:4d} (r={:5d})"
+    LOG_CCS811 = "CCS CO2: {:4d} ({:4.1f}), TVOC2: {:3d} ({:3.1f})"
+    LOG_SGP30_RAW = "Eth: {:5d}, H2: {:5d}"
+    LOG_TEMP = "{:4.2f} C, {:4.2f} %%"
+    LOG_SCD40 = "SCD40: {:4.2f}, {:4.2f} C, {:4.2f} %% "
+    LOG_SPS30 = "SPS30: {}"
+    LOG_ALLOC = "Alloc: {} B/cycle (max {}, avg {})"
+
+    # Sensors with a data-ready interrupt output, see enable_sensor_irq()
+    IRQ_SENSORS = ("ccs811",)
+
+    # Modules imported on demand by connect_*() and the optional features, see get_startup_modules().
+    # Boards import only what is configured, the freeze tool builds the frozen module manifest from it.
+    SENSOR_MODULES = {
+        "sgp30": ("ph4_sense.filters", "ph4_sense.sensors.sgp30"),
+        "sgp41": ("ph4_sense.sensirion", "ph4_sense.sensors.sgp41"),
+        "aht": ("ph4_sense.sensors.athx0",),
+        "hdc1080": ("ph4_sense.sensors.hdc1080",),
+        "ccs811": ("ph4_sense.filters", "ph4_sense.sensors.ccs811"),
+        "scd4x": ("ph4_sense.sensors.scd4x",),
+        "sps30": ("ph4_sense.sensors.sps30",),
+        "sps30_uart": ("ph4_sense.sensors.sps30_uart",),
+        "zh03b": ("ph4_sense.sensors.zh03b_uart_base",),
+    }
+
     def __init__(
         self,
         is_esp32=True,
@@ -52,6 +103,11 @@ class Sensei:
         self.mqtt_sensor_suffix = None
         self.mqtt_topic_sub = None
         self.mqtt_topic = None
+        self.publish_mode = self.PUBLISH_TOPICS
+        self.publish_batch = {}
+        self.topic_cache = {}
+        self.payloads = {}
+        self.telemetry_encoder = None
         self.set_sensor_id("bed")
 
         self.sgp30_co2eq = 0
@@ -62,11 +118,10 @@ class Sensei:
         self.humd = 0
         self.ccs_co2 = 0
         self.ccs_tvoc = 0
-        self.eavg = ExpAverage(0.1)
-        self.eavg_css811_co2 = SensorFilter(median_window=9, alpha=0.2)
-        self.eavg_sgp30_co2 = SensorFilter(median_window=5, alpha=0.2)
-        self.eavg_css811_tvoc = SensorFilter(median_window=9, alpha=0.2)
-        self.eavg_sgp30_tvoc = SensorFilter(median_window=5, alpha=0.2)
+        self.eavg_css811_co2 = None  # filters are created by connect_*() of configured sensors
+        self.eavg_sgp30_co2 = None
+        self.eavg_css811_tvoc = None
+        self.eavg_sgp30_tvoc = None
         self.sgp41_filter_voc = None
         self.sgp41_filter_nox = None
         self.sgp41_sraw_voc = None
@@ -92,6 +147,82 @@ class Sensei:
         self.wifi_reconnect_timeout = 60 * 3
         self.readings_publish_timeout = 60
 
+        # Per-sensor measurement periods in ms, sensors not listed use measure_loop_ms.
+        # SCD4x produces new data every 5 s, Sensirion gas index expects 1 Hz SGP41 sampling.
+        self.sensor_intervals = {
+            "scd4x": 5_000,
+            "sgp41": 1_000,
+        }
+        self.scheduler = None
+        self.use_async = False
+        self.async_mode = False
+        self.io_executor = None  # serial IO worker of the async runtime, CPython only
+        self.mqtt_outbox = None  # messages for the non-blocking MQTT client, async runtime without IO worker
+        self.mqtt_outbox_size = 16
+        self.mqtt_outbox_dropped = 0
+        self.log_queue = None
+        self.log_queue_size = 32
+        self.log_level = 20  # driver log events below are skipped before formatting
+
+        # Per-stage latency instrumentation, published to sensors/esp32_<id>_perf every perf_period seconds.
+        # Period 0 disables it.
+        self.perf = None
+        self.perf_period = 0
+        self.perf_window = 64  # samples per stage for min / avg / p95 / max
+        self.perf_alloc = False  # also tracks bytes allocated per stage
+
+        # Boot-to-first-publish time and free heap after boot are reported in the boot message and logs.
+        # Startup profile additionally measures on-demand imports and boot milestones, see StartupProfile.
+        self.boot_ticks = ticks_ms()
+        self.first_publish_ms = None
+        self.startup_profile = None
+
+        # Data-ready interrupts, sensor name -> GPIO pin, e.g., {"ccs811": 4} for CCS811 nINT.
+        # Sensors with an interrupt are read only when signaled, or after irq_timeout_ms without a signal.
+        self.irq_pins = {}
+        self.irq_timeout_ms = 30_000
+        self.irq_poll_ms = 20
+        self.irq_active = False
+        self.light_sleep = False
+
+        # Duty-cycled mode for battery nodes: wake, warm up, sample, publish, deep sleep.
+        # Filter state is kept in RTC memory across sleeps. Period 0 disables the mode.
+        self.duty_period = 0  # seconds between wake-ups
+        self.duty_warmup = 30  # seconds of sensor warm-up before sampling
+        self.duty_samples = 3  # measurement loops after warm-up, readings published afterwards
+        self.duty_woke_up = False
+
+        # Learned sensor state persisted across reboots
+        self.state_file = "state.json"
+        self.state_store = None
+        self.state_checkpoint_timeout = 60 * 60
+        self.sgp41_state_max_age = 60 * 60 * 3
+        # SGP30 baseline is valid for 7 days, without a restored baseline it takes 12 h to learn a new one
+        self.sgp30_baseline_max_age = 60 * 60 * 24 * 7
+        self.sgp30_baseline_learning_time = 60 * 60 * 12
+        self.sgp30_baseline_age = None
+        # Learning time is accumulated from monotonic ticks, the wall clock jumps when NTP syncs it
+        self.sgp30_learned_ms = 0
+        self.sgp30_learn_ticks = 0
+
+        # Store-and-forward queue for readings that could not be published (MQTT / WiFi down)
+        self.offline_queue = None
+        self.offline_queue_size = 0  # bytes, 0 disables the queue
+        self.offline_spill_file = None
+        self.offline_spill_max_size = 256 * 1024
+        self.backfill_period_ms = 2_000
+        self.backfill_batch = 8
+        self.mqtt_online = False
+        self.live_messages = {}  # topic -> last live message published while the backlog drains
+
+        # Debug mode, reports heap bytes allocated per measurement cycle
+        self.alloc_debug = False
+        self.alloc_last = 0
+        self.alloc_max = 0
+        self.alloc_total = 0
+        self.alloc_cycles = 0
+        self.log_parts = []
+
         self.last_tsync = 0
         self.last_pub = time.time() + 30
         self.last_pub_sgp = time.time() + 30
@@ -118,6 +249,8 @@ class Sensei:
         self.mqtt_sensor_suffix = f"_{self.mqtt_sensor_id}" if self.mqtt_sensor_id else ""
         self.mqtt_topic_sub = f"sensors/esp32_{self.mqtt_sensor_id}_sub"
         self.mqtt_topic = f"sensors/esp32_{self.mqtt_sensor_id}_gas"
+        self.mqtt_topic_perf = f"sensors/esp32_{self.mqtt_sensor_id}_perf"
+        self.topic_cache = {}
 
     def get_sensor_helper(self) -> SensorHelper:
         if not self.sensor_helper:
@@ -141,7 +274,12 @@ class Sensei:
             self.has_mqtt = True
 
         if "udpLogger" in js:
-            self.udp_logger = UdpLogger(js["udpLogger"], is_esp32=self.is_esp32)
+            # "host:port" or {"host": "host:port", "level": "info", "buffer": 2048}, see UdpLogger
+            from ph4_sense.udplogger import UdpLogger
+
+            self.udp_logger = UdpLogger.from_config(js["udpLogger"], is_esp32=self.is_esp32)
+            if isinstance(js["udpLogger"], dict) and "level" in js["udpLogger"]:
+                self.log_level = self.udp_logger.level
 
         if "sensorId" in js:
             self.set_sensor_id(js["sensorId"])
@@ -150,10 +288,68 @@ class Sensei:
             self.load_config_sensors(js["sensors"])
 
         if "sps30_uart" in js:
+            # Serial port name on Python, or {"type": "uart", "port": 1} for the UART of the board
             self.sps30_uart = js["sps30_uart"]
+            if isinstance(self.sps30_uart, dict):
+                self.sps30_uart.setdefault("name", "sps30")
 
         if "zh03b_uart" in js:
-            self.zh03b_uart = js["zh03b_uart"]  # {"type": "uart", "tx":  17, "rx": 16}
+            self.zh03b_uart = js["zh03b_uart"]  # {"type": "uart", "tx":  17, "rx": 16, "mode": "stream" or "qa"}
+
+        if "intervals" in js:
+            self.sensor_intervals.update(js["intervals"])  # {"sgp41": 1000, "scd4x": 5000}
+
+        if "async" in js:
+            self.use_async = bool(js["async"])
+
+        if "publishMode" in js:
+            self.publish_mode = js["publishMode"]  # "topics", "combined" or "packed"
+
+        if "offlineQueue" in js:
+            # {"size": 8192, "spill": "queue.bin", "spillMaxSize": 262144, "batch": 8, "period": 2000}
+            queue_cfg = js["offlineQueue"]
+            self.offline_queue_size = int(queue_cfg.get("size", 8192))
+            self.offline_spill_file = queue_cfg.get("spill")
+            self.offline_spill_max_size = int(queue_cfg.get("spillMaxSize", self.offline_spill_max_size))
+            self.backfill_batch = int(queue_cfg.get("batch", self.backfill_batch))
+            self.backfill_period_ms = int(queue_cfg.get("period", self.backfill_period_ms))
+
+        if "stateFile" in js:
+            self.state_file = js["stateFile"]
+
+        if "stateCheckpoint" in js:
+            self.state_checkpoint_timeout = int(js["stateCheckpoint"])
+
+        if "irqPins" in js:
+            self.irq_pins = js["irqPins"]  # {"ccs811": 4}
+
+        if "irqTimeout" in js:
+            self.irq_timeout_ms = int(js["irqTimeout"])
+
+        if "lightSleep" in js:
+            self.light_sleep = bool(js["lightSleep"])
+
+        if "dutyCycle" in js:
+            # {"period": 600, "warmup": 30, "samples": 3}
+            duty_cfg = js["dutyCycle"]
+            self.duty_period = int(duty_cfg.get("period", 600))
+            self.duty_warmup = int(duty_cfg.get("warmup", self.duty_warmup))
+            self.duty_samples = int(duty_cfg.get("samples", self.duty_samples))
+
+        if "allocDebug" in js:
+            self.alloc_debug = bool(js["allocDebug"])
+
+        if "perf" in js:
+            # {"period": 300, "window": 64, "alloc": false}
+            perf_cfg = js["perf"]
+            self.perf_period = int(perf_cfg.get("period", 300))
+            self.perf_window = int(perf_cfg.get("window", self.perf_window))
+            self.perf_alloc = bool(perf_cfg.get("alloc", self.perf_alloc))
+
+        if js.get("startupProfile"):
+            from ph4_sense.support.startup import StartupProfile
+
+            self.startup_profile = StartupProfile(self.boot_ticks)
 
     def load_config_sensors(self, sensors: List[str]):
         self.has_aht = False
@@ -184,16 +380,81 @@ class Sensei:
             elif sensor in ("sgp41", "spg41"):
                 self.has_sgp41 = True
 
+    def get_startup_modules(self) -> List[str]:
+        """Modules imported on demand for the configured sensors and features, in import order"""
+        res = []
+        sensors = (
+            ("sgp30", self.has_sgp30),
+            ("sgp41", self.has_sgp41),
+            ("aht", self.has_aht),
+            ("hdc1080", self.has_hdc1080),
+            ("ccs811", self.has_ccs811),
+            ("scd4x", self.has_scd4x),
+            ("sps30", self.has_sps30 and not self.sps30_uart),
+            ("sps30_uart", self.has_sps30 and isinstance(self.sps30_uart, dict)),
+            ("zh03b", self.has_zh03b),
+        )
+        for name, enabled in sensors:
+            if enabled:
+                res += self.SENSOR_MODULES[name]
+
+        if self.has_sgp30 or self.has_sgp41:
+            res.append("ph4_sense.support.state_store")
+        if self.udp_logger:
+            res.append("ph4_sense.udplogger")
+        if self.offline_queue_size:
+            res += ("ph4_sense.support.record_queue", "ph4_sense.telemetry")
+        if self.publish_mode == self.PUBLISH_PACKED:
+            res.append("ph4_sense.telemetry")
+        if self.perf_period:
+            res.append("ph4_sense.support.perf")
+        if self.use_async:
+            res += ("ph4_sense.support.aio", "ph4_sense.sense_async")
+        if self.startup_profile is not None:
+            res.append("ph4_sense.support.startup")
+
+        seen = set()
+        return [x for x in res if not (x in seen or seen.add(x))]
+
+    def startup_mark(self, name: str):
+        if self.startup_profile is not None:
+            self.startup_profile.mark(name)
+
+    def get_sensor_interval(self, name: str) -> int:
+        return self.sensor_intervals.get(name) or self.measure_loop_ms
+
     def print(self, msg, *args):
         self.print_cli(msg, *args)
-        self.print_logger(msg, *args)
+        self.print_logger(self.LEVEL_INFO, msg, *args)
+
+    def print_error(self, msg, *args):
+        self.print_cli(msg, *args)
+        self.print_logger(self.LEVEL_ERROR, msg, *args)
 
     def print_cli(self, msg, *args):
         print(msg, *args)
 
-    def print_logger(self, msg, *args):
+    def print_logger(self, level: int, msg, *args):
+        if not self.udp_logger or level < self.udp_logger.level:
+            return
+
+        # Async runtime sends queued log lines from the logger task, in its IO worker on CPython
+        if self.log_queue is not None:
+            if len(self.log_queue) < self.log_queue_size:
+                self.log_queue.append((level, msg, args))
+            return
+
+        self.udp_logger.log(level, msg, *args)
+
+    def flush_logs(self):
         if self.udp_logger:
-            self.udp_logger.log_msg(msg, *args)
+            self.udp_logger.maybe_flush()
+
+    def perf_call(self, name: str, fnc):
+        """Calls fnc, timed as a stage when instrumentation is enabled"""
+        if self.perf is None:
+            return fnc()
+        return self.perf.call(name, fnc)
 
     def mqtt_callback(self, topic=None, msg=None):
         self.print("Received MQTT message:", topic, msg)
@@ -208,11 +469,60 @@ class Sensei:
             return
         raise NotImplementedError
 
+    def wifi_needs_reconnect(self) -> bool:
+        return False
+
+    async def connect_wifi_async(self, force=False):
+        from ph4_sense.support.aio import run_blocking
+
+        await run_blocking(lambda: self.connect_wifi(force=force), self.io_executor)
+
     def create_mqtt_client(self):
         raise NotImplementedError
 
     def connect_mqtt(self):
+        self.mqtt_online = False
         self.mqtt_client = self.create_mqtt_client()
+        self.mqtt_online = True
+
+    async def connect_mqtt_async(self):
+        from ph4_sense.support.aio import run_blocking
+
+        await run_blocking(self.connect_mqtt, self.io_executor)
+
+    def queue_mqtt_msg(self, topic: str, message):
+        """Adds message to the outbox written by the MQTT task, the oldest one is dropped when full"""
+        if len(self.mqtt_outbox) >= self.mqtt_outbox_size:
+            self.mqtt_outbox.pop(0)
+            self.mqtt_outbox_dropped += 1
+        # Packed messages are views of the encoder buffer, reused by the next encode
+        self.mqtt_outbox.append((topic, message if isinstance(message, str) else bytes(message)))
+
+    async def flush_mqtt_outbox(self):
+        """Publishes queued messages in order, a message stays queued until written, e.g., over a reconnect"""
+        outbox = self.mqtt_outbox
+        while outbox and self.is_online():
+            topic, message = outbox[0]
+            try:
+                await self.mqtt_client.publish(topic, message)
+            except Exception as e:
+                self.mqtt_online = False
+                self.print_error("Publish err:", e)
+                return
+            outbox.pop(0)
+
+    def is_online(self) -> bool:
+        return self.mqtt_client is not None and self.mqtt_online
+
+    def init_offline_queue(self):
+        if not self.offline_queue_size:
+            return
+
+        from ph4_sense.support.record_queue import RecordQueue
+
+        self.offline_queue = RecordQueue(
+            self.offline_queue_size, spill_path=self.offline_spill_file, spill_max_size=self.offline_spill_max_size
+        )
 
     def get_uart_builder(self, desc):
         raise NotImplementedError
@@ -223,10 +533,10 @@ class Sensei:
                 return fnc()
             except Exception as e:
                 if attempt + 1 >= self.measure_attempts:
-                    self.logger.error(f"Could not measure sensor {fnc}, attempt {attempt}: {e}")
+                    self.logger.error("Could not measure sensor %s, attempt %s: %s", fnc, attempt, e)
                     raise
                 else:
-                    self.logger.warn(f"Could not measure sensor {fnc}, attempt {attempt}: {e}")
+                    self.logger.warning("Could not measure sensor %s, attempt %s: %s", fnc, attempt, e)
                     sleep_ms(self.measure_timeout)
 
     def connect_sgp30(self):
@@ -234,13 +544,20 @@ class Sensei:
             return
 
         self.print(" - Connecting SGP30")
+        from ph4_sense.filters import SensorFilter
         from ph4_sense.sensors.sgp30 import sgp30_factory
 
+        if self.eavg_sgp30_co2 is None:
+            self.eavg_sgp30_co2 = SensorFilter(median_window=5, alpha=0.2)
+            self.eavg_sgp30_tvoc = SensorFilter(median_window=5, alpha=0.2)
+
         self.sgp30 = sgp30_factory(self.i2c, measure_test=True, iaq_init=False, sensor_helper=self.get_sensor_helper())
         if self.sgp30:
-            # self.sgp30.set_iaq_baseline(0x8973, 0x8AAE)
             self.sgp30.set_iaq_relative_humidity(26, 45)
             self.sgp30.iaq_init()
+            self.sgp30_learned_ms = 0
+            self.sgp30_learn_ticks = ticks_ms()
+            self.restore_sgp30_baseline()
         else:
             self.print("SGP30 not connected")
         self.log_memory()
@@ -255,12 +572,87 @@ class Sensei:
 
         self.sgp41 = sgp41_factory(self.i2c, measure_test=True, iaq_init=True, sensor_helper=self.get_sensor_helper())
         if self.sgp41:
-            self.sgp41_filter_voc = VocGasIndexAlgorithm(sampling_interval=self.measure_loop_ms / 1000.0)
-            self.sgp41_filter_nox = NoxGasIndexAlgorithm(sampling_interval=self.measure_loop_ms / 1000.0)
+            sampling_interval = self.get_sensor_interval("sgp41") / 1000.0
+            self.sgp41_filter_voc = VocGasIndexAlgorithm(sampling_interval=sampling_interval)
+            self.sgp41_filter_nox = NoxGasIndexAlgorithm(sampling_interval=sampling_interval)
+            self.restore_sgp41_state()
         else:
             self.print("SGP41 not connected")
         self.log_memory()
 
+    def get_state_store(self):
+        if not self.state_store:
+            from ph4_sense.support.state_store import StateStore
+
+            self.state_store = StateStore(self.state_file)
+
+        return self.state_store
+
+    def restore_sgp41_state(self):
+        """
+        Restores the VOC gas index state. The Sensirion get/set state workflow is defined for VOC only,
+        the NOx algorithm relearns after each restart, its initialization is longer than the state validity gate.
+        """
+        try:
+            store = self.get_state_store()
+            state = store.get("sgp41_voc", self.sgp41_state_max_age)
+            if state is not None:
+                self.sgp41_filter_voc.set_state(state)
+                self.print(f"Restored sgp41_voc state, age {store.age('sgp41_voc')} s")
+        except Exception as e:
+            self.print_error("SGP41 state restore err:", e)
+
+    def restore_sgp30_baseline(self):
+        """Restores SGP30 baseline after iaq_init(), as recommended by the datasheet"""
+        try:
+            store = self.get_state_store()
+            baseline = store.get("sgp30_baseline", self.sgp30_baseline_max_age)
+            if baseline is None:
+                return
+
+            self.sgp30.set_iaq_baseline(baseline[0], baseline[1])
+            self.sgp30_baseline_age = int(store.age("sgp30_baseline"))
+            self.sgp30_learned_ms = self.sgp30_baseline_learning_time * 1000  # baseline is already learned
+            self.print(f"Restored SGP30 baseline {baseline}, age {self.sgp30_baseline_age} s")
+        except Exception as e:
+            self.print_error("SGP30 baseline restore err:", e)
+
+    def update_sgp30_learned(self) -> int:
+        """SGP30 baseline learning time in ms, updated on each state checkpoint, so ticks_diff() does not wrap"""
+        now = ticks_ms()
+        self.sgp30_learned_ms += ticks_diff(now, self.sgp30_learn_ticks)
+        self.sgp30_learn_ticks = now
+        return self.sgp30_learned_ms
+
+    def save_sgp30_baseline(self) -> bool:
+        if not self.sgp30 or self.update_sgp30_learned() < self.sgp30_baseline_learning_time * 1000:
+            return False
+
+        baseline = list(self.sgp30.baseline_co2eq_tvoc())
+        if not baseline[0] and not baseline[1]:
+            return False
+        return self.get_state_store().put("sgp30_baseline", baseline, save=False)
+
+    def save_sgp41_state(self) -> bool:
+        if not self.sgp41:
+            return False
+
+        if not self.sgp41_filter_voc.is_state_valid():
+            return False
+        return self.get_state_store().put("sgp41_voc", self.sgp41_filter_voc.get_state(), save=False)
+
+    def checkpoint_state(self):
+        """Periodically persists learned sensor state, so it survives reboots and deploys"""
+        try:
+            updated = self.save_sgp30_baseline()
+            updated |= self.save_sgp41_state()
+            if updated:
+                self.get_state_store().save()
+        except Exception as e:
+            self.print_error("State checkpoint err:", e)
+            if LOG_DEBUG:
+                self.logger.debug("State checkpoint err: %s", e, exc_info=e)
+
     def connect_aht(self):
         if not self.has_aht:
             return
@@ -289,8 +681,13 @@ class Sensei:
             return
 
         self.print("\n - Connecting CCS811")
+        from ph4_sense.filters import SensorFilter
         from ph4_sense.sensors.ccs811 import css811_factory
 
+        if self.eavg_css811_co2 is None:
+            self.eavg_css811_co2 = SensorFilter(median_window=9, alpha=0.2)
+            self.eavg_css811_tvoc = SensorFilter(median_window=9, alpha=0.2)
+
         self.ccs811 = css811_factory(self.i2c, sensor_helper=self.get_sensor_helper())
         if self.ccs811:
             pass
@@ -306,7 +703,10 @@ class Sensei:
         from ph4_sense.sensors.scd4x import scd4x_factory
 
         self.scd4x = scd4x_factory(self.i2c, sensor_helper=self.get_sensor_helper())
-        if self.scd4x:
+        if self.scd4x and self.duty_period:
+            # Keeps measuring every 30 s during deep sleep, fails if already running from the previous wake-up
+            try_fnc(lambda: self.scd4x.start_low_periodic_measurement())
+        elif self.scd4x:
             self.scd4x.start_periodic_measurement()
         else:
             self.print("SCD4x not connected")
@@ -317,7 +717,14 @@ class Sensei:
             return
 
         self.print("\n - Connecting SPS30")
-        if self.sps30_uart:
+        if isinstance(self.sps30_uart, dict):
+            from ph4_sense.sensors.sps30_uart import SPS30_UART
+
+            self.sps30 = SPS30_UART(
+                uart_builder=self.get_uart_builder(self.sps30_uart), sensor_helper=self.get_sensor_helper()
+            )
+            self.sps30.start()
+        elif self.sps30_uart:
             from ph4_sense_py.sensors.sps30_uart_ada import SPS30AdaUart
 
             self.sps30 = SPS30AdaUart(self.sps30_uart, sensor_helper=self.get_sensor_helper())
@@ -345,7 +752,10 @@ class Sensei:
                 None, uart_builder=self.get_uart_builder(self.zh03b_uart), sensor_helper=self.get_sensor_helper()
             )
             self.zh03b.dormant_mode(to_dormant=False)
-            self.zh03b.set_qa()
+            if self.zh03b_uart.get("mode") == "qa":
+                self.zh03b.set_qa()
+            else:
+                self.zh03b.set_stream()  # sensor sends a frame every second, read without waiting
         else:
             self.print("ZH03b uart is required")
 
@@ -361,10 +771,10 @@ class Sensei:
                 return fnc()
             except Exception as e:
                 if attempt + 1 >= self.reconnect_attempts:
-                    self.logger.error(f"Could not connect sensor {fnc}, attempt {attempt}: {e}")
+                    self.logger.error("Could not connect sensor %s, attempt %s: %s", fnc, attempt, e)
                     raise
                 else:
-                    self.logger.warn(f"Could not connect sensor {fnc}, attempt {attempt}: {e}")
+                    self.logger.warning("Could not connect sensor %s, attempt %s: %s", fnc, attempt, e)
                     sleep_ms(self.reconnect_timeout)
 
     def connect_sensors(self):
@@ -381,10 +791,36 @@ class Sensei:
 
             self.print("\nSensors connected")
         except Exception as e:
-            self.print("Exception in sensor init: ", e)
-            self.logger.debug("Exception in sensor init: {}".format(e), exc_info=e)
+            self.print_error("Exception in sensor init: ", e)
+            if LOG_DEBUG:
+                self.logger.debug("Exception in sensor init: %s", e, exc_info=e)
             raise
 
+    def start_measurement(self, sensor, *args):
+        """
+        Triggers split-phase measurement if the sensor supports it, result is collected by measure_*
+        Returns ticks_ms when the result is ready, None if not started.
+        """
+        if not isinstance(sensor, SplitMeasurement):
+            return None
+
+        try:
+            return sensor.start_measurement(*args)
+        except Exception as e:
+            self.print_error("Measurement start err:", e)
+            if LOG_DEBUG:
+                self.logger.debug("Measurement start err: %s", e, exc_info=e)
+            return None
+
+    def start_temperature(self):
+        return self.start_measurement(self.aht21 or self.hdc1080)
+
+    def start_sqp30(self):
+        return self.start_measurement(self.sgp30)
+
+    def start_sqp41(self):
+        return self.start_measurement(self.sgp41, self.humd, self.temp)
+
     def measure_temperature(self):
         if not self.aht21 and not self.hdc1080:
             return
@@ -406,7 +842,8 @@ class Sensei:
 
         except Exception as e:
             self.print("E: exc in temp", e)
-            self.logger.debug("Temp exception err: {}".format(e), exc_info=e)
+            if LOG_DEBUG:
+                self.logger.debug("Temp exception err: %s", e, exc_info=e)
 
     def calibrate_temps(self, cal_temp, cal_hum):
         if cal_temp and cal_hum and time.time() - self.last_tsync > self.temp_sync_timeout:
@@ -438,9 +875,10 @@ class Sensei:
                 self.eavg_sgp30_tvoc.update(self.sgp30_tvoc)
 
         except Exception as e:
-            self.print("SGP30 err:", e)
-            self.logger.error("SGP30 err: {}".format(e))
-            self.logger.debug("SGP30 err: {}".format(e), exc_info=e)
+            self.print_error("SGP30 err:", e)
+            self.logger.error("SGP30 err: %s", e)
+            if LOG_DEBUG:
+                self.logger.debug("SGP30 err: %s", e, exc_info=e)
             return
 
     def measure_sqp41(self):
@@ -453,9 +891,10 @@ class Sensei:
             self.sgp41_filter_nox.process(self.sgp41_sraw_nox)
 
         except Exception as e:
-            self.print("SGP41 err:", e)
-            self.logger.error("SGP41 err: {}".format(e))
-            self.logger.debug("SGP41 err: {}".format(e), exc_info=e)
+            self.print_error("SGP41 err:", e)
+            self.logger.error("SGP41 err: %s", e)
+            if LOG_DEBUG:
+                self.logger.debug("SGP41 err: %s", e, exc_info=e)
             return
 
     def measure_ccs811(self):
@@ -490,11 +929,13 @@ class Sensei:
                 raise RuntimeError(f"CCS overflow {inv_ctr}, flg: {flg}, orig co2: {nccs_co2}, tvoc: {nccs_tvoc}")
 
             if self.ccs811.r_error:
+                from ph4_sense.sensors.common import ccs811_err_to_str
+
                 self.print(
                     f"CCS811 logical-err: {self.ccs811.r_error_code} = {ccs811_err_to_str(self.ccs811.r_error_code)}"
                 )
         except Exception as e:
-            self.print("CCS error: ", e)
+            self.print_error("CCS error: ", e)
             try:
                 self.print(
                     f"  CCS err, orig ({self.ccs811.r_orig_co2}, "
@@ -507,8 +948,9 @@ class Sensei:
             except Exception:
                 pass
 
-            self.logger.error("CCS err: {}".format(e))
-            self.logger.debug("CCS err: {}".format(e), exc_info=e)
+            self.logger.error("CCS err: %s", e)
+            if LOG_DEBUG:
+                self.logger.debug("CCS err: %s", e, exc_info=e)
             return
 
     def measure_scd4x(self):
@@ -520,9 +962,10 @@ class Sensei:
                 self.scd40_temp = self.scd4x.temperature
                 self.scd40_hum = self.scd4x.relative_humidity
         except Exception as e:
-            self.print("Err SDC40: ", e)
-            self.logger.error("SDC40 err: {}".format(e))
-            self.logger.debug("SDC40 err: {}".format(e), exc_info=e)
+            self.print_error("Err SDC40: ", e)
+            self.logger.error("SDC40 err: %s", e)
+            if LOG_DEBUG:
+                self.logger.debug("SDC40 err: %s", e, exc_info=e)
             return
 
     def measure_sps30(self):
@@ -530,16 +973,18 @@ class Sensei:
             return
 
         def sps30_measure_body():
-            if self.sps30.data_available:
-                self.sps30_data = self.sps30.read()
+            values = self.sps30.read_values()
+            if values is not None:
+                self.sps30_data = values  # reused by the driver, the reading dict is filled only on publish
 
         try:
             self.try_measure(sps30_measure_body)
 
         except Exception as e:
-            self.print("Err SPS30: ", e)
-            self.logger.error("SPS30 err: {}".format(e))
-            self.logger.debug("SPS30 err: {}".format(e), exc_info=e)
+            self.print_error("Err SPS30: ", e)
+            self.logger.error("SPS30 err: %s", e)
+            if LOG_DEBUG:
+                self.logger.debug("SPS30 err: %s", e, exc_info=e)
             return
 
     def measure_zh03b(self):
@@ -547,7 +992,10 @@ class Sensei:
             return
 
         try:
-            reading = self.zh03b.qa_read_sample()
+            if self.zh03b.streaming:
+                reading = self.zh03b.latest if self.zh03b.stream_poll() else None
+            else:
+                reading = self.zh03b.qa_read_sample()
             if reading is None:
                 return
 
@@ -555,25 +1003,46 @@ class Sensei:
             self.print("ZH03b data {}".format(self.zh03b_data))
 
         except Exception as e:
-            self.print("Err ZH03b: ", e)
-            self.logger.error("ZH03b err: {}".format(e))
-            self.logger.debug("ZH03b err: {}".format(e), exc_info=e)
+            self.print_error("Err ZH03b: ", e)
+            self.logger.error("ZH03b err: %s", e)
+            if LOG_DEBUG:
+                self.logger.debug("ZH03b err: %s", e, exc_info=e)
             return
 
     def update_metrics(self):
         pass
 
     def publish_booted(self):
-        self.publish_payload(
-            f"sensors/esp32{self.mqtt_sensor_suffix}",
-            {
-                "booted": True,
-            },
-        )
+        self.startup_mark("booted")
+        payload = {
+            "booted": True,
+            "boot_ms": ticks_diff(ticks_ms(), self.boot_ticks),
+            "mem_free": mem_stats()[1],
+        }
+        if self.sgp30:
+            payload["sgp30_baseline_age"] = self.sgp30_baseline_age
+
+        self.publish_payload(self.get_topic("esp32"), payload)
+
+    def on_first_publish(self):
+        self.first_publish_ms = ticks_diff(ticks_ms(), self.boot_ticks)
+        self.print("First readings published {} ms after boot, free {} B".format(self.first_publish_ms, mem_stats()[1]))
+        if self.startup_profile is None:
+            return
+
+        self.startup_mark("first_publish")
+        for line in self.startup_profile.lines():
+            self.print(line)
+        try:
+            self.publish_payload(self.get_topic("esp32"), {"startup": self.startup_profile.report()})
+        except Exception as e:
+            self.print_error("Startup profile pub err:", e)
+        self.startup_profile = None  # report is sent once, profile is released
 
     def publish(self):
         self.publish_common()
-        self.publish_co2()
+        if self.publish_mode == self.PUBLISH_TOPICS:
+            self.publish_co2()
 
     def publish_common(self):
         t = time.time()
@@ -581,16 +1050,29 @@ class Sensei:
             return
 
         try:
-            self.check_wifi_ok()
-            self.maybe_reconnect_mqtt()
-            self.publish_sgp30()
-            self.publish_sgp41()
-            self.publish_ccs811()
-            self.publish_sps30()
-            self.publish_zh03b()
+            if not self.async_mode:  # reconnect task takes care of it
+                self.perf_call("wifi", self.check_wifi_ok)
+                self.perf_call("reconnect", self.maybe_reconnect_mqtt)
+
+            combined = self.publish_mode != self.PUBLISH_TOPICS
+            if combined:
+                self.publish_batch.clear()
+
+            self.perf_call("pub_sgp30", self.publish_sgp30)
+            self.perf_call("pub_sgp41", self.publish_sgp41)
+            self.perf_call("pub_ccs811", self.publish_ccs811)
+            self.perf_call("pub_sps30", self.publish_sps30)
+            self.perf_call("pub_zh03b", self.publish_zh03b)
+
+            if combined:
+                if self.scd40_co2 is not None and self.scd40_co2 > 0:
+                    self.perf_call("pub_scd40", self.publish_scd40)
+                self.perf_call("pub_combined", self.publish_combined)
             self.last_pub = t
+            if self.first_publish_ms is None:
+                self.on_first_publish()
         except Exception as e:
-            self.print("Error in pub:", e)
+            self.print_error("Error in pub:", e)
 
     def publish_co2(self):
         if not self.scd4x:
@@ -599,125 +1081,267 @@ class Sensei:
         t = time.time()
         if t - self.last_pub_sgp > self.readings_publish_timeout and self.scd40_co2 is not None and self.scd40_co2 > 0:
             try:
-                self.publish_scd40()
+                self.perf_call("pub_scd40", self.publish_scd40)
                 self.last_pub_sgp = t
             except Exception as e:
-                self.print("Error in pub:", e)
+                self.print_error("Error in pub:", e)
 
     def publish_msg(self, topic: str, message: str):
         raise NotImplementedError
 
-    def publish_payload(self, topic: str, payload: dict):
-        self.publish_msg(topic, json.dumps(payload))
+    def publish_payload(self, topic: str, payload: dict, name: Optional[str] = None):
+        """
+        Publishes JSON payload, or queues it for backfill when offline. Name is the sensor of the reading,
+        "readings" for the combined message, the queue keeps readings packed.
+        """
+        if self.offline_queue is not None and not self.is_online():
+            return self.queue_payload(topic, payload, name)
 
-    def publish_sgp30(self):
-        if not self.sgp30:
+        message = json.dumps(payload)
+        if self.offline_queue is None:
+            return self.publish_msg(topic, message)
+
+        try:
+            self.publish_msg(topic, message)
+            if self.offline_queue.pending:
+                self.live_messages[topic] = message
+        except Exception as e:
+            # Rest of the readings go to the queue until MQTT reconnects
+            self.mqtt_online = False
+            self.queue_payload(topic, payload, name)
+            self.print_error("Publish err, queued:", e)
+
+    def get_telemetry_encoder(self):
+        if self.telemetry_encoder is None:
+            from ph4_sense.telemetry import TelemetryEncoder
+
+            self.telemetry_encoder = TelemetryEncoder()
+        return self.telemetry_encoder
+
+    def queue_payload(self, topic: str, payload: dict, name: Optional[str] = None):
+        ts = unix_time()
+        if name is not None:
+            from ph4_sense.telemetry import TELEMETRY_VERSION
+
+            readings = payload if name == "readings" else {name: payload}
+            encoder = self.get_telemetry_encoder()
+            blocks = encoder.encode_blocks(readings) if encoder.can_encode(readings) else None
+            if blocks is not None:
+                kind = self.RECORD_READINGS if name == "readings" else self.RECORD_READING
+                self.offline_queue.push(ts, kind | (TELEMETRY_VERSION << 4), blocks)
+                return
+
+        topic_b = topic.encode()
+        self.offline_queue.push(ts, self.RECORD_JSON, bytes([len(topic_b)]) + topic_b + json.dumps(payload).encode())
+
+    def expand_record(self, ts: int, kind: int, body: bytes):
+        """Queued record to (original topic, JSON message), readings get the "ts" field with the reading time"""
+        record_type = kind & 0xF
+        if record_type == self.RECORD_JSON:
+            topic_len = body[0]
+            topic = body[1 : 1 + topic_len].decode()
+            payload = json.loads(body[1 + topic_len :].decode())
+            if isinstance(payload, dict):
+                payload["ts"] = ts
+            return topic, json.dumps(payload)
+
+        from ph4_sense.telemetry import decode_blocks
+
+        readings = decode_blocks(body, kind >> 4)
+        for values in readings.values():
+            values["ts"] = ts
+        if record_type == self.RECORD_READINGS:
+            return self.get_topic("readings"), json.dumps(readings)
+        for name, values in readings.items():
+            return self.get_topic(name), json.dumps(values)
+        raise ValueError("Empty record")
+
+    def publish_perf(self):
+        """Publishes rolling per-stage durations in us, [n, min, avg, p95, max] and allocated bytes if tracked"""
+        if self.perf is None or not self.is_online():
             return
 
-        self.publish_payload(
-            f"sensors/sgp30{self.mqtt_sensor_suffix}",
-            {
-                "eCO2": self.eavg_sgp30_co2.cur,
-                "TVOC": self.eavg_sgp30_tvoc.cur,
-                "Eth": self.eth,
-                "H2": self.h2,
-                "temp": self.temp,
-                "humidity": self.humd,
-            },
-        )
+        payload = {"stages": self.perf.summary(), "window": self.perf_window, "first_publish_ms": self.first_publish_ms}
+        if self.udp_logger and self.udp_logger.buffered:
+            payload["log_dropped"] = self.udp_logger.dropped
+        try:
+            self.publish_msg(self.mqtt_topic_perf, json.dumps(payload))
+        except Exception as e:
+            self.print_error("Perf pub err:", e)
+
+    def backfill(self):
+        """
+        Re-publishes queued readings to their original topics, with the "ts" field, one batch per call
+        to limit the rate. Live readings are published directly meanwhile, so after each batch the last
+        live message of the topic is sent again, consumers keeping the latest value stay current.
+        """
+        queue = self.offline_queue
+        if queue is None or not queue.pending or not self.is_online():
+            return
+        if self.mqtt_outbox:
+            return  # non-blocking writer has not sent the previous batch yet
 
-        self.publish_payload(
-            f"sensors/sgp30_raw{self.mqtt_sensor_suffix}",
-            {"eCO2": self.last_sgp30_co2, "TVOC": self.last_sgp30_tvoc},
-        )
+        done = 0
+        topics = []
+        for ts, kind, body in queue.peek(self.backfill_batch):
+            try:
+                topic, message = self.expand_record(ts, kind, body)
+            except Exception as e:
+                self.print_error("Backfill record dropped:", e)
+                done += 1
+                continue
 
-        self.publish_payload(
-            f"sensors/sgp30_filt{self.mqtt_sensor_suffix}",
-            {
-                "eCO2": self.eavg_sgp30_co2.cur,
-                "TVOC": self.eavg_sgp30_tvoc.cur,
-            },
-        )
+            try:
+                self.publish_msg(topic, message)
+            except Exception as e:
+                self.mqtt_online = False
+                self.print_error("Backfill err:", e)
+                break
+            done += 1
+            if topic not in topics:
+                topics.append(topic)
+        queue.commit(done)
+
+        for topic in topics:
+            message = self.live_messages.get(topic)
+            if message is not None and self.is_online():
+                try_fnc(lambda t=topic, m=message: self.publish_msg(t, m))
+        if not queue.pending:
+            self.live_messages.clear()
+
+    def get_topic(self, name: str) -> str:
+        topic = self.topic_cache.get(name)
+        if topic is None:
+            topic = self.topic_cache[name] = f"sensors/{name}{self.mqtt_sensor_suffix}"
+        return topic
+
+    def get_payload(self, name: str) -> dict:
+        """Payload dict of the reading, reused and updated in place each cycle to avoid allocations"""
+        payload = self.payloads.get(name)
+        if payload is None:
+            payload = self.payloads[name] = {}
+        return payload
+
+    def publish_reading(self, name: str, payload: dict):
+        """Publishes sensor reading to its own topic, or adds it to the combined message batch"""
+        if self.publish_mode != self.PUBLISH_TOPICS:
+            self.publish_batch[name] = payload
+        else:
+            self.publish_payload(self.get_topic(name), payload, name)
+
+    def publish_combined(self):
+        """Publishes all readings collected in this cycle as a single message, keyed by sensor name"""
+        if not self.publish_batch:
+            return
+
+        # Offline, readings are queued and backfilled to the readings topic
+        if self.publish_mode == self.PUBLISH_PACKED and (self.offline_queue is None or self.is_online()):
+            self.publish_packed()
+        else:
+            self.publish_payload(self.get_topic("readings"), self.publish_batch, "readings")
+        self.publish_batch.clear()
+
+    def publish_packed(self):
+        message = self.get_telemetry_encoder().encode(self.publish_batch, unix_time())
+        try:
+            self.publish_msg(self.get_topic("packed"), message)
+        except Exception as e:
+            if self.offline_queue is None:
+                raise
+            self.mqtt_online = False
+            self.print_error("Publish err:", e)
+            self.publish_payload(self.get_topic("readings"), self.publish_batch, "readings")
+
+    def publish_sgp30(self):
+        if not self.sgp30:
+            return
+
+        payload = self.get_payload("sgp30")
+        payload["eCO2"] = self.eavg_sgp30_co2.cur
+        payload["TVOC"] = self.eavg_sgp30_tvoc.cur
+        payload["Eth"] = self.eth
+        payload["H2"] = self.h2
+        payload["temp"] = self.temp
+        payload["humidity"] = self.humd
+        self.publish_reading("sgp30", payload)
+
+        payload = self.get_payload("sgp30_raw")
+        payload["eCO2"] = self.last_sgp30_co2
+        payload["TVOC"] = self.last_sgp30_tvoc
+        self.publish_reading("sgp30_raw", payload)
+
+        payload = self.get_payload("sgp30_filt")
+        payload["eCO2"] = self.eavg_sgp30_co2.cur
+        payload["TVOC"] = self.eavg_sgp30_tvoc.cur
+        self.publish_reading("sgp30_filt", payload)
 
     def publish_sgp41(self):
         if not self.sgp41:
             return
 
-        self.publish_payload(
-            f"sensors/sgp41{self.mqtt_sensor_suffix}",
-            {
-                "NOX": self.sgp41_filter_nox.get_gas_index(),
-                "TVOC": self.sgp41_filter_voc.get_gas_index(),
-                "sraw_voc": self.sgp41_sraw_voc,
-                "sraw_nox": self.sgp41_sraw_nox,
-                "temp": self.temp,
-                "humidity": self.humd,
-            },
-        )
+        payload = self.get_payload("sgp41")
+        payload["NOX"] = self.sgp41_filter_nox.get_gas_index()
+        payload["TVOC"] = self.sgp41_filter_voc.get_gas_index()
+        payload["sraw_voc"] = self.sgp41_sraw_voc
+        payload["sraw_nox"] = self.sgp41_sraw_nox
+        payload["temp"] = self.temp
+        payload["humidity"] = self.humd
+        self.publish_reading("sgp41", payload)
 
     def publish_ccs811(self):
         if not self.ccs811:
             return
 
-        self.publish_payload(
-            f"sensors/ccs811_raw{self.mqtt_sensor_suffix}",
-            {
-                "eCO2": self.last_ccs811_co2,
-                "TVOC": self.last_ccs811_tvoc,
-            },
-        )
+        payload = self.get_payload("ccs811_raw")
+        payload["eCO2"] = self.last_ccs811_co2
+        payload["TVOC"] = self.last_ccs811_tvoc
+        self.publish_reading("ccs811_raw", payload)
 
-        self.publish_payload(
-            f"sensors/ccs811_filt{self.mqtt_sensor_suffix}",
-            {
-                "eCO2": self.eavg_css811_co2.cur,
-                "TVOC": self.eavg_css811_tvoc.cur,
-            },
-        )
+        payload = self.get_payload("ccs811_filt")
+        payload["eCO2"] = self.eavg_css811_co2.cur
+        payload["TVOC"] = self.eavg_css811_tvoc.cur
+        self.publish_reading("ccs811_filt", payload)
 
     def publish_scd40(self):
         if not self.scd4x:
             return
 
-        self.publish_payload(
-            f"sensors/scd40{self.mqtt_sensor_suffix}",
-            {
-                "eCO2": self.scd40_co2,
-                "temp": self.scd40_temp,
-                "humidity": self.scd40_hum,
-            },
-        )
+        payload = self.get_payload("scd40")
+        payload["eCO2"] = self.scd40_co2
+        payload["temp"] = self.scd40_temp
+        payload["humidity"] = self.scd40_hum
+        self.publish_reading("scd40", payload)
 
     def publish_sps30(self):
         if not self.sps30 or not self.sps30_data:
             return
 
-        self.publish_payload(f"sensors/sps30{self.mqtt_sensor_suffix}", self.sps30_data)
+        self.publish_reading("sps30", self.sps30.reading(self.sps30_data))
 
     def publish_zh03b(self):
         if not self.zh03b or not self.zh03b_data or len(self.zh03b_data) < 3:
             return
 
-        self.publish_payload(
-            f"sensors/zh03b{self.mqtt_sensor_suffix}",
-            {
-                "pm10": self.zh03b_data[0],
-                "pm25": self.zh03b_data[1],
-                "pm100": self.zh03b_data[2],
-            },
-        )
+        payload = self.get_payload("zh03b")
+        payload["pm10"] = self.zh03b_data[0]
+        payload["pm25"] = self.zh03b_data[1]
+        payload["pm100"] = self.zh03b_data[2]
+        self.publish_reading("zh03b", payload)
 
     def on_wifi_reconnect(self):
         self.print("WiFi Reconnecting")
         self.connect_wifi(force=True)
         self.maybe_reconnect_mqtt(force=True)
 
-    def maybe_reconnect_mqtt(self, force=False):
+    def mqtt_reconnect_due(self, force=False) -> bool:
         t = time.time()
+        return force or self.mqtt_client is None or t - self.last_reconnect >= self.mqtt_reconnect_timeout
 
-        if not force and (self.mqtt_client is not None and t - self.last_reconnect < self.mqtt_reconnect_timeout):
+    def maybe_reconnect_mqtt(self, force=False):
+        if not self.mqtt_reconnect_due(force):
             return
 
+        t = time.time()
         if self.mqtt_client:
             try_fnc(lambda: self.mqtt_client.disconnect())
             sleep_ms(1000)
@@ -726,58 +1350,188 @@ class Sensei:
             self.connect_mqtt()
             self.last_reconnect = t
         except Exception as e:
-            self.print("MQTT connection error:", e)
+            self.mqtt_online = False
+            self.print_error("MQTT connection error:", e)
+
+    async def maybe_reconnect_mqtt_async(self, force=False):
+        """Reconnect for the async runtime, the pause after disconnect is awaited instead of blocking"""
+        from ph4_sense.support.aio import run_blocking
+        from ph4_sense.support.aio import sleep_ms as async_sleep_ms
+
+        if not self.mqtt_reconnect_due(force):
+            return
+
+        t = time.time()
+        if self.mqtt_client:
+            client = self.mqtt_client
+            await run_blocking(lambda: try_fnc(lambda: client.disconnect()), self.io_executor)
+            await async_sleep_ms(1000)
+
+        try:
+            await self.connect_mqtt_async()
+            self.last_reconnect = t
+        except Exception as e:
+            self.mqtt_online = False
+            self.print_error("MQTT connection error:", e)
 
     def start_bus(self):
         raise NotImplementedError
 
+    def build_scheduler(self) -> Scheduler:
+        """
+        Each connected sensor is polled with its own period, see sensor_intervals.
+        Temperature goes first as it is used for compensation by other sensors.
+        Sensors supporting split-phase measurement are triggered first and collected afterwards.
+        """
+        scheduler = Scheduler()
+        if self.aht21 or self.hdc1080:
+            scheduler.add("temp", self.get_sensor_interval("temp"), self.measure_temperature, self.start_temperature)
+        if self.sgp30:
+            scheduler.add("sgp30", self.get_sensor_interval("sgp30"), self.measure_sqp30, self.start_sqp30)
+        if self.sgp41:
+            scheduler.add("sgp41", self.get_sensor_interval("sgp41"), self.measure_sqp41, self.start_sqp41)
+        if self.ccs811:
+            scheduler.add("ccs811", self.get_sensor_interval("ccs811"), self.measure_ccs811)
+        if self.scd4x:
+            scheduler.add("scd4x", self.get_sensor_interval("scd4x"), self.measure_scd4x)
+        if self.sps30:
+            scheduler.add("sps30", self.get_sensor_interval("sps30"), self.measure_sps30)
+        if self.zh03b:
+            scheduler.add("zh03b", self.get_sensor_interval("zh03b"), self.measure_zh03b)
+
+        if self.offline_queue is not None:
+            scheduler.add("backfill", self.backfill_period_ms, self.backfill)
+        if self.sgp30 or self.sgp41:
+            period = self.state_checkpoint_timeout * 1000
+            scheduler.add("state", period, self.checkpoint_state, delay_ms=period)
+
+        scheduler.add("report", self.measure_loop_ms, self.report)
+        if self.perf is not None:
+            scheduler.set_perf(self.perf)
+            period = self.perf_period * 1000
+            scheduler.add("perf", period, self.publish_perf, delay_ms=period)
+        return scheduler
+
+    def setup_irqs(self):
+        """Switches sensors with configured data-ready pins to interrupt-driven acquisition"""
+        for name, pin in self.irq_pins.items():
+            task = self.scheduler.get(name)
+            if task is None:
+                continue
+            if name not in self.IRQ_SENSORS:
+                self.print("No data-ready output, polling", name)
+                continue
+
+            try:
+                if not self.attach_irq(pin, task):
+                    self.print("IRQ not supported, polling", name)
+                    continue
+
+                self.enable_sensor_irq(name)
+                self.scheduler.set_event(task, self.irq_timeout_ms)
+                self.scheduler.signal(task)  # data may be ready already, pin asserted without an edge
+                self.irq_active = True
+                self.print("IRQ mode for {}, pin {}".format(name, pin))
+            except Exception as e:
+                self.print_error("IRQ setup err {}:".format(name), e)
+
+    def attach_irq(self, pin: int, task) -> bool:
+        """Calls scheduler.signal(task) on the pin interrupt, returns False if not supported on the platform"""
+        return False
+
+    def enable_sensor_irq(self, name: str):
+        if name == "ccs811" and self.ccs811:
+            self.ccs811.set_interrupt(True)
+
+    def idle_sleep(self, ms: int):
+        """Sleeps until the next deadline, wakes up early when an interrupt signals a task"""
+        if not self.irq_active:
+            sleep_ms(ms)
+            return
+
+        deadline = ticks_add(ticks_ms(), ms)
+        while not self.scheduler.has_signaled():
+            remaining = ticks_diff(deadline, ticks_ms())
+            if remaining <= 0:
+                return
+            sleep_ms(min(remaining, self.irq_poll_ms))
+
     def measure_loop_body(self):
-        self.measure_temperature()
-        self.measure_sqp30()
-        self.measure_sqp41()
-        self.measure_ccs811()
-        self.measure_scd4x()
-        self.measure_sps30()
-        self.measure_zh03b()
+        if self.scheduler is None:
+            self.scheduler = self.build_scheduler()
+        if not self.alloc_debug:
+            if self.perf is None:
+                self.scheduler.run_due()
+            else:
+                self.perf.call("cycle", self.scheduler.run_due)
+            return
+
+        before = mem_alloc()
+        self.scheduler.run_due()
+        self.update_alloc_stats(mem_alloc() - before)
+
+    def update_alloc_stats(self, allocated: int):
+        # Negative delta means garbage collection ran during the cycle, the sample is not usable
+        if allocated < 0:
+            return
+
+        self.alloc_last = allocated
+        self.alloc_max = max(self.alloc_max, allocated)
+        self.alloc_total += allocated
+        self.alloc_cycles += 1
+
+    def report(self):
+        self.report_log()
+        self.publish()
+
+    def report_log(self):
         self.update_metrics()
 
         msg = self.combine_sensor_log()
         self.print(msg)
-        self.publish()
 
     def combine_sensor_log(self):
-        res = []
-        if self.has_sgp30:
+        res = self.log_parts
+        res.clear()
+        if self.has_sgp30 and self.eavg_sgp30_co2 is not None:
             res.append(
-                f"CO2eq: {dval(self.sgp30_co2eq):4.1f} (r={dval(self.eavg_sgp30_co2.cur):4.1f}) ppm, "
-                f"TVOC: {dval(self.sgp30_tvoc):4d} ppb"
+                self.LOG_SGP30.format(dval(self.sgp30_co2eq), dval(self.eavg_sgp30_co2.cur), dval(self.sgp30_tvoc))
             )
 
         if self.has_sgp41 and self.sgp41_filter_voc is not None:
             res.append(
-                f"SGP41: {dval(self.sgp41_filter_voc.get_gas_index()):4d} (r={dval(self.sgp41_sraw_voc):5d}), "
-                f"NOX: {dval(self.sgp41_filter_nox.get_gas_index()):4d} (r={dval(self.sgp41_sraw_nox):5d})"
+                self.LOG_SGP41.format(
+                    dval(self.sgp41_filter_voc.get_gas_index()),
+                    dval(self.sgp41_sraw_voc),
+                    dval(self.sgp41_filter_nox.get_gas_index()),
+                    dval(self.sgp41_sraw_nox),
+                )
             )
 
         if self.has_ccs811 and self.ccs_co2 is not None and self.eavg_css811_co2 is not None:
             res.append(
-                f"CCS CO2: {dval(self.ccs_co2):4d} ({dval(self.eavg_css811_co2.cur):4.1f}), "
-                f"TVOC2: {dval(self.ccs_tvoc):3d} ({dval(self.eavg_css811_tvoc.cur):3.1f})"
+                self.LOG_CCS811.format(
+                    dval(self.ccs_co2),
+                    dval(self.eavg_css811_co2.cur),
+                    dval(self.ccs_tvoc),
+                    dval(self.eavg_css811_tvoc.cur),
+                )
             )
 
         if self.has_sgp30 and self.eth is not None:
-            res.append(f"Eth: {dval(self.eth):5d}, H2: {self.h2:5d}")
+            res.append(self.LOG_SGP30_RAW.format(dval(self.eth), self.h2))
 
         if self.temp is not None:
-            res.append(f"{dval(self.temp):4.2f} C, {dval(self.humd):4.2f} %%")
+            res.append(self.LOG_TEMP.format(dval(self.temp), dval(self.humd)))
 
         if self.has_scd4x:
-            res.append(
-                f"SCD40: {dval(self.scd40_co2):4.2f}, {dval(self.scd40_temp):4.2f} C, {dval(self.scd40_hum):4.2f} %% "
-            )
+            res.append(self.LOG_SCD40.format(dval(self.scd40_co2), dval(self.scd40_temp), dval(self.scd40_hum)))
 
         if self.has_sps30 and self.sps30_data:
-            res.append(f"SPS30: {self.sps30_data}")
+            res.append(self.LOG_SPS30.format(self.sps30.reading(self.sps30_data)))
+
+        if self.alloc_debug and self.alloc_cycles:
+            res.append(self.LOG_ALLOC.format(self.alloc_last, self.alloc_max, self.alloc_total // self.alloc_cycles))
 
         return ", ".join(res)
 
@@ -789,6 +1543,13 @@ class Sensei:
         self.logger = getLogger(__name__)
 
     def init_connections(self):
+        self.init_config()
+        self.init_network()
+        self.init_sensors()
+        self.publish_booted()
+        self.log_memory()
+
+    def init_config(self):
         self.base_init()
         self.log_memory()
 
@@ -798,29 +1559,179 @@ class Sensei:
 
         print("Loading config")
         self.load_config()
+        self.init_offline_queue()
+        if self.startup_profile is not None:
+            self.startup_profile.mark("config")
+            self.startup_profile.import_modules(self.get_startup_modules())
+            self.startup_profile.mark("imports")
         self.log_memory()
 
+    def init_network(self):
         print("\nConnecting WiFi")
         self.connect_wifi()
         self.log_memory()
 
         self.print("\nConnecting MQTT")
         self.connect_mqtt()
+        self.startup_mark("network")
         self.log_memory()
 
+    def init_perf(self):
+        if not self.perf_period:
+            return
+
+        from ph4_sense.support.perf import PerfStats
+
+        self.perf = PerfStats(self.perf_window, self.perf_alloc)
+
+    def init_sensors(self):
         self.connect_sensors()
+        self.init_perf()
+        self.scheduler = self.build_scheduler()
+        self.setup_irqs()
+        self.startup_mark("sensors")
         self.log_memory()
 
-        self.publish_booted()
-        self.log_memory()
+    def get_runtime_filters(self) -> dict:
+        return {
+            "sgp30_co2": self.eavg_sgp30_co2,
+            "sgp30_tvoc": self.eavg_sgp30_tvoc,
+            "ccs811_co2": self.eavg_css811_co2,
+            "ccs811_tvoc": self.eavg_css811_tvoc,
+        }
+
+    def get_gas_index_algorithms(self) -> dict:
+        return {"sgp41_voc": self.sgp41_filter_voc, "sgp41_nox": self.sgp41_filter_nox}
+
+    def get_runtime_state(self) -> dict:
+        """Filter and gas index state of the configured sensors, kept in RTC memory across deep sleeps"""
+        state = {key: flt.get_state() for key, flt in self.get_runtime_filters().items() if flt is not None}
+        # Wake-ups are shorter than the gas index initial blackout, the complete algorithm state is kept,
+        # get_state() is meant only for learned estimators and set_state() would mark them as learned
+        for key, alg in self.get_gas_index_algorithms().items():
+            if alg is not None:
+                state[key] = alg.get_runtime_state()
+        if self.sgp30:
+            # iaq_init() after wake-up resets the baseline, the learning time counts awake time only
+            state["sgp30"] = {
+                "learned_ms": self.update_sgp30_learned(),
+                "baseline": list(self.sgp30.baseline_co2eq_tvoc()),
+            }
+        return state
+
+    def set_runtime_state(self, state: dict):
+        for key, flt in self.get_runtime_filters().items():
+            if flt is not None and key in state:
+                flt.set_state(state[key])
+        for key, alg in self.get_gas_index_algorithms().items():
+            if alg is not None and key in state:
+                alg.set_runtime_state(state[key])
+
+        sgp30_state = state.get("sgp30")
+        if self.sgp30 and sgp30_state:
+            baseline = sgp30_state["baseline"]
+            if baseline[0] or baseline[1]:
+                self.sgp30.set_iaq_baseline(baseline[0], baseline[1])
+            self.sgp30_learned_ms = max(self.sgp30_learned_ms, sgp30_state["learned_ms"])
+
+    def load_sleep_state(self):
+        """Returns data stored by store_sleep_state() before the last deep sleep, None after a cold boot"""
+        return None
+
+    def store_sleep_state(self, data: bytes):
+        pass
+
+    def deep_sleep(self, ms: int):
+        raise NotImplementedError("Deep sleep is not supported on this platform")
+
+    def restore_runtime_state(self) -> bool:
+        try:
+            data = self.load_sleep_state()
+            if not data:
+                return False
+
+            self.set_runtime_state(json.loads(data))
+            return True
+        except Exception as e:
+            self.print_error("Sleep state restore err:", e)
+            return False
+
+    def save_runtime_state(self):
+        try:
+            self.store_sleep_state(json.dumps(self.get_runtime_state()).encode())
+        except Exception as e:
+            self.print_error("Sleep state save err:", e)
+
+    def sensors_low_power(self):
+        """Puts sensors to their low-power states before deep sleep"""
+        if self.sps30:
+            try_fnc(lambda: self.sps30.stop())  # sleep is accepted only in idle mode
+            try_fnc(lambda: self.sps30.sleep())
+        if self.sgp41:
+            try_fnc(lambda: self.sgp41.turn_off_heater())
+        # SCD4x stays in low-power periodic measurement, see connect_scd4x()
+
+    def run_until(self, deadline: int):
+        while ticks_diff(deadline, ticks_ms()) > 0:
+            self.measure_loop_body()
+            self.flush_logs()
+            self.idle_sleep(min(self.scheduler.time_to_next_ms(), max(0, ticks_diff(deadline, ticks_ms()))))
+
+    def main_duty_cycle(self):
+        """
+        Single wake-up of a battery node: sensors warm up and are sampled, readings are published
+        in one batch, sensors are put to low-power states and the board goes to deep sleep.
+        Network is connected only for publishing.
+        """
+        started = ticks_ms()
+        self.init_sensors()
+        self.scheduler.remove("report")
+        self.duty_woke_up = self.restore_runtime_state()
+
+        self.run_until(ticks_add(started, self.duty_warmup * 1000))
+        for _ in range(self.duty_samples):
+            self.run_until(ticks_add(ticks_ms(), self.measure_loop_ms))
+        self.report_log()
+
+        try:
+            self.init_network()
+            if not self.duty_woke_up:
+                self.publish_booted()
+            self.last_pub = self.last_pub_sgp = 0
+            self.publish()
+        except Exception as e:
+            self.print_error("Duty cycle publish err:", e)
+
+        self.save_runtime_state()
+        self.sensors_low_power()
+        elapsed = ticks_diff(ticks_ms(), started)
+        self.print("Duty cycle took {} ms".format(elapsed))
+        if self.udp_logger:
+            self.udp_logger.flush()
+        self.deep_sleep(max(1000, self.duty_period * 1000 - elapsed))
 
     def main(self):
-        self.init_connections()
+        self.init_config()
+        if self.duty_period:
+            return self.main_duty_cycle()
+
+        self.init_network()
+        self.init_sensors()
+        self.publish_booted()
+        self.log_memory()
+        if self.use_async:
+            return self.main_async()
 
         while True:
-            self.maybe_reconnect_mqtt()
+            self.perf_call("reconnect", self.maybe_reconnect_mqtt)
             self.measure_loop_body()
-            sleep_ms(self.measure_loop_ms)
+            self.flush_logs()
+            self.idle_sleep(self.scheduler.time_to_next_ms())
+
+    def main_async(self):
+        from ph4_sense.sense_async import AsyncRuntime
+
+        AsyncRuntime(self).run()
 
 
 def main():
@@ -0,0 +1,149 @@
+from ph4_sense.adapters import ticks_diff, ticks_ms
+from ph4_sense.scheduler import ScheduledTask
+from ph4_sense.support.aio import asyncio, run_blocking, serial_executor, sleep_ms
+
+
+class AsyncRuntime:
+    """
+    Event-loop runtime for Sensei, uasyncio on MicroPython, asyncio on CPython.
+
+    Each sensor, the publisher, reconnect logic and the UDP logger run as separate tasks,
+    so a slow MQTT reconnect or WiFi reconnect does not delay sensor sampling.
+
+    On CPython, network and file IO runs in a single worker thread: publishing, backfill, state checkpoints,
+    perf reports, reconnects and log sending. The MQTT client, the offline queue and the UDP logger
+    are thus used from one thread at a time, sensor tasks only queue log lines.
+    MicroPython has no executor, MQTT uses a client on non-blocking streams instead: messages go to an outbox
+    written by the MQTT task, reconnects and NTP sync await the socket, only DNS lookups block the loop.
+    """
+
+    IO_TASKS = ("backfill", "state", "perf")
+
+    def __init__(self, sensei):
+        self.sensei = sensei
+        self.reconnect_period_ms = 5_000
+        self.log_flush_ms = 250
+        self.event_poll_ms = 20
+        self.outbox_poll_ms = 50
+        self.executor = None
+
+    def run(self):
+        asyncio.run(self.main())
+
+    async def run_io(self, fnc):
+        return await run_blocking(fnc, self.executor)
+
+    async def main(self):
+        sensei = self.sensei
+        sensei.async_mode = True
+        self.executor = sensei.io_executor = serial_executor()
+
+        # Without a worker, buffered logger appends to its ring directly, it does not block
+        if self.executor is not None or not (sensei.udp_logger and sensei.udp_logger.buffered):
+            sensei.log_queue = []
+        if self.executor is None:
+            sensei.mqtt_outbox = []
+
+        tasks = []
+        for task in sensei.scheduler.tasks:
+            if task.name in self.IO_TASKS:
+                tasks.append(asyncio.create_task(self.io_task(task)))
+            elif task.name != "report":
+                tasks.append(asyncio.create_task(self.sensor_task(task)))
+
+        tasks.append(asyncio.create_task(self.publish_task()))
+        tasks.append(asyncio.create_task(self.reconnect_task()))
+        tasks.append(asyncio.create_task(self.logger_task()))
+        if sensei.mqtt_outbox is not None:
+            tasks.append(asyncio.create_task(self.mqtt_task()))
+        await asyncio.gather(*tasks)
+
+    async def sensor_task(self, task: ScheduledTask):
+        scheduler = self.sensei.scheduler
+        await self.wait_due(task)
+        while True:
+            try:
+                if task.start is not None:
+                    ready_at = task.run_start()
+                    if ready_at is not None:
+                        await sleep_ms(max(0, ticks_diff(ready_at, ticks_ms())))
+                task.run()
+            except Exception as e:
+                self.sensei.print_error("Task {} err:".format(task.name), e)
+
+            scheduler.reschedule(task, ticks_ms())
+            await self.wait_due(task)
+
+    async def io_task(self, task: ScheduledTask):
+        """Scheduled task doing network or file IO, runs in the IO worker"""
+        scheduler = self.sensei.scheduler
+        await self.wait_due(task)
+        while True:
+            try:
+                await self.run_io(task.run)
+            except Exception as e:
+                self.sensei.print_error("Task {} err:".format(task.name), e)
+
+            scheduler.reschedule(task, ticks_ms())
+            await self.wait_due(task)
+
+    async def wait_due(self, task: ScheduledTask):
+        """Sleeps until the task deadline, event tasks wake up early when signaled"""
+        while not task.signaled:
+            remaining = ticks_diff(task.next_due, ticks_ms())
+            if remaining <= 0:
+                return
+            await sleep_ms(min(remaining, self.event_poll_ms) if task.event else remaining)
+
+    async def publish_task(self):
+        sensei = self.sensei
+        while True:
+            try:
+                sensei.report_log()
+                await self.run_io(sensei.publish)
+            except Exception as e:
+                sensei.print_error("Publish task err:", e)
+            await sleep_ms(sensei.measure_loop_ms)
+
+    async def reconnect_task(self):
+        sensei = self.sensei
+        while True:
+            try:
+                if sensei.wifi_needs_reconnect():
+                    await sensei.connect_wifi_async(force=True)
+                    await sensei.maybe_reconnect_mqtt_async(force=True)
+                else:
+                    await sensei.maybe_reconnect_mqtt_async()
+            except Exception as e:
+                sensei.print_error("Reconnect task err:", e)
+            await sleep_ms(self.reconnect_period_ms)
+
+    async def mqtt_task(self):
+        """Writes the MQTT outbox, connected at boot by the blocking client, replaced by the non-blocking one"""
+        sensei = self.sensei
+        await sensei.maybe_reconnect_mqtt_async(force=True)
+        while True:
+            try:
+                await sensei.flush_mqtt_outbox()
+            except Exception as e:
+                sensei.print_error("MQTT task err:", e)
+            await sleep_ms(self.outbox_poll_ms)
+
+    async def logger_task(self):
+        sensei = self.sensei
+        while True:
+            if sensei.udp_logger and (sensei.log_queue or sensei.udp_logger.buffered):
+                try:
+                    await self.run_io(self.send_logs)
+                except Exception as e:
+                    sensei.print_cli("Logger task err:", e)
+            await sleep_ms(self.log_flush_ms)
+
+    def send_logs(self):
+        """Moves queued log lines to the UDP logger and flushes its buffer, non-blocking socket"""
+        sensei = self.sensei
+        queue = sensei.log_queue
+        while queue:
+            level, msg, args = queue.pop(0)  # lines queued meanwhile by other tasks are not lost
+            sensei.udp_logger.log(level, msg, *args)
+        sensei.udp_logger.maybe_flush()
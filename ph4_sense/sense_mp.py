@@ -2,12 +2,13 @@ import machine
 import network
 from umqtt.robust import MQTTClient
 
-from ph4_sense.adapters import sleep_ms, time, updateLogger
+from ph4_sense.adapters import sleep_ms, ticks_diff, ticks_ms, time, updateLogger
 from ph4_sense.logger_mp import MpLogger
 from ph4_sense.sense import Sensei
-from ph4_sense.support.uart_mp import UartMp
 from ph4_sense.utils import try_fnc
 
+LOG_PREFIXES = {10: "log[10]:", 20: "log[20]:", 30: "log[30]:", 40: "log[40]:", 50: "log[50]:"}
+
 # Set up your SPG30 sensor pin connections
 # https://randomnerdtutorials.com/esp32-i2c-communication-arduino-ide/
 # SPG30_SCL_PIN = 22
@@ -45,14 +46,83 @@ class SenseiMp(Sensei):
             sda_pin=sda_pin,
         )
 
-        updateLogger(MpLogger(self.log_fnc))
+        self.boot_ticks = 0  # ticks_ms() counts from reset, boot time includes firmware start and imports
+        self.ntp_sync = True
+        self.wifi_connect_timeout_ms = 30_000
+        self.irq_handlers = []  # (pin, task)
+        self.mp_logger = MpLogger(self.log_fnc, self.log_level)
+        updateLogger(self.mp_logger)
+
+    def load_config(self):
+        super().load_config()
+        self.mp_logger.setLevel(self.log_level)
+
+    def get_startup_modules(self):
+        res = super().get_startup_modules()
+        if self.has_wifi and "ph4_sense.support.state_store" not in res:
+            res.append("ph4_sense.support.state_store")  # clock check of sync_time()
+        if self.has_zh03b or (self.has_sps30 and isinstance(self.sps30_uart, dict)):
+            res.append("ph4_sense.support.uart_mp")
+        if self.use_async:
+            res.append("ph4_sense.support.mqtt_async")
+        return res
 
     def log_fnc(self, level, msg, *args, **kwargs):
-        if level < 20:  # do not log debug events
-            return
-
-        msg_use = msg if not args else msg % args
-        self.print("log[{}]: {}".format(level, msg_use))
+        # Called only for enabled levels, message is formatted once here, UDP logger filters by the same level
+        prefix, line = LOG_PREFIXES.get(level, "log:"), msg % args if args else msg
+        self.print_cli(prefix, line)
+        self.print_logger(level, prefix, line)
+
+    def attach_irq(self, pin: int, task) -> bool:
+        import micropython
+
+        irq_pin = machine.Pin(pin, machine.Pin.IN, machine.Pin.PULL_UP)
+        signal = self.scheduler.signal
+
+        def handler(_pin):
+            try:
+                micropython.schedule(signal, task)
+            except RuntimeError:
+                pass  # schedule queue full, fallback timeout picks the data up
+
+        # Data-ready outputs (CCS811 nINT) are active low
+        irq_pin.irq(trigger=machine.Pin.IRQ_FALLING, handler=handler)
+        self.irq_handlers.append((irq_pin, task))
+        return True
+
+    def setup_irqs(self):
+        super().setup_irqs()
+        if self.light_sleep and self.irq_handlers:
+            import esp32
+
+            # ext0 wakes on a single pin, other pins are checked at the next deadline
+            esp32.wake_on_ext0(pin=self.irq_handlers[0][0], level=esp32.WAKEUP_ALL_LOW)
+
+    def idle_sleep(self, ms: int):
+        if not self.irq_active or not self.light_sleep:
+            return super().idle_sleep(ms)
+
+        if ms > 0:
+            machine.lightsleep(ms)
+
+        # Edges during light sleep do not trigger IRQ handlers, check asserted pins instead
+        for irq_pin, task in self.irq_handlers:
+            if not irq_pin.value():
+                self.scheduler.signal(task)
+
+    def load_sleep_state(self):
+        if machine.reset_cause() != machine.DEEPSLEEP_RESET:
+            return None
+        return machine.RTC().memory()
+
+    def store_sleep_state(self, data: bytes):
+        # RTC memory survives deep sleep, 2 kB on ESP32
+        if len(data) > 2048:
+            raise ValueError("Sleep state too large: {} B".format(len(data)))
+        machine.RTC().memory(data)
+
+    def deep_sleep(self, ms: int):
+        machine.deepsleep(ms)
 
     def start_bus(self):
         self.i2c = machine.SoftI2C(scl=machine.Pin(self.scl_pin), sda=machine.Pin(self.sda_pin))
@@ -62,6 +132,8 @@ class SenseiMp(Sensei):
         if desc["type"] != "uart":
             raise ValueError("Only uart type is supported")
 
+        from ph4_sense.support.uart_mp import UartMp
+
         def builder(**kwargs):
             return UartMp(machine.UART(desc["port"], **kwargs))
 
@@ -100,6 +172,90 @@ class SenseiMp(Sensei):
 
         print("WiFi status:", self.sta_if.status())
         print("WiFi ifconfig:", self.sta_if.ifconfig())
+        self.sync_time()
+
+    def sync_time(self):
+        """Sets RTC from NTP, wall clock is needed to check age of the persisted sensor state"""
+        from ph4_sense.support.state_store import clock_valid
+
+        if not self.ntp_sync or clock_valid():
+            return
+
+        try:
+            import ntptime
+
+            ntptime.settime()
+            self.print("Time synced:", time.localtime())
+        except Exception as e:
+            self.print_error("NTP sync err:", e)
+
+    async def sync_time_async(self):
+        """NTP sync on a non-blocking UDP socket, the event loop keeps running while waiting for the reply"""
+        import socket
+        import struct
+
+        import ntptime
+
+        from ph4_sense.support.aio import sleep_ms as async_sleep_ms
+        from ph4_sense.support.state_store import clock_valid
+
+        if not self.ntp_sync or clock_valid():
+            return
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.setblocking(False)
+            query = bytearray(48)
+            query[0] = 0x1B  # LI 0, version 3, client mode
+            sock.sendto(query, socket.getaddrinfo(ntptime.host, 123)[0][-1])
+
+            started = ticks_ms()
+            while True:
+                try:
+                    msg = sock.recv(48)
+                    break
+                except OSError:
+                    if ticks_diff(ticks_ms(), started) > 2_000:
+                        raise OSError("NTP timeout")
+                    await async_sleep_ms(50)
+
+            # Transmit timestamp seconds, NTP epoch 1900 to the device epoch
+            tm = time.gmtime(struct.unpack("!I", msg[40:44])[0] - getattr(ntptime, "NTP_DELTA", 3155673600))
+            machine.RTC().datetime((tm[0], tm[1], tm[2], tm[6] + 1, tm[3], tm[4], tm[5], 0))
+            self.print("Time synced:", time.localtime())
+        except Exception as e:
+            self.print_error("NTP sync err:", e)
+        finally:
+            sock.close()
+
+    async def connect_wifi_async(self, force=False):
+        """Non-blocking WiFi (re)connect used by the async runtime, skips network scan"""
+        from ph4_sense.support.aio import sleep_ms as async_sleep_ms
+
+        if not self.has_wifi:
+            return
+
+        if force or not self.sta_if:
+            self.sta_if = network.WLAN(network.STA_IF)
+            self.sta_if.active(True)
+
+        if not self.sta_if.isconnected():
+            self.print("Connecting to WiFi: " + self.wifi_ssid)
+            self.last_wifi_reconnect = time.time()
+            self.sta_if.connect(self.wifi_ssid, self.wifi_passphrase)
+            failed = (network.STAT_WRONG_PASSWORD, network.STAT_NO_AP_FOUND, network.STAT_CONNECT_FAIL)
+            started = ticks_ms()
+            while not self.sta_if.isconnected():
+                status = self.sta_if.status()
+                if status in failed or ticks_diff(ticks_ms(), started) > self.wifi_connect_timeout_ms:
+                    # Stop the attempt, reconnect task retries in its next period
+                    try_fnc(lambda: self.sta_if.disconnect())
+                    raise OSError("WiFi connect failed, status {}".format(status))
+                await async_sleep_ms(500)
+
+            self.sta_if.config(reconnects=-1)
+            self.print("WiFi connected")
+            await self.sync_time_async()
 
     def check_wifi_ok(self):
         """
@@ -112,8 +268,12 @@ class SenseiMp(Sensei):
             * ``STAT_GOT_IP`` -- connection successful.
         :return:
         """
+        if self.wifi_needs_reconnect():
+            self.on_wifi_reconnect()
+
+    def wifi_needs_reconnect(self) -> bool:
         if not self.has_wifi:
-            return
+            return False
 
         try:
             if not self.sta_if.isconnected():
@@ -122,20 +282,23 @@ class SenseiMp(Sensei):
             wifi_status = self.sta_if.status()
             is_connected = wifi_status == network.STAT_GOT_IP
             if is_connected:
-                return
+                return False
 
             t = time.time()
             is_connecting = wifi_status == network.STAT_CONNECTING
             if is_connecting and t - self.last_wifi_reconnect < self.wifi_reconnect_timeout:
-                return
+                return False
 
             try_fnc(lambda: self.sta_if.disconnect())
 
         except Exception as e:
-            self.print("Network exception: ", e)
+            self.print_error("Network exception: ", e)
 
         # When control flow gets here - reconnect
-        self.on_wifi_reconnect()
+        return True
+
+    def is_online(self) -> bool:
+        return super().is_online() and (not self.has_wifi or (self.sta_if is not None and self.sta_if.isconnected()))
 
     def create_mqtt_client(self):
         # https://notebook.community/Wei1234c/Elastic_Network_of_Things_with_MQTT_and_MicroPython/notebooks/test/MQTT%20client%20test%20-%20MicroPython
@@ -152,8 +315,24 @@ class SenseiMp(Sensei):
         client.subscribe(self.mqtt_topic_sub)
         return client
 
+    async def connect_mqtt_async(self):
+        if self.mqtt_outbox is None:
+            return await super().connect_mqtt_async()
+
+        from ph4_sense.support.mqtt_async import AsyncMqttClient
+
+        self.mqtt_online = False
+        client = AsyncMqttClient(f"esp32_client/{self.mqtt_sensor_id}", self.mqtt_broker, self.mqtt_port, keepalive=60)
+        await client.connect()
+        await client.subscribe(self.mqtt_topic_sub)
+        self.mqtt_client = client
+        self.mqtt_online = True
+
     def publish_msg(self, topic: str, message: str):
-        self.mqtt_client.publish(topic, message)
+        if self.mqtt_outbox is not None:
+            self.queue_mqtt_msg(topic, message)
+        else:
+            self.mqtt_client.publish(topic, message)
         self.print(f"Published {topic}:", message)
 
 
@@ -1,5 +1,7 @@
 import math
 
+from ph4_sense.support.batch import get_numpy, is_ndarray
+
 # Try importing Micropython const for usage in Mpy, optimization
 try:
     from micropython import const
@@ -69,6 +71,28 @@ class GasIndexAlgorithm:
     MEAN_VARIANCE_ESTIMATOR__ADDITIONAL_GAMMA_MEAN_SCALING = const(8.0)
     MEAN_VARIANCE_ESTIMATOR__FIX16_MAX = const(32767.0)
 
+    # Attributes updated by process(), the rest is derived from the algorithm type and sampling interval
+    RUNTIME_STATE = (
+        "uptime",
+        "sraw",
+        "gas_index",
+        "mean_variance_estimator_initialized",
+        "mean",
+        "std",
+        "sraw_offset",
+        "rgamma_mean",
+        "rgamma_variance",
+        "uptime_gamma",
+        "uptime_gating",
+        "gating_duration_minutes",
+        "mox_model_sraw_mean",
+        "mox_model_sraw_std",
+        "adaptive_lowpass_initialized",
+        "x1",
+        "x2",
+        "x3",
+    )
+
     def __init__(self, algorithm_type, sampling_interval=DEFAULT_SAMPLING_INTERVAL):
         self.algorithm_type = algorithm_type
         self.sampling_interval = sampling_interval
@@ -198,6 +222,265 @@ class GasIndexAlgorithm:
 
         return self.get_gas_index()
 
+    def process_many(self, sraw_values):
+        """
+        Processes a series of raw samples, returns the series of gas indices.
+        Bit-compatible with calling process() for each sample, state is updated the same way,
+        so long series can be processed chunk by chunk.
+
+        Input conditioning (range check, clipping, holding the last valid sample) is vectorized
+        with numpy for numpy input. The estimator, MOX model, sigmoid and lowpass are recursive
+        (each sample depends on the state updated by the previous one), so they run as a single
+        inlined loop over local variables instead of per-sample method calls.
+        """
+        n = len(sraw_values)
+        res = [0] * n
+        ix = 0
+        while ix < n and self.uptime <= self.INITIAL_BLACKOUT:
+            self.uptime += self.sampling_interval
+            res[ix] = self.get_gas_index()
+            ix += 1
+
+        if ix < n:
+            self._process_many_core(self._condition_sraw_many(sraw_values, ix), res, ix)
+
+        return get_numpy().array(res) if is_ndarray(sraw_values) else res
+
+    def _condition_sraw_many(self, sraw_values, start):
+        """Offset-corrected sraw series, invalid samples hold the previous valid value, as in process()"""
+        sraw_min = self.sraw_minimum
+        if is_ndarray(sraw_values):
+            np = get_numpy()
+            raw = np.asarray(sraw_values[start:], dtype=float)
+            cond = np.clip(raw, sraw_min + 1, sraw_min + 32767) - sraw_min
+            held = np.where((raw > 0) & (raw < 65000), np.arange(len(raw)), -1)
+            np.maximum.accumulate(held, out=held)
+            return np.where(held >= 0, cond[np.maximum(held, 0)], self.sraw).tolist()
+
+        res = []
+        sraw_last = self.sraw
+        for ix in range(start, len(sraw_values)):
+            sraw = sraw_values[ix]
+            if 0 < sraw < 65000:
+                if sraw < (sraw_min + 1):
+                    sraw = sraw_min + 1
+                elif sraw > (sraw_min + 32767):
+                    sraw = sraw_min + 32767
+                sraw_last = float(sraw - sraw_min)
+            res.append(sraw_last)
+        return res
+
+    def _process_many_core(self, sraw_series, res, offset):
+        exp = math.exp
+        sampling_interval = self.sampling_interval
+        is_nox = self.algorithm_type == self.ALGORITHM_TYPE_NOX
+        is_voc = self.algorithm_type == self.ALGORITHM_TYPE_VOC
+        index_gain = self.index_gain
+        index_offset = self.index_offset
+        sigmoid_l = self.SIGMOID_L
+        scaled_k = self.scaled_sigmoid_K
+        scaled_x0 = self.scaled_sigmoid_X0
+        scaled_offset_default = self.scaled_sigmoid_offset_default
+        if scaled_offset_default == 1.0:
+            shift = (500.0 / 499.0) * (1.0 - index_offset)
+        else:
+            shift = (self.SIGMOID_L - (5.0 * index_offset)) / 4.0
+
+        lowpass_a1 = self.lowpass_A1
+        lowpass_a2 = self.lowpass_A2
+        lp_alpha = self.LP_ALPHA
+        lp_tau_fast = self.LP_TAU_FAST
+        lp_tau_slow = self.LP_TAU_SLOW
+
+        gamma_scaling = self.MEAN_VARIANCE_ESTIMATOR__GAMMA_SCALING
+        gamma_mean_scaling = self.MEAN_VARIANCE_ESTIMATOR__ADDITIONAL_GAMMA_MEAN_SCALING
+        uptime_limit = self.MEAN_VARIANCE_ESTIMATOR__FIX16_MAX - sampling_interval
+        gamma_mean_base = self.gamma_mean
+        gamma_variance_base = self.gamma_variance
+        gamma_initial_mean = self.gamma_initial_mean
+        gamma_initial_variance = self.gamma_initial_variance
+        init_duration_mean = self.init_duration_mean
+        init_duration_variance = self.init_duration_variance
+        gating_threshold = self.gating_threshold
+        gating_threshold_initial = self.GATING_THRESHOLD_INITIAL
+        gating_threshold_transition = self.GATING_THRESHOLD_TRANSITION
+        init_transition_mean = self.INIT_TRANSITION_MEAN
+        init_transition_variance = self.INIT_TRANSITION_VARIANCE
+        gating_max_ratio = self.GATING_MAX_RATIO
+        gating_max_duration_minutes = self.gating_max_duration_minutes
+
+        def sigmoid(sample, x0, k):
+            x = k * (sample - x0)
+            if x < -50.0:
+                return 1.0
+            elif x > 50.0:
+                return 0.0
+            return 1.0 / (1.0 + exp(x))
+
+        # State
+        gas_index = self.gas_index
+        sraw = self.sraw
+        mve_initialized = self.mean_variance_estimator_initialized
+        mean = self.mean
+        std = self.std
+        sraw_offset = self.sraw_offset
+        rgamma_mean = self.rgamma_mean
+        rgamma_variance = self.rgamma_variance
+        uptime_gamma = self.uptime_gamma
+        uptime_gating = self.uptime_gating
+        gating_duration_minutes = self.gating_duration_minutes
+        mox_mean = self.mox_model_sraw_mean
+        mox_std = self.mox_model_sraw_std
+        lp_initialized = self.adaptive_lowpass_initialized
+        x1 = self.x1
+        x2 = self.x2
+        x3 = self.x3
+
+        for ix, sraw in enumerate(sraw_series, offset):
+            # MOX model, scaled sigmoid
+            if is_voc or mve_initialized:
+                if is_nox:
+                    gas_index = ((sraw - mox_mean) / self.SRAW_STD_NOX) * index_gain
+                else:
+                    gas_index = ((sraw - mox_mean) / (-1 * (mox_std + self.SRAW_STD_BONUS_VOC))) * index_gain
+
+                x = scaled_k * (gas_index - scaled_x0)
+                if x < -50.0:
+                    gas_index = sigmoid_l
+                elif x > 50.0:
+                    gas_index = 0.0
+                elif gas_index >= 0.0:
+                    gas_index = ((sigmoid_l + shift) / (1.0 + exp(x))) - shift
+                else:
+                    gas_index = (index_offset / scaled_offset_default) * (sigmoid_l / (1.0 + exp(x)))
+            else:
+                gas_index = index_offset
+
+            # Adaptive lowpass
+            if not lp_initialized:
+                x1 = x2 = x3 = gas_index
+                lp_initialized = True
+
+            x1 = (1.0 - lowpass_a1) * x1 + lowpass_a1 * gas_index
+            x2 = (1.0 - lowpass_a2) * x2 + lowpass_a2 * gas_index
+            f1 = exp(lp_alpha * abs(x1 - x2))
+            tau_a = (lp_tau_slow - lp_tau_fast) * f1 + lp_tau_fast
+            a3 = sampling_interval / (tau_a + sampling_interval)
+            x3 = (1.0 - a3) * x3 + a3 * gas_index
+            gas_index = x3
+            if gas_index < 0.5:
+                gas_index = 0.5
+
+            # Mean variance estimator
+            if sraw > 0.0:
+                if not mve_initialized:
+                    mve_initialized = True
+                    sraw_offset = sraw
+                    mean = 0.0
+                else:
+                    if mean >= 100.0 or mean <= -100.0:
+                        sraw_offset += mean
+                        mean = 0.0
+
+                    if uptime_gamma < uptime_limit:
+                        uptime_gamma += sampling_interval
+                    if uptime_gating < uptime_limit:
+                        uptime_gating += sampling_interval
+
+                    sigmoid_gamma_mean = sigmoid(uptime_gamma, init_duration_mean, init_transition_mean)
+                    gamma_mean = gamma_mean_base + (gamma_initial_mean - gamma_mean_base) * sigmoid_gamma_mean
+                    gating_threshold_mean = gating_threshold + (gating_threshold_initial - gating_threshold) * sigmoid(
+                        uptime_gating, init_duration_mean, init_transition_mean
+                    )
+                    sigmoid_gating_mean = sigmoid(gas_index, gating_threshold_mean, gating_threshold_transition)
+                    rgamma_mean = sigmoid_gating_mean * gamma_mean
+
+                    sigmoid_gamma_variance = sigmoid(uptime_gamma, init_duration_variance, init_transition_variance)
+                    gamma_variance = gamma_variance_base + (gamma_initial_variance - gamma_variance_base) * (
+                        sigmoid_gamma_variance - sigmoid_gamma_mean
+                    )
+                    gating_threshold_variance = gating_threshold + (
+                        gating_threshold_initial - gating_threshold
+                    ) * sigmoid(uptime_gating, init_duration_variance, init_transition_variance)
+                    sigmoid_gating_variance = sigmoid(gas_index, gating_threshold_variance, gating_threshold_transition)
+                    rgamma_variance = sigmoid_gating_variance * gamma_variance
+
+                    gating_duration_minutes += (sampling_interval / 60.0) * (
+                        ((1.0 - sigmoid_gating_mean) * (1.0 + gating_max_ratio)) - gating_max_ratio
+                    )
+                    if gating_duration_minutes < 0.0:
+                        gating_duration_minutes = 0.0
+                    if gating_duration_minutes > gating_max_duration_minutes:
+                        uptime_gating = 0.0
+
+                    delta_sgp = ((sraw - sraw_offset) - mean) / gamma_scaling
+                    c = std + delta_sgp if delta_sgp >= 0 else std - delta_sgp
+                    additional_scaling = 1.0 if c <= 1440.0 else (c / 1440.0) ** 2
+                    std = math.sqrt(additional_scaling * (gamma_scaling - rgamma_variance)) * math.sqrt(
+                        (std**2 / (gamma_scaling * additional_scaling))
+                        + (rgamma_variance * delta_sgp**2 / additional_scaling)
+                    )
+                    mean += (rgamma_mean * delta_sgp) / gamma_mean_scaling
+
+                mox_std = std
+                mox_mean = mean + sraw_offset
+
+            res[ix] = int(gas_index + 0.5)
+
+        self.gas_index = gas_index
+        self.sraw = sraw
+        self.mean_variance_estimator_initialized = mve_initialized
+        self.mean = mean
+        self.std = std
+        self.sraw_offset = sraw_offset
+        self.rgamma_mean = rgamma_mean
+        self.rgamma_variance = rgamma_variance
+        self.uptime_gamma = uptime_gamma
+        self.uptime_gating = uptime_gating
+        self.gating_duration_minutes = gating_duration_minutes
+        self.mox_model_sraw_mean = mox_mean
+        self.mox_model_sraw_std = mox_std
+        self.adaptive_lowpass_initialized = lp_initialized
+        self.x1 = x1
+        self.x2 = x2
+        self.x3 = x3
+
+    def get_state(self):
+        """
+        Current learned state of the mean variance estimator, as Sensirion reference get_states().
+        Can be used with set_state() to resume operation after a short interruption, skipping
+        the initial learning phase. Reference recommends to use it after at least 3 hours of operation,
+        see is_state_valid().
+        """
+        return {"mean": self.mve_get_mean(), "std": self.mve_get_std()}
+
+    def set_state(self, state):
+        """Restores state obtained by get_state(), as Sensirion reference set_states()"""
+        self.mean = state["mean"]
+        self.sraw_offset = 0.0
+        self.std = state["std"]
+        self.uptime_gamma = self.PERSISTENCE_UPTIME_GAMMA
+        self.mean_variance_estimator_initialized = True
+        self.mox_model_set_parameters(self.mve_get_std(), self.mve_get_mean())
+        self.sraw = state["mean"]
+
+    def get_runtime_state(self):
+        """
+        Complete algorithm state, including uptime, the mean variance estimator and the low-pass filter.
+        set_runtime_state() restores it exactly, so the algorithm continues where it stopped, e.g., after deep sleep.
+        Unlike get_state(), it can be used at any time, also during the initial blackout and learning.
+        """
+        return [getattr(self, name) for name in self.RUNTIME_STATE]
+
+    def set_runtime_state(self, state):
+        """Restores state obtained by get_runtime_state()"""
+        for name, value in zip(self.RUNTIME_STATE, state):
+            setattr(self, name, value)
+
+    def is_state_valid(self):
+        """True if the estimator has been learning long enough for its state to be persisted"""
+        return self.mean_variance_estimator_initialized and self.uptime_gamma >= self.PERSISTENCE_UPTIME_GAMMA
+
     def get_gas_index(self):
         # Return the integer part of gas index by adding 0.5 for rounding
         return int(self.gas_index + 0.5)
@@ -29,6 +29,7 @@ Implementation Notes
 
 """
 from ph4_sense.adapters import const, sleep_ms
+from ph4_sense.support.split_measurement import SplitMeasurement
 
 try:
     from machine import I2C
@@ -49,9 +50,10 @@ AHTX0_CMD_TRIGGER: int = const(0xAC)  # Trigger reading command
 AHTX0_CMD_SOFTRESET: int = const(0xBA)  # Soft reset command
 AHTX0_STATUS_BUSY: int = const(0x80)  # Status bit for busy
 AHTX0_STATUS_CALIBRATED: int = const(0x08)  # Status bit for calibrated
+AHTX0_MEASURE_MS: int = const(80)  # Measurement time after trigger, datasheet section 5.4
 
 
-class AHTx0:
+class AHTx0(SplitMeasurement):
     """
     Interface library for AHT10/AHT20 temperature+humidity sensors
 
@@ -142,15 +144,31 @@ class AHTx0:
         return self._temp
 
     def read_temperature_humidity(self):
-        self._readdata()
+        if not self.pending:
+            self.start_measurement()
+        return self.collect()
+
+    def start_measurement(self) -> int:
+        """Triggers temp/humidity measurement, returns ticks_ms when the result can be collected"""
+        self._trigger()
+        return self._measurement_started(AHTX0_MEASURE_MS)
+
+    def _collect(self):
+        self._read_result()
         return self._temp, self._humidity
 
-    def _readdata(self) -> None:
-        """Internal function for triggering the AHT to read temp/humidity"""
+    def _trigger(self) -> None:
         self.cmd_buf[0] = AHTX0_CMD_TRIGGER
         self.cmd_buf[1] = 0x33
         self.cmd_buf[2] = 0x00
         self.i2c_bus.writeto(self.address, self.cmd_buf)  # [:3]
+
+    def _readdata(self) -> None:
+        """Internal function for triggering the AHT to read temp/humidity"""
+        self._trigger()
+        self._read_result()
+
+    def _read_result(self) -> None:
         while self.status & AHTX0_STATUS_BUSY:
             sleep_ms(12)
 
@@ -48,3 +48,6 @@ class MicroCCS811(CCS811Wrapper):
 
     def app_valid(self) -> bool:
         return self._sensor.app_valid.get()
+
+    def set_interrupt(self, enabled: bool):
+        self._sensor.interrupt_enabled.set(enabled)
@@ -127,8 +127,8 @@ class CCS811:
 
         # set up the registers
         register_status = BitRegister(i2c_bus, address, 0x00, 1)
-        register_meas_mode = BitRegister(i2c_bus, address, 0x01, 1)
-        register_hw_id = BitRegister(i2c_bus, address, 0x20, 1)
+        register_meas_mode = self.register_meas_mode = BitRegister(i2c_bus, address, 0x01, 1, cacheable=True)
+        register_hw_id = BitRegister(i2c_bus, address, 0x20, 1, cacheable=True)
 
         self.error = ROBit(register_status, 0)  # True when an error has occurred.
         self.data_ready = ROBit(register_status, 3)  # True when new data has been read.
@@ -159,13 +159,13 @@ class CCS811:
             )
 
         hw_ver = register_hw_ver.read()
-        self.sensor_helper.log_info(f"CCS811 hw ver: {hex(hw_ver[0])}")
+        self.sensor_helper.log_info("CCS811 hw ver: %x", hw_ver[0])
 
         boot_ver = register_fw_boot_ver.read()
-        self.sensor_helper.log_info(f"CCS811 boot ver: {hex(boot_ver[0])}{hex(boot_ver[1])}")
+        self.sensor_helper.log_info("CCS811 boot ver: %x.%x", boot_ver[0], boot_ver[1])
 
         app_ver = register_fw_app_ver.read()
-        self.sensor_helper.log_info(f"CCS811 app ver: {hex(app_ver[0])}{hex(app_ver[1])}")
+        self.sensor_helper.log_info("CCS811 app ver: %x.%x", app_ver[0], app_ver[1])
 
         # try to start the app
         self._i2c_read_words_from_cmd(_BOOTLOADER_APP_START, 150, None)
@@ -176,9 +176,10 @@ class CCS811:
             r_error = self.error_code  # clears error flag
             self.sensor_helper.log_info(
                 "CCS811 Error: Device returned an error! Try removing and reapplying power to "
-                "the device and running the code again. Err: {}, err: {}, str: {}".format(
-                    err, r_error, ccs811_err_to_str(r_error)
-                )
+                "the device and running the code again. Err: %s, err: %s, str: %s",
+                err,
+                r_error,
+                ccs811_err_to_str(r_error),
             )
 
         fw_mode = self.fw_mode.get()
@@ -189,11 +190,11 @@ class CCS811:
             )
 
         self.sensor_helper.log_info("Initially looks ok, fw_mode: %s, err: %s", fw_mode, err)
-        self.interrupt_enabled.set(False)
-        sleep_ms(_SLEEP_MS_CONST)
 
-        # default to read every second
-        self.drive_mode.set(drive_mode)
+        # Interrupt and drive mode (default to read every second) set in a single register write
+        with self.register_meas_mode.transaction():
+            self.interrupt_enabled.set(False)
+            self.drive_mode.set(drive_mode)
         sleep_ms(_SLEEP_MS_CONST)
         self.sensor_helper.log_info("Drive mode %s", self.drive_mode.get())
 
@@ -235,8 +236,9 @@ class CCS811:
         Later the same integer can be used in order
         to set a new baseline.
         """
-        buf = self._i2c_read_words_from_cmd(_BASELINE, 20, bytearray(2))
-        return ustruct.unpack("<H", buf)[0]
+        with self.sensor_helper.lease_buffer(2) as buf:
+            self._i2c_read_words_from_cmd(_BASELINE, 20, buf)
+            return ustruct.unpack_from("<H", buf)[0]
 
     @baseline.setter
     def baseline(self, baseline_int: int) -> None:
@@ -244,10 +246,10 @@ class CCS811:
         The property lets you set a new baseline. As a value accepts
         integer which represents packed baseline 2 bytes value.
         """
-        buf = bytearray(3)
-        buf[0] = _BASELINE
-        ustruct.pack_into("<H", buf, 1, baseline_int)
-        self.i2c_bus.writeto(self.address, buf)
+        with self.sensor_helper.lease_buffer(3) as buf:
+            buf[0] = _BASELINE
+            ustruct.pack_into("<H", buf, 1, baseline_int)
+            self.i2c_bus.writeto(self.address, buf)
 
     @property
     def tvoc(self) -> Optional[int]:  # pylint: disable=invalid-name
@@ -268,9 +270,10 @@ class CCS811:
            Hardware support removed by vendor
 
         Temperature based on optional thermistor in Celsius."""
-        buf = self._i2c_read_words_from_cmd(_NTC, 20, bytearray(4))
-        vref = (buf[0] << 8) | buf[1]
-        vntc = (buf[2] << 8) | buf[3]
+        with self.sensor_helper.lease_buffer(4) as buf:
+            self._i2c_read_words_from_cmd(_NTC, 20, buf)
+            vref = (buf[0] << 8) | buf[1]
+            vntc = (buf[2] << 8) | buf[3]
 
         # From ams ccs811 app note 000925
         # https://download.ams.com/content/download/9059/13027/version/1/file/CCS811_Doc_cAppNote-Connecting-NTC-Thermistor_AN000372_v1..pdf
@@ -298,11 +301,10 @@ class CCS811:
         # 0x00. As an example 23.5% temperature would be 0x61, 0x00.
         temperature = int((temperature + 25) * 512)
 
-        buf = bytearray(5)
-        buf[0] = _ENV_DATA
-        ustruct.pack_into(">HH", buf, 1, humidity, temperature)
-
-        self.i2c_bus.writeto(self.address, buf)
+        with self.sensor_helper.lease_buffer(5) as buf:
+            buf[0] = _ENV_DATA
+            ustruct.pack_into(">HH", buf, 1, humidity, temperature)
+            self.i2c_bus.writeto(self.address, buf)
 
     def set_interrupt_thresholds(self, low_med: int, med_high: int, hysteresis: int) -> None:
         """Set the thresholds used for triggering the interrupt based on eCO2.
@@ -312,17 +314,14 @@ class CCS811:
         :param int low_med: Boundary between low and medium ranges
         :param int med_high: Boundary between medium and high ranges
         :param int hysteresis: Minimum difference between reads"""
-        buf = bytearray(
-            [
-                _THRESHOLDS,
-                ((low_med >> 8) & 0xF),
-                (low_med & 0xF),
-                ((med_high >> 8) & 0xF),
-                (med_high & 0xF),
-                hysteresis,
-            ]
-        )
-        self.i2c_bus.writeto(self.address, buf)
+        with self.sensor_helper.lease_buffer(6) as buf:
+            buf[0] = _THRESHOLDS
+            buf[1] = (low_med >> 8) & 0xF
+            buf[2] = low_med & 0xF
+            buf[3] = (med_high >> 8) & 0xF
+            buf[4] = med_high & 0xF
+            buf[5] = hysteresis
+            self.i2c_bus.writeto(self.address, buf)
 
     def reset(self) -> None:
         """Initiate a software reset, switches device to a boot mode"""
@@ -337,5 +336,6 @@ class CCS811:
 
     def reboot_to_mode(self, drive_mode=DRIVE_MODE_1SEC):
         self.reset()
+        self.register_meas_mode.invalidate()
         sleep_ms(12)
         self.on_boot(drive_mode)
@@ -36,6 +36,10 @@ class ICSS811:
     def app_valid(self) -> bool:
         raise NotImplementedError
 
+    def set_interrupt(self, enabled: bool):
+        """Enables nINT pin assertion on each new sample (data ready)"""
+        raise NotImplementedError
+
 
 class CCS811Wrapper(ICSS811):
     def __init__(self, sensor):
@@ -52,6 +56,7 @@ class CCS811Custom(ICSS811):
     def __init__(self, sensor: CCS811Wrapper, **kwargs):
         self._sensor = sensor
         self.drive_mode = DRIVE_MODE_1SEC
+        self.interrupt = False
         self.r_status: Optional[int] = None
         self.r_error_id: Optional[int] = None
         self.r_raw_data: Optional[bytes] = None
@@ -87,7 +92,10 @@ class CCS811Custom(ICSS811):
 
     def reboot_to_mode(self, drive_mode=DRIVE_MODE_1SEC):
         self.drive_mode = drive_mode
-        return self._sensor.reboot_to_mode(drive_mode)
+        res = self._sensor.reboot_to_mode(drive_mode)
+        if self.interrupt:
+            self._sensor.set_interrupt(True)  # boot disables the interrupt
+        return res
 
     def data_ready(self) -> bool:
         return self._sensor.data_ready()
@@ -95,6 +103,10 @@ class CCS811Custom(ICSS811):
     def app_valid(self) -> bool:
         return self._sensor.app_valid()
 
+    def set_interrupt(self, enabled: bool):
+        self.interrupt = enabled
+        return self._sensor.set_interrupt(enabled)
+
     def reset_r(self):
         self.r_status = None
         self.r_error_id = None
@@ -14,6 +14,7 @@ MicroPython driver for the TI HDC1080 Temperature and Humidity sensor
 """
 from ph4_sense.adapters import const, sleep_ms
 from ph4_sense.support.i2c_base import BitRegister, RWBit, RWBits
+from ph4_sense.support.split_measurement import SplitMeasurement
 
 try:
     from typing import Tuple
@@ -29,6 +30,7 @@ _DATA = const(0x00)
 _TEMP = const(0x00)
 _HUM = const(0x01)
 _CONFIG = const(0x02)
+_MEASURE_MS = const(30)
 
 TEMP_AND_HUM = const(0b0)
 TEMP_OR_HUM = const(0b1)
@@ -44,7 +46,7 @@ HUM_RES_8BIT = const(0b10)
 humidity_resolution_values = (HUM_RES_14BIT, HUM_RES_11BIT, HUM_RES_8BIT)
 
 
-class HDC1080:
+class HDC1080(SplitMeasurement):
     """Driver for the HDC1080 Sensor connected over I2C.
 
     :param ~machine.I2C i2c: The I2C bus the HDC1080 is connected to.
@@ -80,9 +82,14 @@ class HDC1080:
     def __init__(self, i2c, address: int = 0x40, **kwargs) -> None:
         self._i2c = i2c
         self._address = address
+        self._data = bytearray(4)
+        self._data_cmd = bytes([_DATA])
+        self._data_2 = bytearray(2)
+        self._temp_cmd = bytes([_TEMP])
+        self._hum_cmd = bytes([_HUM])
 
-        self._device_id = BitRegister(i2c, address, _WHO_AM_I, 2)
-        config_register = BitRegister(i2c, address, _CONFIG, 2)
+        self._device_id = BitRegister(i2c, address, _WHO_AM_I, 2, read_delay_ms=0)
+        config_register = self._config_register = BitRegister(i2c, address, _CONFIG, 2, cacheable=True, read_delay_ms=0)
 
         self._reset = RWBit(config_register, 15, False)  # CBits(1, _CONFIG, 15, 2, False)
         self._operation_mode = RWBit(config_register, 12, False)  # CBits(1, _CONFIG, 12, 2, False)
@@ -166,6 +173,7 @@ class HDC1080:
         Reset the sensor
         """
         self._reset.set(True)  # = True
+        self._config_register.invalidate()  # reset bit self-clears, configuration returns to defaults
         sleep_ms(500)
 
     @property
@@ -173,9 +181,17 @@ class HDC1080:
         """
         Return Temperature in Celsius and Relative humidity in rh%
         """
-        data = bytearray(4)
-        self._i2c.writeto(self._address, bytes([_DATA]), stop=True)
-        sleep_ms(30)
+        if not self.pending:
+            self.start_measurement()
+        return self.collect()
+
+    def start_measurement(self) -> int:
+        """Triggers temp and humidity conversion, returns ticks_ms when the result can be collected"""
+        self._i2c.writeto(self._address, self._data_cmd, stop=True)
+        return self._measurement_started(_MEASURE_MS)
+
+    def _collect(self) -> Tuple[float, float]:
+        data = self._data
         self._i2c.readfrom_into(self._address, data)
         msb_temp = data[0] << 8
         lsb_temp = data[1]
@@ -198,8 +214,8 @@ class HDC1080:
         if self._operation_mode.get():
             self._operation_mode.set(False)
 
-        data = bytearray(2)
-        self._i2c.writeto(self._address, bytes([_TEMP]), stop=False)
+        data = self._data_2
+        self._i2c.writeto(self._address, self._temp_cmd, stop=False)
         sleep_ms(30)
         self._i2c.readfrom_into(self._address, data)
         msb_temp = data[0] << 8
@@ -219,8 +235,8 @@ class HDC1080:
         if self._operation_mode.get():
             self._operation_mode.set(False)
 
-        data = bytearray(2)
-        self._i2c.writeto(self._address, bytes([_HUM]), stop=False)
+        data = self._data_2
+        self._i2c.writeto(self._address, self._hum_cmd, stop=False)
         sleep_ms(30)
         self._i2c.readfrom_into(self._address, data)
         msb_hum = data[0] << 8
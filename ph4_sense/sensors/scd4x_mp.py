@@ -30,6 +30,7 @@ Implementation Notes
 """
 
 from ph4_sense.adapters import const, sleep_ms
+from ph4_sense.support.crc import crc8, crc8_check
 from ph4_sense.support.sensor_helper import SensorHelper
 
 try:
@@ -111,7 +112,6 @@ class SCD4X:
         self.i2c_device = i2c_bus
         self._buffer = bytearray(18)
         self._cmd = bytearray(2)
-        self._crc_buffer = bytearray(2)
 
         # cached readings
         self._temperature: Optional[float] = None
@@ -119,7 +119,7 @@ class SCD4X:
         self._co2: Optional[int] = None
 
         self.sensor_helper = sensor_helper or SensorHelper()
-        self.sensor_helper.log_info("scd4x address: %x" % (address,))
+        self.sensor_helper.log_info("scd4x address: %x", address)
         self.sensor_helper.log_info("scd4x i2c_bus: %s", i2c_bus)
 
         self.stop_periodic_measurement()
@@ -325,12 +325,11 @@ class SCD4X:
             raise AttributeError("Height must be less than or equal to 65535 meters")
         self._set_command_value(_SCD4X_SETALTITUDE, height)
 
-    def _check_buffer_crc(self, buf: bytearray) -> bool:
-        for i in range(0, len(buf), 3):
-            self._crc_buffer[0] = buf[i]
-            self._crc_buffer[1] = buf[i + 1]
-            if self._crc8(self._crc_buffer) != buf[i + 2]:
-                raise RuntimeError("CRC check failed while reading data")
+    def _check_buffer_crc(self, buf: bytearray, num: int) -> bool:
+        try:
+            crc8_check(buf, num)
+        except RuntimeError as e:
+            raise RuntimeError("CRC check failed while reading data") from e
         return True
 
     def _send_command(self, cmd: int, cmd_delay: int = 0) -> None:
@@ -348,24 +347,12 @@ class SCD4X:
     def _set_command_value(self, cmd, value, cmd_delay: int = 0):
         self._buffer[0] = (cmd >> 8) & 0xFF
         self._buffer[1] = cmd & 0xFF
-        self._crc_buffer[0] = self._buffer[2] = (value >> 8) & 0xFF
-        self._crc_buffer[1] = self._buffer[3] = value & 0xFF
-        self._buffer[4] = self._crc8(self._crc_buffer)
+        self._buffer[2] = (value >> 8) & 0xFF
+        self._buffer[3] = value & 0xFF
+        self._buffer[4] = crc8(self._buffer, 2, 4)
         self.i2c_device.writeto(self.address, self._buffer)
         sleep_ms(cmd_delay)
 
     def _read_reply(self, buff, num):
         self.i2c_device.readfrom_into(self.address, buff)
-        self._check_buffer_crc(self._buffer[0:num])
-
-    @staticmethod
-    def _crc8(buffer: bytearray) -> int:
-        crc = 0xFF
-        for byte in buffer:
-            crc ^= byte
-            for _ in range(8):
-                if crc & 0x80:
-                    crc = (crc << 1) ^ 0x31
-                else:
-                    crc = crc << 1
-        return crc & 0xFF  # return the bottom 8 bits
+        self._check_buffer_crc(self._buffer, num)
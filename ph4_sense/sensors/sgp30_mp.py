@@ -48,7 +48,9 @@ Implementation Notes
 from math import exp
 
 from ph4_sense.adapters import const, sleep_ms
+from ph4_sense.support.crc import crc8, crc8_check
 from ph4_sense.support.sensor_helper import SensorHelper
+from ph4_sense.support.split_measurement import SplitMeasurement
 
 try:
     from typing import Union
@@ -59,9 +61,6 @@ except ImportError:
 # General SGP30 settings
 SGP30_DEFAULT_I2C_ADDR = const(0x58)
 SGP30_WORD_LEN = const(2)
-SGP30_CRC8_POLYNOMIAL = const(0x31)
-SGP30_CRC8_INIT = const(0xFF)
-SGP30_CRC8_FINAL_XOR = const(0xFF)
 SGP30_MEASURE_TEST_PASS = const(0xD400)
 
 # SGP30 feature set measurement commands (Hex Codes)
@@ -105,11 +104,13 @@ SGP30_CMD_GET_SERIAL_ID_WORDS = const(3)
 SGP30_CMD_GET_SERIAL_ID_MAX_MS = const(10)
 
 
-class SGP30:
+class SGP30(SplitMeasurement):
     """
     A driver for the SGP30 gas sensor.
     https://www.mouser.com/pdfdocs/Sensirion_Gas_Sensors_SGP30_Datasheet_EN-1148053.pdf
 
+    Split-phase IAQ measurement: start_measurement() triggers measure_iaq, collect() returns CO2eq and TVOC.
+
     :param i2c: The "I2C" object to use. This is the only required parameter.
     :param int addr: (optional) The I2C address of the device.
     :param boolean measure_test: (optional) Whether to run on-chip test during initialisation.
@@ -124,9 +125,8 @@ class SGP30:
         # if addr not in self._i2c.scan():
         #     raise IOError("No SGP30 device found on I2C bus")
         self.addr = addr
-        self.cmd_buf_2 = bytearray(2)
-        self.resp_buf_6 = bytearray(6)
-        self.repl_buf_2 = [0, 0]
+        self.cmd_bufs = {2: bytearray(2)}  # command length -> buffer, reused across writes
+        self.read_bufs = {}  # reply size -> (response buffer, result list), reused across reads
         self.sensor_helper = sensor_helper or SensorHelper()
 
         self.serial = self.get_serial()
@@ -134,22 +134,15 @@ class SGP30:
         if measure_test:
             test_result = self.measure_test()
             if SGP30_MEASURE_TEST_PASS != test_result:
-                self.sensor_helper.log_error("Err: Device failed the on-chip test: ", hex(test_result))
+                self.sensor_helper.log_error("Err: Device failed the on-chip test: %x", test_result)
                 # raise RuntimeError("Device failed the on-chip test")
 
         self.sensor_helper.log_info(
-            "SGP30 device discovered...\n"
-            + "I2C address: "
-            + str(self.addr)
-            + "\n"
-            + "Serial ID: "
-            + str(self.serial)
-            + "\n"
-            + "Feature set: "
-            + str(self.feature_set)
-            + "\n"
-            + "Initialise algo: "
-            + str(iaq_init)
+            "SGP30 device discovered...\nI2C address: %s\nSerial ID: %s\nFeature set: %s\nInitialise algo: %s",
+            self.addr,
+            self.serial,
+            self.feature_set,
+            iaq_init,
         )
         if iaq_init:
             self.iaq_init()
@@ -160,11 +153,18 @@ class SGP30:
 
     def measure_iaq(self):
         """Measures the CO2eq and TVOC"""
-        return self._i2c_read_words_from_cmd(
-            SGP30_CMD_MEASURE_IAQ_HEX,
-            SGP30_CMD_MEASURE_IAQ_MS,
-            SGP30_CMD_MEASURE_IAQ_WORDS,
-        )
+        if not self.pending:
+            self.start_measurement()
+        return self.collect()
+
+    def start_measurement(self) -> int:
+        """Triggers CO2eq and TVOC measurement, returns ticks_ms when the result can be collected"""
+        self._measurement_stash()
+        self._i2c_write_cmd(SGP30_CMD_MEASURE_IAQ_HEX)
+        return self._measurement_started(SGP30_CMD_MEASURE_IAQ_MS)
+
+    def _collect(self):
+        return self._i2c_read_words(SGP30_CMD_MEASURE_IAQ_WORDS)
 
     def get_iaq_baseline(self):
         """Retreives the IAQ algorithm baseline for CO2eq and TVOC"""
@@ -180,8 +180,8 @@ class SGP30:
             raise ValueError("Invalid baseline values used")
 
         buffer = [(tvoc >> 8) & 0xFF, tvoc & 0xFF, 0, (co2eq >> 8) & 0xFF, co2eq & 0xFF, 0]  # tvoc, crc, co2, crc
-        buffer[2] = generate_crc(buffer, 0, 2)
-        buffer[5] = generate_crc(buffer, 3, 5)
+        buffer[2] = crc8(buffer, 0, 2)
+        buffer[5] = crc8(buffer, 3, 5)
 
         self._i2c_read_words_from_cmd(
             SGP30_CMD_SET_IAQ_BASELINE_HEX + buffer,
@@ -193,7 +193,7 @@ class SGP30:
         """Sets absolute humidity compensation. To disable,
         set 0."""
         buffer = [(absolute_humidity >> 8) & 0xFF, absolute_humidity & 0xFF, 0]
-        buffer[2] = generate_crc(buffer, 0, 2)
+        buffer[2] = crc8(buffer, 0, 2)
         self._i2c_read_words_from_cmd(
             SGP30_CMD_SET_ABSOLUTE_HUMIDITY_HEX + buffer,
             SGP30_CMD_SET_ABSOLUTE_HUMIDITY_MAX_MS,
@@ -239,10 +239,13 @@ class SGP30:
 
     def get_serial(self):
         """Retrieves sensor serial"""
-        serial = self.serial = self._i2c_read_words_from_cmd(
-            SGP30_CMD_GET_SERIAL_ID_HEX,
-            SGP30_CMD_GET_SERIAL_ID_MAX_MS,
-            SGP30_CMD_GET_SERIAL_ID_WORDS,
+        # Copy, result buffers are reused by subsequent reads
+        serial = self.serial = list(
+            self._i2c_read_words_from_cmd(
+                SGP30_CMD_GET_SERIAL_ID_HEX,
+                SGP30_CMD_GET_SERIAL_ID_MAX_MS,
+                SGP30_CMD_GET_SERIAL_ID_WORDS,
+            )
         )
         return serial
 
@@ -287,46 +290,38 @@ class SGP30:
 
     def _i2c_read_words_from_cmd(self, command, delay, reply_size):
         """Runs an SGP command query, gets a reply and CRC results if necessary"""
-        if len(command) == 2:
-            self.cmd_buf_2[0] = command[0]
-            self.cmd_buf_2[1] = command[1]
-            cmd_buf = self.cmd_buf_2
-        else:
-            cmd_buf = bytes(command)
-
-        self._i2c.writeto(self.addr, cmd_buf)
+        self._measurement_stash()
+        self._i2c_write_cmd(command)
         sleep_ms(delay)
         if not reply_size:
             return None
+        return self._i2c_read_words(reply_size)
 
+    def _i2c_write_cmd(self, command):
+        cmd_buf = self.cmd_bufs.get(len(command))
+        if cmd_buf is None:
+            cmd_buf = self.cmd_bufs[len(command)] = bytearray(len(command))
+        for i in range(len(command)):
+            cmd_buf[i] = command[i]
+
+        self._i2c.writeto(self.addr, cmd_buf)
+
+    def _i2c_read_words(self, reply_size):
         buf_size = reply_size * (SGP30_WORD_LEN + 1)
-        crc_result = self.resp_buf_6 if buf_size == len(self.resp_buf_6) else bytearray(buf_size)
+        bufs = self.read_bufs.get(reply_size)
+        if bufs is None:
+            bufs = self.read_bufs[reply_size] = (bytearray(buf_size), [0] * reply_size)
+
+        crc_result, result = bufs
         self._i2c.readfrom_into(self.addr, crc_result)
 
-        result = self.repl_buf_2 if reply_size == len(self.repl_buf_2) else [0] * reply_size
+        crc8_check(crc_result, buf_size)
+
         for i in range(reply_size):
-            if generate_crc(crc_result, 3 * i, 3 * i + 2) != crc_result[3 * i + 2]:
-                raise RuntimeError("CRC Error")
             result[i] = (crc_result[3 * i] << 8) | crc_result[3 * i + 1]
         return result
 
 
-def generate_crc(data, offset=0, limit=None):
-    """8-bit CRC algorithm for checking data.
-    Calculation described in section 6.6 of SGP30 datasheet"""
-    crc = SGP30_CRC8_INIT
-    # Calculates 8-Bit CRC checksum with given polynomial
-    for idx in range(offset, len(data) if limit is None else limit):
-        byte = data[idx]
-        crc ^= byte
-        for _ in range(8):
-            if crc & 0x80:
-                crc = (crc << 1) ^ SGP30_CRC8_POLYNOMIAL
-            else:
-                crc <<= 1
-    return crc & 0xFF
-
-
 def convert_r_to_a_humidity(temp_c: float, r_humidity_perc: float, fixed_point=True) -> Union[float, int]:
     """Converts relative to absolute humidity as per the equation
     found in datasheet"""
@@ -1,5 +1,7 @@
 from ph4_sense.adapters import const, sleep_ms
+from ph4_sense.support.crc import crc8, crc8_check
 from ph4_sense.support.sensor_helper import SensorHelper
+from ph4_sense.support.split_measurement import SplitMeasurement
 
 try:
     from machine import I2C
@@ -15,9 +17,6 @@ except ImportError:
 # General SGP41 settings
 SGP41_DEFAULT_I2C_ADDR = const(0x59)
 SGP41_WORD_LEN = const(2)
-SGP41_CRC8_POLYNOMIAL = const(0x31)
-SGP41_CRC8_INIT = const(0xFF)
-SGP41_CRC8_FINAL_XOR = const(0xFF)
 SGP41_MEASURE_TEST_PASS = const(0xD400)
 
 SGP41_DEFAULT_COMPENSATION_RH = 0x8000  # in ticks as defined by SGP41
@@ -47,11 +46,13 @@ SGP41_CMD_GET_SERIAL_ID_WORDS = const(3)
 SGP41_CMD_GET_SERIAL_ID_MAX_MS = const(10)
 
 
-class SGP41:
+class SGP41(SplitMeasurement):
     """
     A driver for the SGP41 gas sensor.
     https://sensirion.com/media/documents/5FE8673C/61E96F50/Sensirion_Gas_Sensors_Datasheet_SGP41.pdf
 
+    Split-phase raw measurement: start_measurement(rh, temp) triggers measure_raw, collect() returns raw signals.
+
     :param i2c: The "I2C" object to use. This is the only required parameter.
     :param int addr: (optional) The I2C address of the device.
     :param boolean measure_test: (optional) Whether to run on-chip test during initialisation.
@@ -67,28 +68,22 @@ class SGP41:
         #     raise IOError("No SGP41 device found on I2C bus")
 
         self.addr = addr
-        self.cmd_buf_2 = bytearray(2)
-        self.resp_buf_8 = bytearray(8)
-        self.repl_buf_2 = [0, 0]
+        self.cmd_bufs = {2: bytearray(2)}  # command length -> buffer, reused across writes
+        self.read_bufs = {}  # reply size -> (response buffer, result list), reused across reads
         self.sensor_helper = sensor_helper or SensorHelper()
 
         self.serial = self.get_serial()
         if measure_test:
             test_result = self.self_test()
             if SGP41_MEASURE_TEST_PASS != test_result:
-                self.sensor_helper.log_error("Err: Device failed the on-chip test: ", hex(test_result))
+                self.sensor_helper.log_error("Err: Device failed the on-chip test: %x", test_result)
                 # raise RuntimeError("Device failed the on-chip test")
 
         self.sensor_helper.log_info(
-            "SGP41 device discovered...\n"
-            + "I2C address: "
-            + str(self.addr)
-            + "\n"
-            + "Serial ID: "
-            + str(self.serial)
-            + "\n"
-            + "Initialise algo: "
-            + str(iaq_init)
+            "SGP41 device discovered...\nI2C address: %s\nSerial ID: %s\nInitialise algo: %s",
+            self.addr,
+            self.serial,
+            iaq_init,
         )
 
         if iaq_init:
@@ -102,7 +97,7 @@ class SGP41:
                     self.measure_raw()
                     return
                 except Exception as e:
-                    self.sensor_helper.log_error(f"Measurement fail: {e}")
+                    self.sensor_helper.log_error("Measurement fail: %s", e)
                     sleep_ms(25)
 
     def measure_raw(self, rh: Optional[float] = None, temp: Optional[float] = None):
@@ -125,25 +120,35 @@ class SGP41:
         SRAW_NOX in ticks which is proportional to the logarithm of the resistance of
         the sensing element.
         """
-        tick_rh, tick_t = convert_to_ticks(rh, temp)
-        cmd_buff = [
-            SGP41_CMD_MEASURE_RAW_HEX[0],
-            SGP41_CMD_MEASURE_RAW_HEX[1],
-            (tick_rh >> 8) & 0xFF,
-            tick_rh & 0xFF,
-            0,
-            (tick_t >> 8) & 0xFF,
-            tick_t & 0xFF,
-            0,
-        ]
-        cmd_buff[4] = generate_crc(cmd_buff, 2, 4)
-        cmd_buff[7] = generate_crc(cmd_buff, 5, 7)
+        if not self.pending:
+            self.start_measurement(rh, temp)
+        return self.collect()
 
-        return self._i2c_read_words_from_cmd(
-            cmd_buff,
-            SGP41_CMD_MEASURE_RAW_MAX_MS,
-            SGP41_CMD_MEASURE_RAW_WORDS,
-        )
+    def start_measurement(self, rh: Optional[float] = None, temp: Optional[float] = None) -> int:
+        """
+        Triggers raw VOC+NOx measurement with given compensation, see measure_raw().
+        Returns ticks_ms when the result can be collected.
+        """
+        self._measurement_stash()
+        tick_rh, tick_t = convert_to_ticks(rh, temp)
+        cmd_buff = self.cmd_bufs.get(8)
+        if cmd_buff is None:
+            cmd_buff = self.cmd_bufs[8] = bytearray(8)
+
+        # Command and compensation words filled in place, no allocation per measurement
+        cmd_buff[0] = SGP41_CMD_MEASURE_RAW_HEX[0]
+        cmd_buff[1] = SGP41_CMD_MEASURE_RAW_HEX[1]
+        cmd_buff[2] = (tick_rh >> 8) & 0xFF
+        cmd_buff[3] = tick_rh & 0xFF
+        cmd_buff[4] = crc8(cmd_buff, 2, 4)
+        cmd_buff[5] = (tick_t >> 8) & 0xFF
+        cmd_buff[6] = tick_t & 0xFF
+        cmd_buff[7] = crc8(cmd_buff, 5, 7)
+        self._i2c.writeto(self.addr, cmd_buff)
+        return self._measurement_started(SGP41_CMD_MEASURE_RAW_MAX_MS)
+
+    def _collect(self):
+        return self._i2c_read_words(SGP41_CMD_MEASURE_RAW_WORDS)
 
     def execute_conditioning(self, default_rh: Optional[float] = None, default_t: Optional[float] = None):
         """
@@ -169,8 +174,8 @@ class SGP41:
             tick_t & 0xFF,
             0,
         ]
-        buffer[2] = generate_crc(buffer, 0, 2)
-        buffer[5] = generate_crc(buffer, 3, 5)
+        buffer[2] = crc8(buffer, 0, 2)
+        buffer[5] = crc8(buffer, 3, 5)
 
         sraw_voc = self._i2c_read_words_from_cmd(
             SGP41_CMD_CONDITIONING_HEX + buffer,
@@ -216,57 +221,50 @@ class SGP41:
 
         :return: serial_number 48-bit unique serial number
         """
-        serial = self.serial = self._i2c_read_words_from_cmd(
-            SGP41_CMD_GET_SERIAL_ID_HEX,
-            SGP41_CMD_GET_SERIAL_ID_MAX_MS,
-            SGP41_CMD_GET_SERIAL_ID_WORDS,
+        # Copy, result buffers are reused by subsequent reads
+        serial = self.serial = list(
+            self._i2c_read_words_from_cmd(
+                SGP41_CMD_GET_SERIAL_ID_HEX,
+                SGP41_CMD_GET_SERIAL_ID_MAX_MS,
+                SGP41_CMD_GET_SERIAL_ID_WORDS,
+            )
         )
         return serial
 
     def _i2c_read_words_from_cmd(self, command, delay, reply_size):
         """Runs an SGP command query, gets a reply and CRC results if necessary"""
-        if len(command) == 2:
-            self.cmd_buf_2[0] = command[0]
-            self.cmd_buf_2[1] = command[1]
-            cmd_buf = self.cmd_buf_2
-        else:
-            cmd_buf = bytes(command)
-
-        self._i2c.writeto(self.addr, cmd_buf)
+        self._measurement_stash()
+        self._i2c_write_cmd(command)
         sleep_ms(delay)
         if not reply_size:
             return None
+        return self._i2c_read_words(reply_size)
+
+    def _i2c_write_cmd(self, command):
+        cmd_buf = self.cmd_bufs.get(len(command))
+        if cmd_buf is None:
+            cmd_buf = self.cmd_bufs[len(command)] = bytearray(len(command))
+        for i in range(len(command)):
+            cmd_buf[i] = command[i]
+
+        self._i2c.writeto(self.addr, cmd_buf)
 
+    def _i2c_read_words(self, reply_size):
         buf_size = reply_size * (SGP41_WORD_LEN + 1)
-        crc_result = self.resp_buf_8 if buf_size == len(self.resp_buf_8) else bytearray(buf_size)
+        bufs = self.read_bufs.get(reply_size)
+        if bufs is None:
+            bufs = self.read_bufs[reply_size] = (bytearray(buf_size), [0] * reply_size)
+
+        crc_result, result = bufs
         self._i2c.readfrom_into(self.addr, crc_result)
 
-        result = self.repl_buf_2 if reply_size == len(self.repl_buf_2) else [0] * reply_size
+        crc8_check(crc_result, buf_size)
+
         for i in range(reply_size):
-            if generate_crc(crc_result, 3 * i, 3 * i + 2) != crc_result[3 * i + 2]:
-                raise RuntimeError("CRC Error")
             result[i] = (crc_result[3 * i] << 8) | crc_result[3 * i + 1]
         return result
 
 
-def generate_crc(data, offset=0, limit=None):
-    """
-    8-bit CRC algorithm for checking data.
-    Calculation described in section 6.6 of SGP41 datasheet
-    """
-    crc = SGP41_CRC8_INIT
-    # Calculates 8-Bit CRC checksum with given polynomial
-    for idx in range(offset, len(data) if limit is None else limit):
-        byte = data[idx]
-        crc ^= byte
-        for _ in range(8):
-            if crc & 0x80:
-                crc = (crc << 1) ^ SGP41_CRC8_POLYNOMIAL
-            else:
-                crc <<= 1
-    return crc & 0xFF
-
-
 def convert_to_ticks(s_rh: Optional[float], s_temp: Optional[float]):
     s_rh = s_rh if s_rh is not None else 50.001
     s_temp = s_temp if s_temp is not None else 25.0
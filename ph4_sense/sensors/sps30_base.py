@@ -73,6 +73,13 @@ class SPS30:
         """Low level buffer parsing function, to be overridden"""
         raise NotImplementedError(self._WRONG_CLASS_TXT)
 
+    def reading(self, values, output=None) -> dict:
+        """Fills the reading dictionary, aqi_reading by default, from values in FIELD_NAMES order"""
+        output = self.aqi_reading if output is None else output
+        for key, val in zip(self.FIELD_NAMES, values):
+            output[key] = val
+        return output
+
     def read(self):
         """Read any available data from the air quality sensor and
         return a dictionary with available particulate/quality data"""
@@ -1,7 +1,13 @@
-from ph4_sense.adapters import const, sleep_ms
+from ph4_sense.adapters import const, sleep_ms, ticks_diff, ticks_ms
 from ph4_sense.sensors.sps30_base import SPS30
+from ph4_sense.support.crc import crc8, crc8_check, crc8_strip
 from ph4_sense.support.sensor_helper import SensorHelper
 
+try:
+    from array import array
+except ImportError:
+    from uarray import array
+
 try:
     from machine import I2C
     from ustruct import unpack_from
@@ -19,6 +25,15 @@ SPS30_DEFAULT_ADDR = const(0x69)
 
 
 class SPS30_I2C(SPS30):
+    """
+    Sensirion SPS30 on I2C.
+
+    read_values() decodes the measurement to a preallocated array in FIELD_NAMES order, without a dictionary.
+    The sensor produces a new measurement every second, so when at least sample_ms passed since the last read
+    the data-ready flag is not queried and the values are read right away, saving one command round trip.
+    Otherwise, or with sample_ms=None, the flag is checked first.
+    """
+
     # pylint: disable=too-many-instance-attributes
     def __init__(
         self,
@@ -29,6 +44,7 @@ class SPS30_I2C(SPS30):
         fp_mode=True,
         delays=True,
         mode_change_delay=3500,
+        sample_ms=1000,
         sensor_helper=None,
         **kwargs,
     ):
@@ -45,6 +61,9 @@ class SPS30_I2C(SPS30):
         self._m_fmt = None
         self._delays = delays
         self._starts = 0
+        self.sample_ms = sample_ms
+        self.values = array("f", [0.0] * len(self.FIELD_NAMES))
+        self.last_read = None  # ticks of the last read measurement, None if the sensor was not read since start
         self.sensor_helper = sensor_helper or SensorHelper()
         self.last_response = None
         _ = self._set_fp_mode_fields(fp_mode)
@@ -74,8 +93,7 @@ class SPS30_I2C(SPS30):
     def auto_cleaning_interval(self):
         """Read the auto cleaning interval."""
         self._sps30_command(self.CMD_RW_AUTO_CLEANING_INTERVAL, rx_size=6)
-        self._buffer_check(6)
-        self._scrunch_buffer(6)
+        self._buffer_strip(6)
         if self._delays:
             sleep_ms(5)
         return unpack_from(">I", self._buffer)[0]
@@ -119,6 +137,7 @@ class SPS30_I2C(SPS30):
             if (mode_changed or self._starts == 0) and self._mode_change_delay:
                 sleep_ms(self._mode_change_delay)
         self._starts += 1
+        self.last_read = None
 
     def clean(self, *, wait=True):
         """Start the fan cleaning and wait 15 seconds for it to complete.
@@ -134,6 +153,7 @@ class SPS30_I2C(SPS30):
     def stop(self):
         """Send stop command to SPS30."""
         self._sps30_command(self.CMD_STOP_MEASUREMENT)
+        self.last_read = None
         # Data sheet states command execution time < 20ms
         if self._delays:
             sleep_ms(50)
@@ -143,6 +163,7 @@ class SPS30_I2C(SPS30):
         and placing sensor in Idle mode as if it had just powered up.
         The sensor must be started after a reset before data is read."""
         self._sps30_command(self.CMD_SOFT_RESET)
+        self.last_read = None
         # Data sheet states command execution time < 100ms
         if self._delays:
             sleep_ms(100)
@@ -181,8 +202,7 @@ class SPS30_I2C(SPS30):
         # https://github.com/Sensirion/embedded-sps/blob/master/sps30-i2c/sps30.c
         # https://github.com/Sensirion/arduino-sps/blob/master/sps30.cpp
         self._sps30_command(self.CMD_READ_DEVICE_STATUS_REG, rx_size=6)
-        self._buffer_check(6)
-        self._scrunch_buffer(6)
+        self._buffer_strip(6)
         return unpack_from(">I", self._buffer)[0]
 
     def clear_status_register(self):
@@ -215,7 +235,7 @@ class SPS30_I2C(SPS30):
                 tx_size += 1
                 self._cmd_buffer[tx_size] = arg & 0xFF
                 tx_size += 1
-                self._cmd_buffer[tx_size] = self._crc8(self._cmd_buffer, start=tx_size - 2, end=tx_size)
+                self._cmd_buffer[tx_size] = crc8(self._cmd_buffer, tx_size - 2, tx_size)
                 tx_size += 1
 
         # The write_then_readinto method cannot be used as the SPS30
@@ -237,7 +257,7 @@ class SPS30_I2C(SPS30):
             try:
                 return self._base_sps30_command(command, arguments, rx_size=rx_size, delay=delay)
             except Exception as e:
-                self.sensor_helper.log_error(f"Attempt {attempt} failed {e}")
+                self.sensor_helper.log_error("Attempt %s failed %s", attempt, e)
                 if attempt + 1 >= retry:
                     raise
                 else:
@@ -246,43 +266,41 @@ class SPS30_I2C(SPS30):
     def _read_into_buffer(self):
         data_len = self._m_total_size
         self._sps30_command(self.CMD_READ_MEASURED_VALUES, rx_size=data_len)
-        self._buffer_check(data_len)
-
-    def _scrunch_buffer(self, raw_data_len):
-        """Move all the data from 0:raw_data_len to one contiguous sequence at
-        the start of the buffer.
-        This will overwrite some of the interleaved crcs."""
-        dst_idx = 2
-        for src_idx in range(3, raw_data_len, 3):
-            self._buffer[dst_idx : dst_idx + 2] = self._buffer[src_idx : src_idx + 2]
-            dst_idx += 2
+        self._buffer_strip(data_len)
 
     def _read_parse_data(self, output):
-        self._scrunch_buffer(self._m_total_size)
+        self.reading(self._parse_values(), output)
 
+    def _parse_values(self):
+        # data words were compacted to the start of the buffer by _buffer_strip()
         # buffer will be longer than the data hence the use of unpack_from
-        for key, val in zip(self.FIELD_NAMES, unpack_from(self._m_fmt, self._buffer)):
-            output[key] = val
+        values = self.values
+        for idx, val in enumerate(unpack_from(self._m_fmt, self._buffer)):
+            values[idx] = val
+        return values
+
+    def read_values(self):
+        """Measured values in FIELD_NAMES order, None if there is no new measurement. The array is reused"""
+        now = ticks_ms()
+        if self.sample_ms is None or self.last_read is None or ticks_diff(now, self.last_read) < self.sample_ms:
+            if not self.data_available:
+                return None
+
+        self._read_into_buffer()
+        self.last_read = now
+        return self._parse_values()
 
     def _buffer_check(self, raw_data_len):
-        if raw_data_len % 3 != 0:
-            raise RuntimeError("Data length not a multiple of three")
-
-        for st_chunk in range(0, raw_data_len, 3):
-            if self._buffer[st_chunk + 2] != self._crc8(self._buffer, st_chunk, st_chunk + 2):
-                self.sensor_helper.log_error(
-                    f"CRC mismatch, dl {raw_data_len}, buffer: {memoryview(self._buffer)[:raw_data_len]}"
-                )
-                raise RuntimeError("CRC mismatch in data at offset " + str(st_chunk))
-
-    @staticmethod
-    def _crc8(buffer, start=None, end=None):
-        crc = 0xFF
-        for idx in range(0 if start is None else start, len(buffer) if end is None else end):
-            crc ^= buffer[idx]
-            for _ in range(8):
-                if crc & 0x80:
-                    crc = (crc << 1) ^ 0x31
-                else:
-                    crc = crc << 1
-        return crc & 0xFF  # return the bottom 8 bits
+        try:
+            crc8_check(self._buffer, raw_data_len)
+        except RuntimeError:
+            self.sensor_helper.log_error("CRC mismatch, dl %s, buffer: %s", raw_data_len, self._buffer)
+            raise
+
+    def _buffer_strip(self, raw_data_len):
+        """Verifies CRCs and moves all the data words to one contiguous sequence at the start of the buffer"""
+        try:
+            crc8_strip(self._buffer, raw_data_len)
+        except RuntimeError:
+            self.sensor_helper.log_error("CRC mismatch, dl %s, buffer: %s", raw_data_len, self._buffer)
+            raise
@@ -0,0 +1,134 @@
+from ph4_sense.adapters import const, sleep_ms, ticks_add, ticks_diff, ticks_ms
+from ph4_sense.sensors.sps30_base import SPS30
+from ph4_sense.support.sensor_helper import SensorHelper
+from ph4_sense.support.shdlc import ShdlcParser, shdlc_frame
+from ph4_sense.support.uart import Uart
+
+try:
+    from ustruct import unpack_from
+except ImportError:
+    from struct import unpack_from
+
+try:
+    from typing import Optional
+except ImportError:
+    pass
+
+
+_CMD_START = const(0x00)
+_CMD_STOP = const(0x01)
+_CMD_READ_VALUES = const(0x03)
+_CMD_SLEEP = const(0x10)
+_CMD_WAKEUP = const(0x11)
+_CMD_FAN_CLEANING = const(0x56)
+_CMD_SERIAL_NUMBER = const(0xD0)
+_CMD_VERSION = const(0xD1)
+_CMD_RESET = const(0xD3)
+_POLL_MS = const(5)
+_RX_CHUNK = const(32)
+
+
+class SPS30_UART(SPS30):
+    """
+    Sensirion SPS30 on UART, SHDLC protocol, 115200 baud, float output format.
+
+    Response bytes are read as they arrive and parsed incrementally by ShdlcParser,
+    the response is decoded right after its closing delimiter is received, no full frame copy is made.
+    Read measured values returns an empty frame when there is no new measurement, the last reading is kept.
+    """
+
+    def __init__(
+        self,
+        uart: Optional[Uart] = None,
+        *,
+        uart_builder=None,
+        address: int = 0,
+        timeout_ms: int = 2000,
+        sensor_helper=None,
+        **kwargs,
+    ):
+        super().__init__()
+        self.uart = uart if uart is not None else uart_builder(baudrate=115200, parity=None, stop=1, bits=8, timeout=0)
+        self.address = address
+        self.timeout_ms = timeout_ms
+        self.sensor_helper = sensor_helper or SensorHelper()
+        self.parser = ShdlcParser(max_data=40)
+        self.rx_buffer = bytearray(_RX_CHUNK)
+        self.rx_view = memoryview(self.rx_buffer)
+        self.last_state = 0
+
+        # Request frames are constant, built once
+        self.req_start = shdlc_frame(address, _CMD_START, b"\x01\x03")
+        self.req_stop = shdlc_frame(address, _CMD_STOP)
+        self.req_read_values = shdlc_frame(address, _CMD_READ_VALUES)
+
+    def _transceive(self, request, command: int) -> int:
+        """Sends the request and waits for the response, returns the response data length, data in the parser"""
+        parser = self.parser
+        parser.reset()
+        self.uart.flush_input()
+        self.uart.write(request)
+
+        deadline = ticks_add(ticks_ms(), self.timeout_ms)
+        while True:
+            nbytes = self.uart.readinto(self.rx_buffer)
+            pos = 0
+            while pos < nbytes:
+                pos += parser.feed(self.rx_view, pos, nbytes)
+                if parser.ready and parser.command == command:
+                    self.last_state = parser.state
+                    if parser.state:
+                        self.sensor_helper.log_error("SPS30 cmd %s state %s", command, parser.state)
+                    return parser.length
+
+            if ticks_diff(deadline, ticks_ms()) <= 0:
+                raise OSError("SPS30 response timeout, cmd {}".format(command))
+            if not nbytes:
+                sleep_ms(_POLL_MS)
+
+    def command(self, command: int, data=b"") -> int:
+        return self._transceive(shdlc_frame(self.address, command, data), command)
+
+    def start(self):
+        self._transceive(self.req_start, _CMD_START)
+
+    def stop(self):
+        self._transceive(self.req_stop, _CMD_STOP)
+
+    def sleep(self):
+        self.command(_CMD_SLEEP)
+
+    def wakeup(self):
+        # Low pulse on RX wakes the interface up, the command switches to idle
+        self.uart.write(b"\xff")
+        self.command(_CMD_WAKEUP)
+
+    def reset(self):
+        self.command(_CMD_RESET)
+
+    def clean(self):
+        self.command(_CMD_FAN_CLEANING)
+
+    @property
+    def data_available(self):
+        return True  # no data-ready flag on UART, an empty response means no new data
+
+    def read_values(self):
+        """Ten measured floats, None if there is no new measurement"""
+        if self._transceive(self.req_read_values, _CMD_READ_VALUES) < 40:
+            return None
+        return unpack_from(">ffffffffff", self.parser.buffer, 4)
+
+    def read(self):
+        vals = self.read_values()
+        if vals is None:
+            return self.aqi_reading  # no new measurement since the last read
+        return self.reading(vals)
+
+    def read_serial_number(self) -> str:
+        nbytes = self.command(_CMD_SERIAL_NUMBER, b"\x03")
+        return bytes(self.parser.data()[: max(0, nbytes - 1)]).decode("ascii")  # null terminated
+
+    def read_firmware_version(self) -> str:
+        self.command(_CMD_VERSION)
+        return "{}.{}".format(self.parser.buffer[4], self.parser.buffer[5])
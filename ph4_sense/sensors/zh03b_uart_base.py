@@ -1,7 +1,12 @@
-from ph4_sense.adapters import const, sleep_ms
+from ph4_sense.adapters import const, sleep_ms, ticks_ms
 from ph4_sense.support.buffers import buf2int
 from ph4_sense.support.uart import Uart
 
+try:
+    from array import array
+except ImportError:
+    from uarray import array
+
 try:
     from typing import Optional
 except ImportError:
@@ -10,6 +15,22 @@ except ImportError:
 
 _SLEEP_TIME = const(5)
 _SLEEP_READ_TIME = const(200)
+_STREAM_FRAME_LEN = const(24)  # 0x42 0x4D, length 20, reserved, PM1.0, PM2.5, PM10, reserved, checksum
+_STREAM_DATA_LEN = const(20)
+_RX_CHUNK = const(32)
+
+
+def zh03b_checksum(frame) -> int:
+    """Checksum of 9-byte command and Q&A frames, inverted sum of bytes 1-7 plus one"""
+    return (~sum(frame[1:8]) + 1) & 0xFF
+
+
+def zh03b_stream_checksum(frame) -> int:
+    """Checksum of streamed frames, sum of the first 22 bytes"""
+    total = 0
+    for idx in range(_STREAM_FRAME_LEN - 2):
+        total += frame[idx]
+    return total & 0xFFFF
 
 
 class Zh03bUartBase:
@@ -17,10 +38,22 @@ class Zh03bUartBase:
     https://www.winsen-sensor.com/d/files/zh03b-laser-dust-module-v2_1(2).pdf
     """
 
-    def __init__(self, uart: Optional[Uart] = None, *, uart_builder=None, **kwargs):
+    def __init__(self, uart: Optional[Uart] = None, *, uart_builder=None, history: int = 8, **kwargs):
         self.uart = uart if uart is not None else uart_builder(baudrate=9600, parity=None, stop=1, bits=8, timeout=10)
         self.uart.flush_input()
 
+        # Streaming mode frame scanner, see stream_poll()
+        self.streaming = False
+        self.frame = bytearray(_STREAM_FRAME_LEN)
+        self.frame_pos = 0
+        self.chunk = bytearray(_RX_CHUNK)
+        self.latest = None  # (pm10, pm25, pm100) of the last valid frame
+        self.latest_ticks = None
+        self.history = array("H", [0] * (3 * history))  # ring of (pm10, pm25, pm100)
+        self.history_pos = 0
+        self.frames = 0
+        self.errors = 0
+
     def set_qa(self):
         """
         Set ZH03B Question and Answer mode
@@ -28,6 +61,7 @@ class Zh03bUartBase:
         """
         self.uart.write(b"\xff\x01\x78\x41\x00\x00\x00\x00\x46")
         self.uart.flush_input()
+        self.streaming = False
         return
 
     def set_stream(self):
@@ -37,6 +71,8 @@ class Zh03bUartBase:
         """
         self.uart.write(b"\xff\x01\x78\x40\x00\x00\x00\x00\x47")
         self.uart.flush_input()
+        self.streaming = True
+        self.frame_pos = 0
         return
 
     def qa_read_sample(self):
@@ -47,16 +83,85 @@ class Zh03bUartBase:
         self.uart.flush_input()
         self.uart.write(b"\xff\x01\x86\x00\x00\x00\x00\x00\x79")
         sleep_ms(_SLEEP_READ_TIME)
-        reading = self.uart.read(2)
-        if reading != b"\xff\x86":
-            # print(hex(reading))
+        reading = self.uart.read(9)
+        if not reading or len(reading) != 9 or reading[0] != 0xFF or reading[1] != 0x86:
             return None
+        if zh03b_checksum(reading) != reading[8]:
+            self.errors += 1
+            return None
+
+        # PM2.5, PM10, PM1.0
+        return buf2int(reading, 6, 2), buf2int(reading, 2, 2), buf2int(reading, 4, 2)
+
+    def stream_poll(self) -> int:
+        """
+        Streaming mode, consumes bytes received so far without waiting, returns the number of new valid frames.
+        The sensor sends a frame every second, see latest and get_history().
+        """
+        found = 0
+        while True:
+            nbytes = self.uart.readinto(self.chunk)
+            for idx in range(nbytes):
+                found += self._scan(self.chunk[idx])
+            if nbytes < len(self.chunk):
+                return found
+
+    def _scan(self, byte: int) -> int:
+        frame = self.frame
+        pos = self.frame_pos
+        if (pos == 0 and byte != 0x42) or (pos == 1 and byte != 0x4D):
+            self.frame_pos = 1 if byte == 0x42 else 0
+            return 0
+
+        frame[pos] = byte
+        pos += 1
+        self.frame_pos = pos
+        if pos == 4 and (frame[2] << 8 | frame[3]) != _STREAM_DATA_LEN:
+            self._resync(pos)
+            return 0
+        if pos < _STREAM_FRAME_LEN:
+            return 0
+
+        self.frame_pos = 0
+        if zh03b_stream_checksum(frame) != (frame[22] << 8 | frame[23]):
+            self.errors += 1
+            self._resync(pos)
+            return 0
+
+        self._add_sample(buf2int(frame, 10, 2), buf2int(frame, 12, 2), buf2int(frame, 14, 2))
+        return 1
+
+    def _resync(self, pos: int):
+        """Restarts the scan at the next header candidate within the rejected bytes"""
+        frame = self.frame
+        self.frame_pos = 0
+        for idx in range(1, pos):
+            if frame[idx] == 0x42 and (idx + 1 == pos or frame[idx + 1] == 0x4D):
+                for rest in range(idx, pos):
+                    frame[rest - idx] = frame[rest]
+                self.frame_pos = pos - idx
+                return
+
+    def _add_sample(self, pm10: int, pm25: int, pm100: int):
+        self.latest = pm10, pm25, pm100
+        self.latest_ticks = ticks_ms()
+        ring = self.history
+        ring[self.history_pos] = pm10
+        ring[self.history_pos + 1] = pm25
+        ring[self.history_pos + 2] = pm100
+        self.history_pos = (self.history_pos + 3) % len(ring)
+        self.frames += 1
 
-        pm25 = buf2int(self.uart.read(2))
-        pm100 = buf2int(self.uart.read(2))
-        pm10 = buf2int(self.uart.read(2))
-        self.uart.read(1)  # crc TODO: verify
-        return pm10, pm25, pm100
+    def get_history(self) -> list:
+        """Valid samples kept in the ring, oldest first"""
+        ring = self.history
+        count = min(self.frames, len(ring) // 3)
+        start = (self.history_pos - 3 * count) % len(ring)
+        res = []
+        for idx in range(count):
+            pos = (start + 3 * idx) % len(ring)
+            res.append((ring[pos], ring[pos + 1], ring[pos + 2]))
+        return res
 
     def dormant_mode(self, to_dormant=True):
         """
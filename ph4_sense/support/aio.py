@@ -0,0 +1,32 @@
+try:
+    import uasyncio as asyncio
+
+    _HAS_EXECUTOR = False
+except ImportError:
+    import asyncio  # type: ignore # noqa: F401
+
+    _HAS_EXECUTOR = True
+
+
+async def sleep_ms(val):
+    await asyncio.sleep(val / 1000.0)
+
+
+def serial_executor():
+    """Single worker executor, blocking calls submitted to it run one at a time in order. None on MicroPython"""
+    if not _HAS_EXECUTOR:
+        return None
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="sensei-io")
+
+
+async def run_blocking(fnc, executor=None):
+    """
+    Runs blocking call (network I/O) without stalling the event loop where possible.
+    CPython offloads the call to the executor, the default thread pool if None, on MicroPython it runs inline.
+    """
+    if _HAS_EXECUTOR:
+        return await asyncio.get_event_loop().run_in_executor(executor, fnc)
+    return fnc()
@@ -1,5 +1,5 @@
 try:
-    from typing import Optional
+    from typing import List, Optional, Tuple
 except ImportError:
     pass
 
@@ -43,6 +43,102 @@ class PreallocatedBuffer:
         Writes buffer to the underlying buffer
         """
         length = length if length is not None else len(buffer) - offset
+        if isinstance(buffer, (bytes, bytearray, memoryview)):
+            # Slice assignment copies in C, no per-byte Python loop
+            self.buffer[offset_dst : offset_dst + length] = memoryview(buffer)[offset : offset + length]
+            return self.buffer
+
         for i in range(length):
             self.buffer[offset_dst + i] = buffer[offset + i]
         return self.buffer
+
+
+class BufferLease:
+    """
+    Buffer leased from BufferPool, returned to the pool with release().
+    Can be used as a context manager, `with pool.lease(16) as buf:`.
+    """
+
+    def __init__(self, pool: "BufferPool", class_idx: int, slot: PreallocatedBuffer):
+        self.pool = pool
+        self.class_idx = class_idx
+        self.slot = slot
+        self.buffer = None
+
+    def __enter__(self):
+        return self.buffer
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    def release(self):
+        if self.buffer is None:
+            return
+        self.buffer = None
+        self.pool._release(self)
+
+
+class BufferPool:
+    """
+    Fixed-size slab pool of preallocated buffers in several size classes.
+
+    Buffers are leased with lease(size) and returned with release(), the smallest free
+    slot able to hold the size is used. Lease objects are preallocated with the slots,
+    so leasing does not allocate (except for a memoryview if size is smaller than the slot).
+
+    When the pool is exhausted, a new buffer is allocated and counted in fallbacks,
+    or MemoryError is raised in strict mode. High-water marks show how many slots
+    of each class were used at once, use them to size the pool.
+    """
+
+    def __init__(self, size_classes: Tuple[Tuple[int, int], ...] = ((16, 4), (64, 2), (256, 1)), strict=False):
+        """:param size_classes: (buffer size, number of slots) per size class"""
+        self.strict = strict
+        self.sizes: List[int] = []
+        self.free: List[List[BufferLease]] = []
+        self.in_use: List[int] = []
+        self.high_water: List[int] = []
+        self.fallbacks = 0
+
+        for size, count in sorted(size_classes):
+            class_idx = len(self.sizes)
+            self.sizes.append(size)
+            self.free.append([BufferLease(self, class_idx, PreallocatedBuffer(size)) for _ in range(count)])
+            self.in_use.append(0)
+            self.high_water.append(0)
+
+    def lease(self, size: int) -> BufferLease:
+        for class_idx in range(len(self.sizes)):
+            if self.sizes[class_idx] < size or not self.free[class_idx]:
+                continue
+
+            lease = self.free[class_idx].pop()
+            lease.buffer = lease.slot.get(size)
+            self.in_use[class_idx] += 1
+            self.high_water[class_idx] = max(self.high_water[class_idx], self.in_use[class_idx])
+            return lease
+
+        if self.strict:
+            raise MemoryError(f"Buffer pool exhausted for size {size}")
+
+        self.fallbacks += 1
+        lease = BufferLease(self, -1, PreallocatedBuffer(size))
+        lease.buffer = lease.slot.get(size)
+        return lease
+
+    def release(self, lease: BufferLease):
+        lease.release()
+
+    def _release(self, lease: BufferLease):
+        if lease.class_idx < 0:
+            return  # fallback allocation, left to GC
+
+        self.in_use[lease.class_idx] -= 1
+        self.free[lease.class_idx].append(lease)
+
+    def stats(self) -> dict:
+        """size class -> (in use, high-water mark), fallbacks -> number of allocations outside the pool"""
+        res = {"fallbacks": self.fallbacks}
+        for class_idx, size in enumerate(self.sizes):
+            res[size] = (self.in_use[class_idx], self.high_water[class_idx])
+        return res
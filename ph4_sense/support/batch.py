@@ -0,0 +1,42 @@
+try:
+    from array import array
+except ImportError:
+    array = None
+
+_numpy = None
+
+
+def get_numpy():
+    """Lazily imports numpy, returns None if not available (e.g., MicroPython)"""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+
+def is_ndarray(values) -> bool:
+    np = get_numpy() if type(values).__name__ == "ndarray" else None
+    return np is not None and isinstance(values, np.ndarray)
+
+
+def is_missing(value) -> bool:
+    return value is None or value != value  # NaN
+
+
+def batch_iter(values):
+    """Iterates batch input as Python scalars, ndarray.tolist() is much faster than per-element indexing"""
+    return values.tolist() if is_ndarray(values) else values
+
+
+def batch_wrap(values, res: list):
+    """Converts result list to the same container type as the batch input, missing values become NaN"""
+    if is_ndarray(values):
+        return get_numpy().array(res, dtype=float)
+    if array is not None and isinstance(values, array):
+        return array(values.typecode, [float("nan") if x is None else x for x in res])
+    return res
@@ -16,26 +16,110 @@ _SLEEP_MS_CONST = const(12)
 
 
 class BitRegister:
-    def __init__(self, i2c_bus: I2C, address: int, register_address: int, register_width: int = 1):
+    """
+    Register buffer with optional caching and batched updates.
+
+    Cacheable registers (changed only by the host, e.g., configuration) keep the last value read or written,
+    so bit field reads and read-modify-write updates do not touch the bus. Call invalidate() after
+    the device may have changed the register (e.g., reset).
+
+    Registers readable without a conversion delay (read_delay_ms=0) are read in a single combined
+    transaction (repeated start) if the bus supports it.
+
+    Field updates made inside a transaction are staged in the buffer and written once on exit:
+
+        with register.transaction():
+            field_a.set(False)
+            field_b.set(3)
+    """
+
+    def __init__(
+        self,
+        i2c_bus: I2C,
+        address: int,
+        register_address: int,
+        register_width: int = 1,
+        cacheable: bool = False,
+        read_delay_ms: int = _SLEEP_MS_CONST,
+    ):
         self.i2c_bus = i2c_bus
         self.address = address
+        self.register_address = register_address
+        self.read_delay_ms = read_delay_ms
         self.register_width = register_width
+        self.cacheable = cacheable
+        self.cached = False
+        self.txn_depth = 0
+        self.dirty = False
         self.buffer = bytearray(register_width)
         self.cmd_buffer = bytearray([register_address])
+        # MicroPython writevto sends the register address and value in one transfer without copying
+        self.write_vector = (self.cmd_buffer, self.buffer) if hasattr(i2c_bus, "writevto") else None
+        self.write_buffer = bytearray(1 + register_width)  # register address followed by the value
+        self.write_buffer[0] = register_address
 
     def read(self) -> bytearray:
-        self.i2c_bus.writeto(self.address, self.cmd_buffer)
-        sleep_ms(_SLEEP_MS_CONST)
-        self.i2c_bus.readfrom_into(self.address, self.buffer)
+        if self.txn_depth or (self.cacheable and self.cached):
+            return self.buffer
+
+        if self.read_delay_ms:
+            self.i2c_bus.writeto(self.address, self.cmd_buffer)
+            sleep_ms(self.read_delay_ms)
+            self.i2c_bus.readfrom_into(self.address, self.buffer)
+        elif hasattr(self.i2c_bus, "readfrom_mem_into"):  # MicroPython
+            self.i2c_bus.readfrom_mem_into(self.address, self.register_address, self.buffer)
+        elif hasattr(self.i2c_bus, "writeto_then_readfrom"):  # CircuitPython busio
+            self.i2c_bus.writeto_then_readfrom(self.address, self.cmd_buffer, self.buffer)
+        else:
+            self.i2c_bus.writeto(self.address, self.cmd_buffer)
+            self.i2c_bus.readfrom_into(self.address, self.buffer)
+        self.cached = True
         return self.buffer
 
     def write(self, reg=None):
-        if reg is not None and reg != self.buffer:
+        if reg is not None and reg is not self.buffer:
             assert len(reg) == len(self.buffer)
-            for i in range(reg):
+            for i in range(len(reg)):
                 self.buffer[i] = reg[i]
 
-        self.i2c_bus.writeto(self.address, self.cmd_buffer + self.buffer)
+        if self.txn_depth:
+            self.dirty = True
+            return
+        self._flush()
+
+    def invalidate(self):
+        self.cached = False
+
+    def transaction(self) -> "BitRegister":
+        return self
+
+    def __enter__(self):
+        if not self.txn_depth:
+            self.read()
+            self.dirty = False
+        self.txn_depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.txn_depth -= 1
+        if self.txn_depth:
+            return
+
+        if exc_type is not None:
+            self.dirty = False
+            self.invalidate()  # staged changes discarded, buffer no longer matches the device
+        elif self.dirty:
+            self.dirty = False
+            self._flush()
+
+    def _flush(self):
+        if self.write_vector is not None:
+            self.i2c_bus.writevto(self.address, self.write_vector)
+        else:
+            for i in range(self.register_width):
+                self.write_buffer[i + 1] = self.buffer[i]
+            self.i2c_bus.writeto(self.address, self.write_buffer)
+        self.cached = True
 
 
 class RWBit:
@@ -60,7 +144,7 @@ class RWBit:
         if lsb_first:
             self.byte = bit // 8  # the byte number within the buffer
         else:
-            self.byte = register.register_width - (bit // 8)  # the byte number within the buffer
+            self.byte = register.register_width - 1 - (bit // 8)  # the byte number within the buffer
 
     def __get__(self) -> bool:
         return self.get()
@@ -74,10 +158,13 @@ class RWBit:
 
     def set(self, value: bool) -> None:
         buf = self.register.read()
+        old = buf[self.byte]
         if value:
             buf[self.byte] |= self.bit_mask
         else:
             buf[self.byte] &= ~self.bit_mask
+        if self.register.cacheable and buf[self.byte] == old:
+            return  # cached register already holds the value
         self.register.write(buf)
 
 
@@ -162,6 +249,8 @@ class RWBits:
     def set(self, value: int) -> None:
         value <<= self.lowest_bit  # shift the value over to the right spot
         reg = self.read_reg_raw()
+        if self.register.cacheable and (reg & self.bit_mask) == value:
+            return  # cached register already holds the value
 
         reg &= ~self.bit_mask  # mask off the bits we're about to change
         reg |= value  # then or in our new value
@@ -0,0 +1,97 @@
+from ph4_sense.support.aio import asyncio
+
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+
+
+def _encode_str(val) -> bytes:
+    val = val.encode() if isinstance(val, str) else bytes(val)
+    return struct.pack("!H", len(val)) + val
+
+
+def _fixed_header(packet_type: int, remaining: int) -> bytes:
+    res = bytearray([packet_type])
+    while True:
+        byte = remaining & 0x7F
+        remaining >>= 7
+        res.append(byte | 0x80 if remaining else byte)
+        if not remaining:
+            return bytes(res)
+
+
+class AsyncMqttClient:
+    """
+    Minimal MQTT 3.1.1 client on event loop streams, QoS 0 publish and subscribe only.
+
+    Streams use non-blocking sockets, the event loop polls them, so a slow broker or a lossy link
+    does not stall other tasks. Only the DNS lookup in connect() blocks. Incoming messages are not read,
+    same as the blocking umqtt client used in the synchronous loop.
+    """
+
+    def __init__(self, client_id: str, server: str, port: int = 1883, keepalive: int = 60, timeout_ms: int = 5_000):
+        self.client_id = client_id
+        self.server = server
+        self.port = port
+        self.keepalive = keepalive
+        self.timeout_ms = timeout_ms
+        self.reader = None
+        self.writer = None
+        self.pid = 0
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.server, self.port), self.timeout_ms / 1000
+        )
+        # Protocol name, level 4 (3.1.1), clean session, keepalive, client id
+        body = _encode_str("MQTT") + struct.pack("!BBH", 4, 0x02, self.keepalive) + _encode_str(self.client_id)
+        await self._send(_fixed_header(0x10, len(body)), body)
+
+        packet_type, data = await self._read_packet()
+        if packet_type != 0x20 or len(data) < 2 or data[1] != 0:
+            raise OSError("MQTT connect refused: {}".format(data[1] if len(data) > 1 else packet_type))
+
+    async def subscribe(self, topic: str):
+        self.pid = self.pid % 0xFFFF + 1
+        body = struct.pack("!H", self.pid) + _encode_str(topic) + b"\x00"
+        await self._send(_fixed_header(0x82, len(body)), body)
+
+        packet_type, data = await self._read_packet()
+        if packet_type != 0x90 or len(data) < 3 or data[2] == 0x80:
+            raise OSError("MQTT subscribe failed")
+
+    async def publish(self, topic: str, message, retain: bool = False):
+        topic_b = _encode_str(topic)
+        message = message.encode() if isinstance(message, str) else message
+        await self._send(_fixed_header(0x31 if retain else 0x30, len(topic_b) + len(message)), topic_b, message)
+
+    def disconnect(self):
+        if self.writer is None:
+            return
+        try:
+            self.writer.write(b"\xe0\x00")
+        finally:
+            self.writer.close()
+            self.writer = self.reader = None
+
+    async def _send(self, *parts):
+        if self.writer is None:
+            raise OSError("MQTT not connected")
+        for part in parts:
+            self.writer.write(part)
+        await asyncio.wait_for(self.writer.drain(), self.timeout_ms / 1000)
+
+    async def _read_packet(self):
+        """Returns (packet type, body) of the next packet, ack packets only are expected"""
+        header = await asyncio.wait_for(self.reader.readexactly(1), self.timeout_ms / 1000)
+        remaining = 0
+        shift = 0
+        while True:
+            byte = (await self.reader.readexactly(1))[0]
+            remaining |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                break
+        data = await self.reader.readexactly(remaining) if remaining else b""
+        return header[0] & 0xF0, data
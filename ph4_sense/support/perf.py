@@ -0,0 +1,94 @@
+from ph4_sense.adapters import mem_alloc, ticks_diff, ticks_us
+
+try:
+    from array import array
+except ImportError:
+    from uarray import array
+
+try:
+    from typing import Callable, Dict, Optional
+except ImportError:
+    pass
+
+
+class StageStats:
+    """
+    Rolling duration statistics of one loop stage, e.g., a sensor measurement or publishing.
+
+    The last `window` durations (us) and optionally allocated bytes are kept in preallocated rings,
+    min / avg / p95 / max are computed over the ring on report only, recording does not allocate.
+    """
+
+    def __init__(self, name: str, window: int = 64, track_alloc: bool = False):
+        self.name = name
+        self.window = window
+        self.durations = array("l", [0] * window)
+        self.allocs = array("l", [0] * window) if track_alloc else None
+        self.pos = 0
+        self.count = 0  # total recorded samples
+
+    def record(self, duration_us: int, allocated: int = 0):
+        self.durations[self.pos] = duration_us
+        if self.allocs is not None:
+            self.allocs[self.pos] = allocated
+        self.pos = (self.pos + 1) % self.window
+        self.count += 1
+
+    def call(self, fnc: Callable):
+        if self.allocs is None:
+            started = ticks_us()
+            try:
+                return fnc()
+            finally:
+                self.record(ticks_diff(ticks_us(), started))
+
+        alloc = mem_alloc()
+        started = ticks_us()
+        try:
+            return fnc()
+        finally:
+            duration = ticks_diff(ticks_us(), started)
+            self.record(duration, mem_alloc() - alloc)
+
+    def summary(self) -> Optional[list]:
+        """[count, min, avg, p95, max] of durations in us, with average allocated bytes when tracked"""
+        n = min(self.count, self.window)
+        if not n:
+            return None
+
+        values = sorted(self.durations[:n])
+        res = [self.count, values[0], sum(values) // n, values[min(n - 1, (n * 95) // 100)], values[-1]]
+        if self.allocs is not None:
+            # Negative deltas mean garbage collection ran during the stage
+            allocs = [x for x in self.allocs[:n] if x >= 0]
+            res.append(sum(allocs) // len(allocs) if allocs else None)
+        return res
+
+
+class PerfStats:
+    """Per-stage latency instrumentation of the measurement loop, see Sensei.perf_call()"""
+
+    FIELDS = ["n", "min", "avg", "p95", "max"]
+
+    def __init__(self, window: int = 64, track_alloc: bool = False):
+        self.window = window
+        self.track_alloc = track_alloc
+        self.stages: Dict[str, StageStats] = {}
+
+    def stage(self, name: str) -> StageStats:
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = StageStats(name, self.window, self.track_alloc)
+        return stage
+
+    def call(self, name: str, fnc: Callable):
+        return self.stage(name).call(fnc)
+
+    def summary(self) -> dict:
+        fields = self.FIELDS + ["alloc"] if self.track_alloc else self.FIELDS
+        res = {}
+        for name, stage in self.stages.items():
+            values = stage.summary()
+            if values is not None:
+                res[name] = dict(zip(fields, values))
+        return res
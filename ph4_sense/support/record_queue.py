@@ -0,0 +1,187 @@
+from ph4_sense.adapters import const
+
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+
+try:
+    import uos as os
+except ImportError:
+    import os
+
+try:
+    from typing import List, Optional, Tuple
+except ImportError:
+    pass
+
+
+RECORD_HEADER = "<IBH"  # timestamp, record kind, body length
+RECORD_HEADER_SIZE = const(7)
+SPILL_HEADER = "<I"  # read offset, records before it were committed
+SPILL_HEADER_SIZE = const(4)
+
+
+class RecordQueue:
+    """
+    Bounded FIFO of timestamped binary records kept in a preallocated byte ring.
+
+    Record layout: RECORD_HEADER, body bytes. Kind byte tells the producer how to decode the body,
+    e.g., packed sensor readings, the queue does not interpret it.
+    When the ring is full, the oldest records are moved to the spill file (if configured),
+    or dropped otherwise. Spill file holds the oldest records, so it is drained first.
+    Records are read with peek() and removed with commit() once delivered.
+
+    Spill file starts with SPILL_HEADER, the read offset, updated in place on commit, so records
+    committed before a reboot are not delivered again. The file is removed once fully drained.
+    """
+
+    def __init__(self, capacity: int = 8192, spill_path: Optional[str] = None, spill_max_size: int = 256 * 1024):
+        self.capacity = capacity
+        self.buffer = bytearray(capacity)
+        self.head = 0  # read position in the ring
+        self.size = 0  # bytes used in the ring
+        self.count = 0  # records in the ring
+        self.dropped = 0
+        self.header = bytearray(RECORD_HEADER_SIZE)
+
+        self.spill_path = spill_path
+        self.spill_max_size = spill_max_size
+        self.spill_offset = 0  # read position in the spill file
+        self.spill_size = 0
+        self._spill_open()
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def pending(self) -> bool:
+        return self.count > 0 or self.spill_offset < self.spill_size
+
+    def push(self, ts: int, kind: int, body) -> bool:
+        rec_size = RECORD_HEADER_SIZE + len(body)
+        if rec_size > self.capacity or len(body) > 0xFFFF:
+            self.dropped += 1
+            return False
+
+        while self.capacity - self.size < rec_size:
+            self._evict()
+
+        struct.pack_into(RECORD_HEADER, self.header, 0, int(ts), kind, len(body))
+        pos = (self.head + self.size) % self.capacity
+        pos = self._ring_write(pos, self.header)
+        self._ring_write(pos, body)
+        self.size += rec_size
+        self.count += 1
+        return True
+
+    def peek(self, max_records: int) -> List[Tuple[int, int, bytes]]:
+        """Returns up to max_records oldest (timestamp, kind, body) records without removing them"""
+        res = []
+        if self.spill_offset < self.spill_size:
+            with open(self.spill_path, "rb") as fh:
+                fh.seek(self.spill_offset)
+                while len(res) < max_records:
+                    raw = fh.read(RECORD_HEADER_SIZE)
+                    if len(raw) < RECORD_HEADER_SIZE:
+                        break
+                    ts, kind, body_len = struct.unpack(RECORD_HEADER, raw)
+                    res.append((ts, kind, fh.read(body_len)))
+
+        pos = self.head
+        for _ in range(min(self.count, max_records - len(res))):
+            ts, kind, body_len = struct.unpack(RECORD_HEADER, self._ring_read(pos, RECORD_HEADER_SIZE))
+            res.append((ts, kind, self._ring_read((pos + RECORD_HEADER_SIZE) % self.capacity, body_len)))
+            pos = (pos + RECORD_HEADER_SIZE + body_len) % self.capacity
+        return res
+
+    def commit(self, num_records: int):
+        """Removes num_records oldest records, e.g., after peek() records were delivered"""
+        if num_records and self.spill_offset < self.spill_size:
+            with open(self.spill_path, "rb") as fh:
+                fh.seek(self.spill_offset)
+                while num_records and self.spill_offset < self.spill_size:
+                    _, _, body_len = struct.unpack(RECORD_HEADER, fh.read(RECORD_HEADER_SIZE))
+                    self.spill_offset += RECORD_HEADER_SIZE + body_len
+                    fh.seek(self.spill_offset)
+                    num_records -= 1
+
+            if self.spill_offset >= self.spill_size:
+                self._spill_remove()
+            else:
+                self._spill_write_offset()
+
+        while num_records and self.count:
+            self._ring_pop()
+            num_records -= 1
+
+    def _evict(self):
+        raw = self._ring_pop()
+        if self.spill_path is None or self.spill_size + len(raw) > self.spill_max_size:
+            self.dropped += 1
+            return
+
+        try:
+            with open(self.spill_path, "ab") as fh:
+                if not self.spill_size:
+                    fh.write(struct.pack(SPILL_HEADER, SPILL_HEADER_SIZE))
+                    self.spill_offset = self.spill_size = SPILL_HEADER_SIZE
+                fh.write(raw)
+            self.spill_size += len(raw)
+        except OSError:
+            self.dropped += 1
+
+    def _ring_pop(self) -> bytes:
+        _, _, body_len = struct.unpack(RECORD_HEADER, self._ring_read(self.head, RECORD_HEADER_SIZE))
+        rec_size = RECORD_HEADER_SIZE + body_len
+        raw = self._ring_read(self.head, rec_size)
+        self.head = (self.head + rec_size) % self.capacity
+        self.size -= rec_size
+        self.count -= 1
+        return raw
+
+    def _ring_write(self, pos: int, data) -> int:
+        data = memoryview(data)
+        first = min(len(data), self.capacity - pos)
+        self.buffer[pos : pos + first] = data[:first]
+        if first < len(data):
+            self.buffer[0 : len(data) - first] = data[first:]
+        return (pos + len(data)) % self.capacity
+
+    def _ring_read(self, pos: int, size: int) -> bytes:
+        first = min(size, self.capacity - pos)
+        if first == size:
+            return bytes(self.buffer[pos : pos + size])
+        return bytes(self.buffer[pos:]) + bytes(self.buffer[: size - first])
+
+    def _spill_open(self):
+        """Resumes the spill file left by the previous run at its committed read offset"""
+        if self.spill_path is None:
+            return
+        try:
+            size = os.stat(self.spill_path)[6]
+            with open(self.spill_path, "rb") as fh:
+                offset = struct.unpack(SPILL_HEADER, fh.read(SPILL_HEADER_SIZE))[0] if size >= SPILL_HEADER_SIZE else 0
+        except OSError:
+            return
+
+        if SPILL_HEADER_SIZE <= offset < size:
+            self.spill_offset = offset
+            self.spill_size = size
+        else:
+            self._spill_remove()  # drained or corrupted
+
+    def _spill_write_offset(self):
+        try:
+            with open(self.spill_path, "r+b") as fh:
+                fh.write(struct.pack(SPILL_HEADER, self.spill_offset))
+        except OSError:
+            pass  # records since the last written offset are delivered again after a reboot
+
+    def _spill_remove(self):
+        try:
+            os.remove(self.spill_path)
+        except OSError:
+            pass
+        self.spill_offset = 0
+        self.spill_size = 0
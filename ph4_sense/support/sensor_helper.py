@@ -1,4 +1,5 @@
-from ph4_sense.support.allocator import PreallocatedBuffer
+from ph4_sense.adapters import LOG_DEBUG
+from ph4_sense.support.allocator import BufferLease, BufferPool, PreallocatedBuffer
 
 
 class SensorHelper:
@@ -10,26 +11,52 @@ class SensorHelper:
     def __init__(self, logger=None):
         self.logger = logger
         self.buffer = PreallocatedBuffer(max_size=64)
+        self.buffers = [self.buffer]
+        self.pool = None
+
+    # Messages use lazy %-style arguments, formatted only if the level is enabled:
+    # sensor_helper.log_error("Measurement fail: %s", e)
 
     def log(self, msg, *args):
         if self.logger:
             self.logger.info(msg, *args)
         else:
-            print(msg, *args)
+            print(msg % args if args else msg)
 
     def log_info(self, msg, *args):
         if self.logger:
             self.logger.info(msg, *args)
         else:
-            print("Info:", msg, *args)
+            print("Info:", msg % args if args else msg)
+
+    def log_debug(self, msg, *args):
+        if not LOG_DEBUG:
+            return
+        if self.logger:
+            self.logger.debug(msg, *args)
+        else:
+            print("Debug:", msg % args if args else msg)
 
     def log_error(self, msg, *args, exc_info=None):
         if self.logger:
             self.logger.error(msg, *args, exc_info=exc_info)
         else:
-            print("Error:", msg, *args, exc_info)
+            print("Error:", msg % args if args else msg, exc_info or "")
 
     def get_buffer(self, size, idx=0):
-        if idx > 0:
-            return bytearray(size)
-        return self.buffer.get(size)
+        """Static buffer idx, buffers with the same idx share memory, use different idx for buffers needed at once"""
+        while len(self.buffers) <= idx:
+            self.buffers.append(PreallocatedBuffer(max_size=64))
+        buffer = self.buffers[idx]
+        if size > buffer.max_size:
+            buffer = self.buffers[idx] = PreallocatedBuffer(max_size=size)
+        return buffer.get(size)
+
+    def get_pool(self) -> BufferPool:
+        if self.pool is None:
+            self.pool = BufferPool()
+        return self.pool
+
+    def lease_buffer(self, size) -> BufferLease:
+        """Temporary buffer from the shared pool, release() it when done"""
+        return self.get_pool().lease(size)
@@ -0,0 +1,123 @@
+from ph4_sense.adapters import const
+
+_FRAME = const(0x7E)
+_ESCAPE = const(0x7D)
+_ESCAPE_XOR = const(0x20)
+_HEADER_LEN = const(4)  # address, command, state, length
+
+
+def shdlc_checksum(data, start: int = 0, end: int = -1) -> int:
+    """Inverted low byte of the sum of data[start:end], end -1 for the whole buffer"""
+    total = 0
+    for idx in range(start, len(data) if end < 0 else end):
+        total += data[idx]
+    return ~total & 0xFF
+
+
+def shdlc_frame(address: int, command: int, data=b"") -> bytes:
+    """Request frame, 0x7E, address, command, length, data, checksum, 0x7E, with byte-stuffing"""
+    payload = bytearray([address, command, len(data)])
+    payload.extend(data)
+    payload.append(shdlc_checksum(payload))
+
+    frame = bytearray([_FRAME])
+    for byte in payload:
+        if byte in (_FRAME, _ESCAPE, 0x11, 0x13):
+            frame.append(_ESCAPE)
+            frame.append(byte ^ _ESCAPE_XOR)
+        else:
+            frame.append(byte)
+    frame.append(_FRAME)
+    return bytes(frame)
+
+
+class ShdlcParser:
+    """
+    Incremental parser of SHDLC response frames, e.g., of the Sensirion SPS30 on UART.
+
+    Response frame is 0x7E, address, command, state, length, data, checksum, 0x7E, byte-stuffed.
+    Bytes are fed as they arrive, unescaped in place to a preallocated buffer, parsing does not allocate.
+    feed() stops after a complete frame with a valid checksum, the frame stays in the buffer until the next feed.
+    Invalid frames are counted as errors and skipped, a frame delimiter after an invalid frame starts a new frame,
+    so the parser resynchronizes when it starts listening in the middle of a frame.
+    """
+
+    def __init__(self, max_data: int = 255):
+        self.buffer = bytearray(_HEADER_LEN + max_data + 1)
+        self.pos = 0
+        self.in_frame = False
+        self.escaped = False
+        self.ready = False
+        self.errors = 0
+
+    def reset(self):
+        self.pos = 0
+        self.in_frame = False
+        self.escaped = False
+        self.ready = False
+
+    @property
+    def address(self) -> int:
+        return self.buffer[0]
+
+    @property
+    def command(self) -> int:
+        return self.buffer[1]
+
+    @property
+    def state(self) -> int:
+        return self.buffer[2]
+
+    @property
+    def length(self) -> int:
+        return self.buffer[3]
+
+    def data(self) -> memoryview:
+        return memoryview(self.buffer)[_HEADER_LEN : _HEADER_LEN + self.buffer[3]]
+
+    def _frame_end(self) -> bool:
+        pos = self.pos
+        buf = self.buffer
+        if pos < _HEADER_LEN + 1 or buf[3] != pos - _HEADER_LEN - 1 or shdlc_checksum(buf, 0, pos - 1) != buf[pos - 1]:
+            self.errors += 1
+            return False
+        return True
+
+    def feed(self, data, start: int = 0, end: int = -1) -> int:
+        """Consumes data[start:end] until a frame is complete, returns the number of bytes consumed"""
+        self.ready = False
+        buf = self.buffer
+        end = len(data) if end < 0 else end
+        idx = start
+        while idx < end:
+            byte = data[idx]
+            idx += 1
+
+            if byte == _FRAME:
+                if self.in_frame and self.pos and not self.escaped and self._frame_end():
+                    self.ready = True
+                    self.in_frame = False
+                    self.pos = 0
+                    return idx - start
+                # Start of a frame, or end of an invalid one taken as the start of the next
+                self.in_frame = True
+                self.escaped = False
+                self.pos = 0
+                continue
+
+            if not self.in_frame:
+                continue
+            if byte == _ESCAPE:
+                self.escaped = True
+                continue
+            if self.escaped:
+                byte ^= _ESCAPE_XOR
+                self.escaped = False
+            if self.pos >= len(buf):
+                self.errors += 1
+                self.in_frame = False
+                continue
+
+            buf[self.pos] = byte
+            self.pos += 1
+        return idx - start
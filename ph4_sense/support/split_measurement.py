@@ -0,0 +1,67 @@
+from ph4_sense.adapters import sleep_ms, ticks_add, ticks_diff, ticks_ms
+
+try:
+    from typing import Optional
+except ImportError:
+    pass
+
+
+class SplitMeasurement:
+    """
+    Split-phase measurement support for sensor drivers.
+
+    start_measurement() sends the trigger command and returns ticks_ms time when the result is ready,
+    collect() waits for the remaining conversion time (if any) and reads the result back.
+    Triggering all sensors first and collecting afterwards overlaps their conversion times.
+
+    Drivers implement start_measurement() and _collect(). If the driver needs to send another command
+    while a measurement is in progress, it calls _measurement_stash() first, so the result is read out
+    before the bus command and returned by the next collect().
+    """
+
+    _ready_at: Optional[int] = None
+    _stashed = None
+
+    @property
+    def pending(self) -> bool:
+        return self._ready_at is not None or self._stashed is not None
+
+    @property
+    def ready_at(self) -> Optional[int]:
+        return self._ready_at
+
+    def start_measurement(self, *args, **kwargs) -> int:
+        raise NotImplementedError
+
+    def collect(self):
+        if self._stashed is not None:
+            res, self._stashed = self._stashed, None
+            return res
+
+        self._measurement_wait()
+        return self._collect()
+
+    def _collect(self):
+        """Reads result of the started measurement, to be overridden"""
+        raise NotImplementedError
+
+    def _measurement_started(self, delay_ms: int) -> int:
+        self._stashed = None
+        self._ready_at = ticks_add(ticks_ms(), delay_ms)
+        return self._ready_at
+
+    def _measurement_wait(self):
+        if self._ready_at is None:
+            return
+
+        remaining = ticks_diff(self._ready_at, ticks_ms())
+        self._ready_at = None
+        if remaining > 0:
+            sleep_ms(remaining)
+
+    def _measurement_stash(self):
+        if self._ready_at is None:
+            return
+
+        self._measurement_wait()
+        self._stashed = tuple(self._collect())
@@ -0,0 +1,54 @@
+import gc
+
+from ph4_sense.adapters import mem_alloc, mem_stats, ticks_diff, ticks_ms, ticks_us
+
+try:
+    from typing import Dict, List
+except ImportError:
+    pass
+
+
+def heap_alloc() -> int:
+    """Bytes allocated after garbage collection, i.e., retained by imported modules and live objects"""
+    gc.collect()
+    return mem_alloc()
+
+
+class StartupProfile:
+    """
+    Boot profile, import time and heap cost of on-demand modules and boot milestones.
+
+    Modules are imported one by one by import_modules() before Sensei uses them, so each module is measured
+    separately, dependencies count to the module importing them first. Modules already imported cost nothing.
+    Milestones record ms since boot and free heap, boot ticks are 0 on MicroPython, ticks count from reset.
+    """
+
+    def __init__(self, started: int = 0):
+        self.started = started
+        self.imports: Dict[str, List[int]] = {}  # module -> [us, bytes]
+        self.marks: Dict[str, List[int]] = {}  # milestone -> [ms since boot, free heap bytes]
+
+    def import_module(self, name: str):
+        alloc = heap_alloc()
+        started = ticks_us()
+        __import__(name)
+        elapsed = ticks_diff(ticks_us(), started)
+        self.imports[name] = [elapsed, heap_alloc() - alloc]
+
+    def import_modules(self, names: List[str]):
+        for name in names:
+            try:
+                self.import_module(name)
+            except ImportError as e:
+                print("Profile import err:", name, e)
+
+    def mark(self, name: str):
+        self.marks[name] = [ticks_diff(ticks_ms(), self.started), mem_stats()[1]]
+
+    def report(self) -> dict:
+        return {"imports": self.imports, "marks": self.marks}
+
+    def lines(self) -> List[str]:
+        res = ["Import {}: {} us, {} B".format(name, us, nbytes) for name, (us, nbytes) in self.imports.items()]
+        res += ["Boot {}: {} ms, free {} B".format(name, ms, free) for name, (ms, free) in self.marks.items()]
+        return res
@@ -0,0 +1,81 @@
+from ph4_sense.adapters import json, time
+
+try:
+    import uos as os
+except ImportError:
+    import os
+
+try:
+    from typing import Any, Optional
+except ImportError:
+    pass
+
+
+# Wall clock is considered valid (e.g., synced via NTP) if it is at least this year
+STATE_CLOCK_MIN_YEAR = 2024
+
+
+def clock_valid() -> bool:
+    return time.localtime()[0] >= STATE_CLOCK_MIN_YEAR
+
+
+class StateStore:
+    """
+    Small persistent key-value store for learned sensor state, JSON file on flash or disk.
+
+    Each entry is stored with a wall-clock timestamp, so stale state can be rejected on restore.
+    Without a valid wall clock (not synced after boot) entries are neither stored nor restored,
+    as their age cannot be determined.
+    """
+
+    def __init__(self, path: str = "state.json"):
+        self.path = path
+        self.data = None
+
+    def load(self) -> dict:
+        if self.data is not None:
+            return self.data
+
+        try:
+            with open(self.path) as fh:
+                self.data = json.load(fh)
+        except Exception:
+            self.data = {}  # missing or corrupted file
+        return self.data
+
+    def save(self):
+        # Write to a temporary file first, so power loss during write does not corrupt the state
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as fh:
+            json.dump(self.load(), fh)
+        # os.replace overwrites on all CPython platforms, MicroPython has only rename
+        getattr(os, "replace", os.rename)(tmp_path, self.path)
+
+    def age(self, key: str) -> Optional[float]:
+        """Age of the entry in seconds, None if not present or unknown"""
+        entry = self.load().get(key)
+        if not entry or not clock_valid():
+            return None
+
+        age = time.time() - entry["ts"]
+        return age if age >= 0 else None
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Any:
+        """Returns stored value if present and not older than max_age seconds"""
+        entry = self.load().get(key)
+        if not entry:
+            return None
+
+        age = self.age(key)
+        if age is None or (max_age is not None and age > max_age):
+            return None
+        return entry["value"]
+
+    def put(self, key: str, value: Any, save: bool = True) -> bool:
+        if not clock_valid():
+            return False
+
+        self.load()[key] = {"ts": time.time(), "value": value}
+        if save:
+            self.save()
+        return True
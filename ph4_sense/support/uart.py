@@ -5,6 +5,14 @@ class Uart:
     def read(self, nbytes: int) -> bytes:
         raise NotImplementedError
 
+    def readinto(self, buf) -> int:
+        """Reads bytes already received into buf without waiting, returns the number of bytes read"""
+        data = self.read(len(buf))
+        if not data:
+            return 0
+        buf[0 : len(data)] = data
+        return len(data)
+
     def write(self, buff):
         raise NotImplementedError
 
@@ -16,6 +16,12 @@ class UartMp(Uart):
     def read(self, nbytes: int) -> bytes:
         return self.uart.read(nbytes)
 
+    def readinto(self, buf) -> int:
+        nbytes = min(self.uart.any(), len(buf))
+        if not nbytes:
+            return 0
+        return self.uart.readinto(buf, nbytes) or 0
+
     def write(self, buff):
         self.uart.write(buff)
 
@@ -0,0 +1,151 @@
+"""
+Packed binary telemetry format, alternative to JSON readings.
+
+Message: header TELEMETRY_HEADER (version, number of sensor blocks, unix timestamp),
+followed by sensor blocks. Each block is a sensor id byte followed by the fixed struct
+layout of that sensor, defined by the message version.
+
+Missing values are encoded as NaN for floats and TELEMETRY_NONE_U16 for unsigned ints.
+Adding / changing a layout requires bumping TELEMETRY_VERSION, decoder keeps older versions.
+"""
+
+from ph4_sense.adapters import const
+from ph4_sense.support.allocator import PreallocatedBuffer
+
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+
+try:
+    from typing import Dict, Optional, Tuple
+except ImportError:
+    pass
+
+
+TELEMETRY_VERSION = const(1)
+TELEMETRY_HEADER = "<BBI"
+TELEMETRY_HEADER_SIZE = const(6)
+TELEMETRY_NONE_U16 = const(0xFFFF)
+
+# name: (sensor id, struct layout, field names); names match JSON reading topics
+TELEMETRY_LAYOUTS_V1 = {
+    "sgp30": (1, "<ffHHff", ("eCO2", "TVOC", "Eth", "H2", "temp", "humidity")),
+    "sgp30_raw": (2, "<HH", ("eCO2", "TVOC")),
+    "sgp30_filt": (3, "<ff", ("eCO2", "TVOC")),
+    "sgp41": (4, "<HHHHff", ("NOX", "TVOC", "sraw_voc", "sraw_nox", "temp", "humidity")),
+    "ccs811_raw": (5, "<HH", ("eCO2", "TVOC")),
+    "ccs811_filt": (6, "<ff", ("eCO2", "TVOC")),
+    "scd40": (7, "<Hff", ("eCO2", "temp", "humidity")),
+    "sps30": (
+        8,
+        "<ffffffffff",
+        ("pm10", "pm25", "pm40", "pm100", "pc05um", "pc10um", "pc25um", "pc40um", "pc100um", "tps"),
+    ),
+    "zh03b": (9, "<HHH", ("pm10", "pm25", "pm100")),
+}
+
+TELEMETRY_LAYOUTS = {
+    1: TELEMETRY_LAYOUTS_V1,
+}
+
+
+def compile_layouts(layouts):
+    """name -> (sensor id, block size, ((field, field format, offset in block), ...))"""
+    res = {}
+    for name, (sensor_id, fmt, fields) in layouts.items():
+        offset = 1  # sensor id byte
+        compiled = []
+        for field, code in zip(fields, fmt[1:]):
+            compiled.append((field, "<" + code, offset))
+            offset += struct.calcsize("<" + code)
+        res[name] = (sensor_id, offset, tuple(compiled))
+    return res
+
+
+class TelemetryEncoder:
+    """Encodes readings dict {name: {field: value}} to the packed format in a preallocated buffer"""
+
+    def __init__(self, buffer: Optional[PreallocatedBuffer] = None):
+        self.buffer = buffer or PreallocatedBuffer(max_size=256)
+        self.layouts = compile_layouts(TELEMETRY_LAYOUTS[TELEMETRY_VERSION])
+
+    def can_encode(self, readings: Dict[str, dict]) -> bool:
+        """True if all the readings have a layout, nothing would be skipped"""
+        for name in readings:
+            if name not in self.layouts:
+                return False
+        return True
+
+    def encode(self, readings: Dict[str, dict], ts: int):
+        """Returns memoryview of the encoded message, valid until the next encode() call"""
+        offset, count = self.encode_into(readings, TELEMETRY_HEADER_SIZE)
+        struct.pack_into(TELEMETRY_HEADER, self.buffer.get_raw(), 0, TELEMETRY_VERSION, count, int(ts))
+        return self.buffer.get(offset)
+
+    def encode_blocks(self, readings: Dict[str, dict]):
+        """Sensor blocks without the message header, e.g., for records keeping their own timestamp, None if empty"""
+        offset, _ = self.encode_into(readings, 0)
+        return self.buffer.get(offset) if offset else None
+
+    def encode_into(self, readings: Dict[str, dict], offset: int) -> Tuple[int, int]:
+        """Encodes sensor blocks to the buffer from offset, returns (end offset, number of blocks)"""
+        buf = self.buffer.get_raw()
+        count = 0
+        for name in readings:
+            layout = self.layouts.get(name)
+            if layout is None:
+                continue
+
+            sensor_id, block_size, fields = layout
+            if offset + block_size > len(buf):
+                raise ValueError("Telemetry buffer too small")
+
+            values = readings[name]
+            buf[offset] = sensor_id
+            for field, fmt, field_offset in fields:
+                value = values.get(field)
+                if fmt == "<f":
+                    struct.pack_into(fmt, buf, offset + field_offset, float("nan") if value is None else value)
+                else:
+                    value = TELEMETRY_NONE_U16 if value is None else min(max(int(value), 0), TELEMETRY_NONE_U16)
+                    struct.pack_into(fmt, buf, offset + field_offset, value)
+
+            offset += block_size
+            count += 1
+        return offset, count
+
+
+def decode_telemetry(data) -> Tuple[int, Dict[str, dict]]:
+    """Decodes packed message to (timestamp, {name: {field: value}}), same structure as JSON readings"""
+    version, count, ts = struct.unpack_from(TELEMETRY_HEADER, data, 0)
+    return ts, decode_blocks(data, version, TELEMETRY_HEADER_SIZE, count)
+
+
+def decode_blocks(data, version: int = TELEMETRY_VERSION, offset: int = 0, count: int = -1) -> Dict[str, dict]:
+    """Decodes count sensor blocks from offset, all blocks to the end of data if count is -1"""
+    if version not in TELEMETRY_LAYOUTS:
+        raise ValueError("Unsupported telemetry version {}".format(version))
+
+    by_id = {layout[0]: (name, layout) for name, layout in compile_layouts(TELEMETRY_LAYOUTS[version]).items()}
+    readings = {}
+    while count != 0 and offset < len(data):
+        count -= 1
+        sensor_id = data[offset]
+        if sensor_id not in by_id:
+            raise ValueError("Unknown sensor id {}".format(sensor_id))
+
+        name, (_, block_size, fields) = by_id[sensor_id]
+        values = {}
+        for field, fmt, field_offset in fields:
+            value = struct.unpack_from(fmt, data, offset + field_offset)[0]
+            if fmt == "<f":
+                # NaN -> None, float32 noise trimmed to 6 significant digits
+                value = None if value != value else float("{:.6g}".format(value))
+            elif value == TELEMETRY_NONE_U16:
+                value = None
+            values[field] = value
+
+        readings[name] = values
+        offset += block_size
+    return readings
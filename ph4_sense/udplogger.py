@@ -1,12 +1,72 @@
 import socket
 
+from ph4_sense.adapters import ticks_diff, ticks_ms
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40, "critical": 50}
+
 
 class UdpLogger:
-    def __init__(self, host, is_esp32=True):
+    """
+    Sends log lines to a remote host over UDP.
+
+    Unbuffered, each line is sent right away as a datagram. In buffered mode (buffer_size > 0) lines are appended
+    to a fixed-size byte ring and flush() sends them from a non-blocking socket as up to max_datagrams datagrams
+    of at most mtu bytes, cut at line ends. Lines that do not fit the ring are dropped and counted.
+    Lines below level are skipped before formatting.
+
+    Config is either "host:port" or {"host": "host:port", "level": "info", "buffer": 2048, "mtu": 1400,
+    "flushPeriod": 1000, "datagrams": 4}.
+    """
+
+    def __init__(
+        self,
+        host,
+        is_esp32=True,
+        level: int = 10,
+        buffer_size: int = 0,
+        mtu: int = 1400,
+        flush_ms: int = 1000,
+        max_datagrams: int = 4,
+    ):
         self.host = "localhost", 9999
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.set_host(host)
         self.is_esp32 = is_esp32
+        self.level = level
+
+        # Send ring, buffered mode only
+        self.ring = bytearray(buffer_size) if buffer_size else None
+        self.head = 0  # read position in the ring
+        self.used = 0  # bytes in the ring
+        self.datagram = bytearray(mtu) if buffer_size else None
+        self.mtu = mtu
+        self.flush_ms = flush_ms
+        self.max_datagrams = max_datagrams
+        self.last_flush = ticks_ms()
+        self.dropped = 0
+        self.dropped_reported = 0
+        if self.ring is not None:
+            self.socket.setblocking(False)
+
+    @classmethod
+    def from_config(cls, cfg, is_esp32=True) -> "UdpLogger":
+        if not isinstance(cfg, dict):
+            return cls(cfg, is_esp32=is_esp32)
+
+        level = cfg.get("level", 10)
+        return cls(
+            cfg["host"],
+            is_esp32=is_esp32,
+            level=LEVELS[level.lower()] if isinstance(level, str) else int(level),
+            buffer_size=int(cfg.get("buffer", 0)),
+            mtu=int(cfg.get("mtu", 1400)),
+            flush_ms=int(cfg.get("flushPeriod", 1000)),
+            max_datagrams=int(cfg.get("datagrams", 4)),
+        )
+
+    @property
+    def buffered(self) -> bool:
+        return self.ring is not None
 
     def set_host(self, host):
         parts = str(host).rsplit(":", 1)
@@ -16,16 +76,100 @@ class UdpLogger:
             self.host = parts[0], int(parts[1])
 
     def log_msg(self, msg, *args):
+        self.log(20, msg, *args)
+
+    def log(self, level: int, msg, *args):
+        if level < self.level:
+            return
+
         try:
             log_line = msg
             if args:
                 log_line += " " + (" ".join(map(str, args)))
             log_line += "\n"
 
-            if self.is_esp32:
+            if self.ring is not None:
+                self.append(log_line.encode("utf8"))
+            elif self.is_esp32:
                 self.socket.sendto(log_line, self.host)
             else:
                 self.socket.sendto(log_line.encode("utf8"), self.host)
 
         except Exception as e:
             print("Could not send", e)
+
+    def append(self, data) -> bool:
+        if not self._write(data):
+            self.dropped += 1
+            return False
+        return True
+
+    def _write(self, data) -> bool:
+        ring = self.ring
+        size = len(ring)
+        nbytes = len(data)
+        if nbytes > size - self.used:
+            return False
+
+        tail = (self.head + self.used) % size
+        first = min(nbytes, size - tail)
+        mv = memoryview(data)
+        ring[tail : tail + first] = mv[:first]
+        if first < nbytes:
+            ring[0 : nbytes - first] = mv[first:]
+        self.used += nbytes
+        return True
+
+    def _peek(self) -> int:
+        """Copies the next datagram from the ring, up to mtu bytes cut at the last line end, returns its size"""
+        ring = self.ring
+        size = len(ring)
+        nbytes = min(self.used, self.mtu)
+        first = min(nbytes, size - self.head)
+        self.datagram[0:first] = memoryview(ring)[self.head : self.head + first]
+        if first < nbytes:
+            self.datagram[first:nbytes] = memoryview(ring)[0 : nbytes - first]
+
+        if nbytes < self.used:
+            for idx in range(nbytes - 1, 0, -1):
+                if self.datagram[idx] == 0x0A:
+                    return idx + 1
+        return nbytes
+
+    def _consume(self, nbytes: int):
+        self.head = (self.head + nbytes) % len(self.ring)
+        self.used -= nbytes
+
+    def flush(self) -> int:
+        """Sends buffered lines without blocking, returns number of datagrams sent"""
+        self.last_flush = ticks_ms()
+        if self.ring is None:
+            return 0
+
+        self._report_dropped()
+        sent = 0
+        while self.used and sent < self.max_datagrams:
+            nbytes = self._peek()
+            try:
+                self.socket.sendto(memoryview(self.datagram)[:nbytes], self.host)
+            except OSError:
+                break  # socket buffer full or network down, lines stay in the ring
+            self._consume(nbytes)
+            sent += 1
+
+        self._report_dropped()  # ring was full before sending
+        return sent
+
+    def _report_dropped(self):
+        if self.dropped == self.dropped_reported:
+            return
+        if self._write("udplogger: dropped {} lines\n".format(self.dropped - self.dropped_reported).encode()):
+            self.dropped_reported = self.dropped
+
+    def maybe_flush(self) -> int:
+        """Flushes once per flush period, or earlier when a full datagram is buffered"""
+        if self.ring is None or not self.used:
+            return 0
+        if self.used >= self.mtu or ticks_diff(ticks_ms(), self.last_flush) >= self.flush_ms:
+            return self.flush()
+        return 0
@@ -0,0 +1,177 @@
+"""
+Frozen module manifest for MicroPython boards, e.g., the isense_esp32_* targets.
+
+Frozen bytecode runs from flash, modules are not compiled on the board at boot and their code
+does not take heap. The manifest lists the entry module with everything it imports at module level,
+plus the modules Sensei imports on demand for the sensors and features of the target config,
+see Sensei.get_startup_modules(). Imports inside functions of the entry module are included too,
+those are the platform helpers, e.g., ph4_sense.support.uart_mp.
+
+    python -m ph4_sense_py.freeze isense_esp32_plant
+    python -m ph4_sense_py.freeze isense_esp32_plant --mpy build/plant --march xtensawin
+
+The manifest is written to the target directory, build the firmware with
+make BOARD=ESP32_GENERIC FROZEN_MANIFEST=/path/to/isense_esp32_plant/manifest.py.
+With --mpy, modules are compiled by mpy-cross to .mpy files instead, for copying to a stock firmware.
+"""
+
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+from ph4_sense.sense import Sensei
+
+try:
+    from typing import List, Optional, Set
+except ImportError:
+    pass
+
+
+PACKAGE = "ph4_sense"
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ENTRY = "ph4_sense.sense_mp"
+
+
+def module_path(name: str, root: str = REPO_ROOT) -> Optional[str]:
+    """Source file of the module, relative to the root, None if it is not a package module"""
+    if name != PACKAGE and not name.startswith(PACKAGE + "."):
+        return None
+    base = name.replace(".", "/")
+    for path in (base + ".py", base + "/__init__.py"):
+        if os.path.exists(os.path.join(root, path)):
+            return path
+    return None
+
+
+class ImportCollector(ast.NodeVisitor):
+    """Modules imported by a source file, function bodies are skipped unless lazy imports are requested"""
+
+    def __init__(self, lazy: bool = False):
+        self.lazy = lazy
+        self.modules = []
+
+    def visit_FunctionDef(self, node):
+        if self.lazy:
+            self.generic_visit(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Import(self, node):
+        self.modules += [alias.name for alias in node.names]
+
+    def visit_ImportFrom(self, node):
+        if node.level or not node.module:
+            return
+        self.modules.append(node.module)
+        # from package import module
+        self.modules += ["{}.{}".format(node.module, alias.name) for alias in node.names]
+
+
+def module_imports(name: str, lazy: bool = False, root: str = REPO_ROOT) -> List[str]:
+    with open(os.path.join(root, module_path(name, root))) as fh:
+        tree = ast.parse(fh.read())
+    collector = ImportCollector(lazy)
+    collector.visit(tree)
+    return [x for x in collector.modules if module_path(x, root)]
+
+
+def collect_modules(entry: str, lazy_modules: List[str], root: str = REPO_ROOT) -> List[str]:
+    """Entry module with its lazy imports and the given modules, closed over module-level imports"""
+    pending = [entry] + module_imports(entry, lazy=True, root=root) + list(lazy_modules)
+    seen: Set[str] = set()
+    while pending:
+        name = pending.pop()
+        if name in seen or not module_path(name, root):
+            continue
+        seen.add(name)
+        parts = name.split(".")
+        pending += [".".join(parts[:i]) for i in range(1, len(parts))]  # parent packages
+        pending += module_imports(name, root=root)
+    return sorted(seen)
+
+
+def config_modules(config: dict) -> List[str]:
+    """Modules Sensei imports on demand for the given config"""
+    sensei = Sensei()
+    sensei.load_config_data = lambda: config
+    sensei.load_config()
+    return sensei.get_startup_modules()
+
+
+def load_target_config(target: str, config_path: Optional[str] = None) -> dict:
+    if not config_path:
+        config_path = os.path.join(target, "config.json")
+        if not os.path.exists(config_path):
+            config_path = os.path.join(target, "config-example.json")
+    with open(config_path) as fh:
+        return json.load(fh)
+
+
+def build_manifest(modules: List[str], out_dir: str, opt: Optional[int] = None, root: str = REPO_ROOT) -> str:
+    base_path = os.path.relpath(root, out_dir)
+    files = [os.path.relpath(module_path(x, root), PACKAGE) for x in modules]
+    lines = [
+        "# Generated by ph4_sense_py.freeze, do not edit",
+        'include("$(PORT_DIR)/boards/manifest.py")',
+        "package(",
+        "    {},".format(json.dumps(PACKAGE)),
+        "    files=(",
+    ]
+    lines += ["        {},".format(json.dumps(x)) for x in files]
+    lines += ["    ),", "    base_path={},".format(json.dumps(base_path))]
+    if opt is not None:
+        lines.append("    opt={},".format(opt))
+    lines.append(")")
+    return "\n".join(lines) + "\n"
+
+
+def compile_mpy(
+    modules: List[str], out_dir: str, mpy_cross: str = "mpy-cross", opt: Optional[int] = None, march=None
+) -> List[str]:
+    res = []
+    for name in modules:
+        src = module_path(name)
+        dst = os.path.join(out_dir, src[:-3] + ".mpy")
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        cmd = [mpy_cross, "-o", dst, "-s", src]
+        if opt is not None:
+            cmd.append("-O{}".format(opt))
+        if march:
+            cmd.append("-march={}".format(march))
+        subprocess.run(cmd, cwd=REPO_ROOT, check=True)
+        res.append(dst)
+    return res
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Frozen module manifest for a MicroPython board target")
+    parser.add_argument("target", help="target directory, e.g., isense_esp32_plant")
+    parser.add_argument("-c", "--config", dest="config", help="config file, defaults to the target config")
+    parser.add_argument("--entry", dest="entry", default=DEFAULT_ENTRY, help="entry module imported by main.py")
+    parser.add_argument("-o", "--output", dest="output", help="manifest path, defaults to target/manifest.py")
+    parser.add_argument("-O", "--opt", dest="opt", type=int, help="bytecode optimization level")
+    parser.add_argument("--mpy", dest="mpy", help="compiles .mpy files to the directory instead of the manifest")
+    parser.add_argument("--mpy-cross", dest="mpy_cross", default="mpy-cross", help="mpy-cross binary")
+    parser.add_argument("--march", dest="march", help="mpy-cross native architecture, e.g., xtensawin")
+    args = parser.parse_args(args)
+
+    config = load_target_config(args.target, args.config)
+    modules = collect_modules(args.entry, config_modules(config))
+    print("Modules: {}".format(", ".join(modules)))
+
+    if args.mpy:
+        compile_mpy(modules, os.path.abspath(args.mpy), args.mpy_cross, args.opt, args.march)
+        print("Compiled {} modules to {}".format(len(modules), args.mpy))
+        return
+
+    output = args.output or os.path.join(args.target, "manifest.py")
+    with open(output, "w") as fh:
+        fh.write(build_manifest(modules, os.path.dirname(os.path.abspath(output)), args.opt))
+    print("Manifest written to {}".format(output))
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -47,11 +47,25 @@ class SenseiPy(Sensei):
         )
         self.config_file = config_file
         self.extended_i2c = extended_i2c
+        self.capture_file = None
+        self.capture = None
         self.args = None
 
     def load_config_data(self):
         cfile = self.config_file or "config.json"
-        return load_config_file(cfile)
+        js = load_config_file(cfile)
+        if self.capture:
+            self.capture.record_config({k: v for k, v in js.items() if k != "wifi"})
+        return js
+
+    def load_config(self):
+        super().load_config()
+        if self.capture and isinstance(self.sps30_uart, str):
+            from ph4_sense_py.sim.capture import CaptureUart
+            from ph4_sense_py.support.uart import UartSerial
+
+            ser = UartSerial(None, self.sps30_uart, baudrate=115200, stopbits=1, parity="N", timeout=2)
+            self.sps30_uart = CaptureUart(ser, self.capture, "sps30")
 
     def start_bus(self):
         if self.extended_i2c:
@@ -61,7 +75,27 @@ class SenseiPy(Sensei):
         else:
             self.i2c = busio.I2C(self.scl_pin, self.sda_pin)
 
+        if self.capture_file:
+            from ph4_sense_py.sim.capture import CaptureI2C, CaptureWriter
+
+            self.capture = CaptureWriter.open(self.capture_file)
+            self.i2c = CaptureI2C(self.i2c, self.capture)
+            logger.info("Capturing sensor traffic to %s", self.capture_file)
+
     def get_uart_builder(self, desc):
+        builder = self.get_raw_uart_builder(desc)
+        if not self.capture:
+            return builder
+
+        from ph4_sense_py.sim.capture import CaptureUart
+
+        def capture_builder(**kwargs):
+            # Only ZH03B is connected via a UART builder
+            return CaptureUart(builder(**kwargs), self.capture, desc.get("name", "zh03b"))
+
+        return capture_builder
+
+    def get_raw_uart_builder(self, desc):
         if desc["type"] == "uart":
             from ph4_sense.support.uart_mp import UartMp
 
@@ -96,13 +130,23 @@ class SenseiPy(Sensei):
         return client
 
     def publish_msg(self, topic: str, message: str):
-        self.mqtt_client.publish(topic, message)
+        if isinstance(message, memoryview):
+            message = bytes(message)  # packed telemetry
+        info = self.mqtt_client.publish(topic, message)
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            raise RuntimeError(f"MQTT publish failed: {mqtt.error_string(info.rc)}")
         self.print(f"Published {topic}:", message)
 
     def argparser(self):
         parser = argparse.ArgumentParser(description="Sensei")
         parser.add_argument("--debug", dest="debug", action="store_const", const=True, help="enables debug mode")
         parser.add_argument("-c", "--config", dest="config", help="Config file to load")
+        parser.add_argument(
+            "--async", dest="use_async", action="store_const", const=True, help="runs sensors and network on asyncio"
+        )
+        parser.add_argument(
+            "--capture", dest="capture", help="records raw I2C/UART traffic to a file for replay, .gz to compress"
+        )
         return parser
 
     def main(self, sys_args=None):
@@ -113,7 +157,13 @@ class SenseiPy(Sensei):
             coloredlogs.install(level=logging.DEBUG)
 
         self.config_file = self.args.config
-        super().main()
+        self.use_async = bool(self.args.use_async)
+        self.capture_file = self.args.capture
+        try:
+            super().main()
+        finally:
+            if self.capture:
+                self.capture.close()
 
 
 def main(*args, **kwargs):
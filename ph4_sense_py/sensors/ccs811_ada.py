@@ -100,5 +100,8 @@ class AdaCCS811(CCS811Wrapper):
     def app_valid(self) -> bool:
         return self._sensor.app_valid
 
+    def set_interrupt(self, enabled: bool):
+        self._sensor.interrupt_enabled = enabled
+
     def reboot_to_mode(self, drive_mode=DRIVE_MODE_1SEC):
         return self._sensor.reboot_to_mode(drive_mode)
@@ -34,6 +34,7 @@ from struct import unpack_from
 import adafruit_bus_device.i2c_device as i2c_device
 
 from ph4_sense.sensors.sps30_base import SPS30
+from ph4_sense.support.crc import crc8, crc8_check, crc8_strip
 
 __version__ = "0.0.0-auto.0"
 __repo__ = "https://github.com/adafruit/Adafruit_CircuitPython_SPS30.git"
@@ -120,8 +121,7 @@ class SPS30_I2C(SPS30):
     def auto_cleaning_interval(self):
         """Read the auto cleaning interval."""
         self._sps30_command(self.CMD_RW_AUTO_CLEANING_INTERVAL, rx_size=6)
-        self._buffer_check(6)
-        self._scrunch_buffer(6)
+        self._buffer_strip(6)
         if self._delays:
             time.sleep(0.005)
         return unpack_from(">I", self._buffer)[0]
@@ -226,8 +226,7 @@ class SPS30_I2C(SPS30):
         # https://github.com/Sensirion/embedded-sps/blob/master/sps30-i2c/sps30.c
         # https://github.com/Sensirion/arduino-sps/blob/master/sps30.cpp
         self._sps30_command(self.CMD_READ_DEVICE_STATUS_REG, rx_size=6)
-        self._buffer_check(6)
-        self._scrunch_buffer(6)
+        self._buffer_strip(6)
         return unpack_from(">I", self._buffer)[0]
 
     def clear_status_register(self):
@@ -260,7 +259,7 @@ class SPS30_I2C(SPS30):
                 tx_size += 1
                 self._cmd_buffer[tx_size] = arg & 0xFF
                 tx_size += 1
-                self._cmd_buffer[tx_size] = self._crc8(self._cmd_buffer, start=tx_size - 2, end=tx_size)
+                self._cmd_buffer[tx_size] = crc8(self._cmd_buffer, tx_size - 2, tx_size)
                 tx_size += 1
 
         # The write_then_readinto method cannot be used as the SPS30
@@ -279,40 +278,17 @@ class SPS30_I2C(SPS30):
     def _read_into_buffer(self):
         data_len = self._m_total_size
         self._sps30_command(self.CMD_READ_MEASURED_VALUES, rx_size=data_len)
-        self._buffer_check(data_len)
-
-    def _scrunch_buffer(self, raw_data_len):
-        """Move all the data from 0:raw_data_len to one contiguous sequence at
-        the start of the buffer.
-        This will overwrite some of the interleaved crcs."""
-        dst_idx = 2
-        for src_idx in range(3, raw_data_len, 3):
-            self._buffer[dst_idx : dst_idx + 2] = self._buffer[src_idx : src_idx + 2]
-            dst_idx += 2
+        self._buffer_strip(data_len)
 
     def _read_parse_data(self, output):
-        self._scrunch_buffer(self._m_total_size)
-
+        # data words were compacted to the start of the buffer by _buffer_strip()
         # buffer will be longer than the data hence the use of unpack_from
         for key, val in zip(self.FIELD_NAMES, unpack_from(self._m_fmt, self._buffer)):
             output[key] = val
 
     def _buffer_check(self, raw_data_len):
-        if raw_data_len % 3 != 0:
-            raise RuntimeError("Data length not a multiple of three")
-
-        for st_chunk in range(0, raw_data_len, 3):
-            if self._buffer[st_chunk + 2] != self._crc8(self._buffer, st_chunk, st_chunk + 2):
-                raise RuntimeError("CRC mismatch in data at offset " + str(st_chunk))
-
-    @staticmethod
-    def _crc8(buffer, start=None, end=None):
-        crc = 0xFF
-        for idx in range(0 if start is None else start, len(buffer) if end is None else end):
-            crc ^= buffer[idx]
-            for _ in range(8):
-                if crc & 0x80:
-                    crc = (crc << 1) ^ 0x31
-                else:
-                    crc = crc << 1
-        return crc & 0xFF  # return the bottom 8 bits
+        crc8_check(self._buffer, raw_data_len)
+
+    def _buffer_strip(self, raw_data_len):
+        """Verifies CRCs and moves all the data words to one contiguous sequence at the start of the buffer"""
+        crc8_strip(self._buffer, raw_data_len)
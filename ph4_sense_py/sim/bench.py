@@ -0,0 +1,279 @@
+"""
+Benchmark harness, runs a complete Sensei measure loop on simulated buses with a virtual clock.
+
+Per loop cycle it collects CPU time, wall time, bytes allocated (tracemalloc) and loop latency,
+i.e., virtual time the cycle spent on the bus and waiting for sensor conversions.
+Allocation tracking slows Python down, use --no-alloc for CPU time figures.
+
+    python -m ph4_sense_py.sim.bench --cycles 2000 --latency-us 50 --error-rate 0.01
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from ph4_sense.adapters import mem_alloc
+from ph4_sense.sense import Sensei
+from ph4_sense.support.state_store import StateStore
+from ph4_sense_py.sim.bus import SimI2C, SimUart
+from ph4_sense_py.sim.capture import CaptureI2C, CaptureUart, CaptureWriter
+from ph4_sense_py.sim.clock import VirtualClock
+from ph4_sense_py.sim.devices import (
+    SimAhtx0,
+    SimCcs811,
+    SimHdc1080,
+    SimScd4x,
+    SimSgp30,
+    SimSgp41,
+    SimSps30,
+    SimSps30Shdlc,
+    SimZh03b,
+)
+
+try:
+    from typing import Dict, List, Optional
+except ImportError:
+    pass
+
+
+SIM_SENSORS = ["sgp30", "sgp41", "aht21", "hdc1080", "ccs811", "scd41", "sps30", "zh03b"]
+
+
+def default_config(sps30_uart: bool = False) -> dict:
+    config = {
+        "sensorId": "sim",
+        "sensors": SIM_SENSORS,
+        "zh03b_uart": {"type": "sim", "port": "zh03b"},
+    }
+    if sps30_uart:
+        config["sps30_uart"] = "sps30"
+    return config
+
+
+def build_devices(
+    clock, latency_us: int = 0, error_rate: float = 0.0, seed: int = 0, noise: float = 0.0, sps30_uart: bool = False
+):
+    """Returns I2C bus with all emulated sensors and UARTs by port name"""
+    i2c = SimI2C(clock=clock, latency_us=latency_us, error_rate=error_rate, seed=seed)
+    for idx, cls in enumerate((SimSgp30, SimSgp41, SimAhtx0, SimHdc1080, SimCcs811, SimScd4x)):
+        i2c.add(cls(noise=noise, seed=seed + idx))
+
+    uarts = {
+        "zh03b": SimUart(SimZh03b(noise=noise, seed=seed), clock, 9600, latency_us, error_rate, seed),
+    }
+    if sps30_uart:
+        uarts["sps30"] = SimUart(SimSps30Shdlc(noise=noise, seed=seed), clock, 115200, latency_us, error_rate, seed)
+    else:
+        i2c.add(SimSps30(noise=noise, seed=seed))
+    return i2c, uarts
+
+
+class SimMqttClient:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, topic: str, message):
+        self.published.append((topic, message))
+
+    def disconnect(self):
+        pass
+
+
+class MemoryStateStore(StateStore):
+    """State store that is never loaded from or saved to disk, simulated runs stay independent"""
+
+    def load(self) -> dict:
+        if self.data is None:
+            self.data = {}
+        return self.data
+
+    def save(self):
+        pass
+
+
+class SimSensei(Sensei):
+    """Sensei on simulated buses, readings are published to the in-process MQTT client"""
+
+    def __init__(self, i2c, uarts: Optional[Dict[str, SimUart]] = None, config=None, verbose=False, **kwargs):
+        super().__init__(is_esp32=False, has_wifi=False, **kwargs)
+        self.sim_i2c = i2c
+        self.sim_uarts = uarts or {}
+        self.config = config if config is not None else default_config()
+        self.verbose = verbose
+
+    def load_config_data(self):
+        return self.config
+
+    def load_config(self):
+        super().load_config()
+        if isinstance(self.sps30_uart, str) and self.sps30_uart in self.sim_uarts:
+            self.sps30_uart = self.sim_uarts[self.sps30_uart]
+
+    def start_bus(self):
+        self.i2c = self.sim_i2c
+
+    def get_uart_builder(self, desc):
+        uart = self.sim_uarts[desc["port"]]
+
+        def builder(**kwargs):
+            return uart
+
+        return builder
+
+    def get_state_store(self):
+        if not self.state_store:
+            self.state_store = MemoryStateStore(self.state_file)
+        return self.state_store
+
+    def create_mqtt_client(self):
+        return SimMqttClient()
+
+    def publish_msg(self, topic: str, message: str):
+        self.mqtt_client.publish(topic, message)
+
+    def print_cli(self, msg, *args):
+        if self.verbose:
+            super().print_cli(msg, *args)
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def summarize(values: List[float]) -> dict:
+    return {
+        "mean": sum(values) / len(values) if values else 0,
+        "p50": percentile(values, 0.5),
+        "p95": percentile(values, 0.95),
+        "max": max(values) if values else 0,
+    }
+
+
+class Bench:
+    def __init__(self, sensei: SimSensei, clock: VirtualClock, track_alloc: bool = True, bus=None):
+        self.sensei = sensei
+        self.clock = clock
+        self.track_alloc = track_alloc
+        self.bus = bus or sensei.sim_i2c
+        self.cpu_us = []
+        self.wall_us = []
+        self.alloc = []
+        self.loop_ms = []
+
+    def run_cycle(self):
+        sensei = self.sensei
+        started = self.clock.ticks_us()
+        alloc = mem_alloc() if self.track_alloc else 0
+        cpu = time.process_time_ns()
+        wall = time.perf_counter_ns()
+
+        sensei.measure_loop_body()
+
+        self.wall_us.append((time.perf_counter_ns() - wall) / 1000)
+        self.cpu_us.append((time.process_time_ns() - cpu) / 1000)
+        if self.track_alloc:
+            allocated = mem_alloc() - alloc
+            if allocated >= 0:  # garbage collected during the cycle otherwise
+                self.alloc.append(allocated)
+        self.loop_ms.append((self.clock.ticks_us() - started) / 1000)
+        sensei.idle_sleep(sensei.scheduler.time_to_next_ms())
+
+    def run(self, cycles: int) -> dict:
+        for _ in range(cycles):
+            self.run_cycle()
+        return self.report()
+
+    def report(self) -> dict:
+        sensei = self.sensei
+        bus = self.bus
+        res = {
+            "cycles": len(self.cpu_us),
+            "virtual_s": self.clock.ticks_ms() / 1000,
+            "cpu_us": summarize(self.cpu_us),
+            "wall_us": summarize(self.wall_us),
+            "loop_ms": summarize(self.loop_ms),
+            "i2c_transactions": bus.transactions,
+            "i2c_errors": bus.errors,
+            "uart_transactions": sum(getattr(x, "transactions", 0) for x in sensei.sim_uarts.values()),
+            "published": len(sensei.mqtt_client.published) if sensei.mqtt_client else 0,
+        }
+        if self.track_alloc:
+            res["alloc_b"] = summarize(self.alloc)
+        return res
+
+
+def run_bench(
+    cycles: int = 1000,
+    config: Optional[dict] = None,
+    latency_us: int = 0,
+    error_rate: float = 0.0,
+    seed: int = 0,
+    noise: float = 0.0,
+    track_alloc: bool = True,
+    sps30_uart: bool = False,
+    verbose: bool = False,
+    capture: Optional[str] = None,
+) -> dict:
+    with VirtualClock() as clock:
+        i2c, uarts = build_devices(clock, latency_us, error_rate, seed, noise, sps30_uart)
+        sim_i2c, writer = i2c, None
+        if capture:
+            writer = CaptureWriter.open(capture, clock=clock, epoch=clock.epoch)
+            i2c = CaptureI2C(i2c, writer)
+            uarts = {name: CaptureUart(uart, writer, name) for name, uart in uarts.items()}
+
+        sensei = SimSensei(i2c, uarts, config or default_config(sps30_uart), verbose=verbose)
+        if writer:
+            writer.record_config(sensei.config)
+        try:
+            sensei.init_config()
+            sensei.init_network()
+            sensei.init_sensors()
+            return Bench(sensei, clock, track_alloc, sim_i2c).run(cycles)
+        finally:
+            if writer:
+                writer.close()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Sensei loop benchmark on simulated sensors")
+    parser.add_argument("--cycles", dest="cycles", type=int, default=1000, help="measure loop cycles")
+    parser.add_argument("-c", "--config", dest="config", help="Sensei config file, defaults to all sensors")
+    parser.add_argument("--latency-us", dest="latency_us", type=int, default=0, help="bus latency per transaction")
+    parser.add_argument("--error-rate", dest="error_rate", type=float, default=0.0, help="bus error probability")
+    parser.add_argument("--noise", dest="noise", type=float, default=0.0, help="relative noise of sensor values")
+    parser.add_argument("--seed", dest="seed", type=int, default=0, help="random seed")
+    parser.add_argument("--sps30-uart", dest="sps30_uart", action="store_const", const=True, help="SPS30 on UART")
+    parser.add_argument(
+        "--no-alloc", dest="no_alloc", action="store_const", const=True, help="disables allocation tracking"
+    )
+    parser.add_argument("--verbose", dest="verbose", action="store_const", const=True, help="prints Sensei output")
+    parser.add_argument("--capture", dest="capture", help="records the simulated traffic to a file for replay")
+    args = parser.parse_args(args)
+
+    config = None
+    if args.config:
+        with open(args.config) as fh:
+            config = json.load(fh)
+
+    res = run_bench(
+        cycles=args.cycles,
+        config=config,
+        latency_us=args.latency_us,
+        error_rate=args.error_rate,
+        seed=args.seed,
+        noise=args.noise,
+        track_alloc=not args.no_alloc,
+        sps30_uart=bool(args.sps30_uart),
+        verbose=bool(args.verbose),
+        capture=args.capture,
+    )
+    print(json.dumps(res, indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
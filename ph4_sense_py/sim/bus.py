@@ -0,0 +1,249 @@
+import errno
+import random
+
+from ph4_sense.support.uart import Uart
+from ph4_sense_py.sim.clock import RealClock
+
+try:
+    from typing import Dict, List, Optional
+except ImportError:
+    pass
+
+
+class SimDevice:
+    """
+    Emulated device, receives complete bus transactions.
+    I2C devices implement on_write(data) and on_read(nbytes), UART devices return the reply from on_write(data)
+    and produce unsolicited data in on_poll().
+
+    Measured values are device attributes, optionally with relative noise from a seeded generator.
+    With crc_error_rate > 0, replies randomly carry a corrupted checksum.
+    """
+
+    ADDRESS = None
+
+    def __init__(self, noise: float = 0.0, crc_error_rate: float = 0.0, seed: int = 0):
+        self.clock = RealClock()
+        self.noise = noise
+        self.crc_error_rate = crc_error_rate
+        self.rng = random.Random(seed)
+        self.sample_interval = 0
+        self.sample_started = 0
+        self.sample_read = 0
+
+    def attach(self, clock):
+        self.clock = clock
+
+    def value(self, base: float) -> float:
+        if not self.noise:
+            return base
+        return base * (1 + self.rng.uniform(-self.noise, self.noise))
+
+    def inject_crc_error(self) -> bool:
+        return bool(self.crc_error_rate) and self.rng.random() < self.crc_error_rate
+
+    def start_sampling(self, interval_ms: int):
+        """Device produces a new sample every interval_ms, e.g., periodic measurement mode"""
+        self.sample_interval = interval_ms
+        self.sample_started = self.clock.ticks_ms()
+        self.sample_read = 0
+
+    def stop_sampling(self):
+        self.sample_interval = 0
+
+    def sample_index(self) -> int:
+        if not self.sample_interval:
+            return 0
+        return (self.clock.ticks_ms() - self.sample_started) // self.sample_interval
+
+    def sample_ready(self) -> bool:
+        return self.sample_index() > self.sample_read
+
+    def sample_consume(self):
+        self.sample_read = self.sample_index()
+
+    def on_write(self, data: bytes) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def on_read(self, nbytes: int) -> bytes:
+        raise NotImplementedError
+
+    def on_poll(self) -> bytes:
+        return b""
+
+
+class SimI2C:
+    """
+    In-process I2C bus with emulated devices, machine.I2C compatible.
+
+    Each transaction spends latency_us plus the transfer time at freq on the clock.
+    Reads past the end of the device reply return 0xFF, as the bus is pulled up.
+    With error_rate > 0, transactions randomly fail with OSError, as on a noisy or overloaded bus.
+    """
+
+    def __init__(
+        self,
+        devices: Optional[List[SimDevice]] = None,
+        clock=None,
+        latency_us: int = 0,
+        freq: int = 100_000,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.clock = clock or RealClock()
+        self.latency_us = latency_us
+        self.freq = freq
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.devices: Dict[int, SimDevice] = {}
+        self.transactions = 0
+        self.errors = 0
+        for device in devices or ():
+            self.add(device)
+
+    def add(self, device: SimDevice, address: Optional[int] = None) -> SimDevice:
+        device.attach(self.clock)
+        self.devices[device.ADDRESS if address is None else address] = device
+        return device
+
+    def scan(self) -> List[int]:
+        return sorted(self.devices)
+
+    def _transaction(self, address: int, nbytes: int) -> SimDevice:
+        self.transactions += 1
+        # Address byte and data bytes, 9 clocks each including ACK
+        self.clock.advance_us(self.latency_us + (nbytes + 1) * 9_000_000 // self.freq)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.errors += 1
+            raise OSError(errno.ETIMEDOUT, "Simulated bus error")
+
+        device = self.devices.get(address)
+        if device is None:
+            raise OSError(errno.ENODEV, "No device at address {}".format(hex(address)))
+        return device
+
+    @staticmethod
+    def _fill(buf, data: bytes):
+        nbytes = len(buf)
+        if len(data) < nbytes:
+            data = bytes(data) + b"\xff" * (nbytes - len(data))
+        buf[:] = data[:nbytes]
+
+    def writeto(self, addr: int, buf, stop: bool = True) -> int:
+        self._transaction(addr, len(buf)).on_write(bytes(buf))
+        return len(buf)
+
+    def writevto(self, addr: int, vector, stop: bool = True) -> int:
+        return self.writeto(addr, b"".join(bytes(x) for x in vector), stop)
+
+    def readfrom_into(self, addr: int, buf, stop: bool = True):
+        self._fill(buf, self._transaction(addr, len(buf)).on_read(len(buf)))
+
+    def readfrom(self, addr: int, nbytes: int, stop: bool = True) -> bytes:
+        buf = bytearray(nbytes)
+        self.readfrom_into(addr, buf, stop)
+        return bytes(buf)
+
+    def readfrom_mem_into(self, addr: int, memaddr: int, buf, addrsize: int = 8):
+        device = self._transaction(addr, len(buf) + 1)
+        device.on_write(bytes([memaddr]))
+        self._fill(buf, device.on_read(len(buf)))
+
+    def writeto_mem(self, addr: int, memaddr: int, buf, addrsize: int = 8):
+        self._transaction(addr, len(buf) + 1).on_write(bytes([memaddr]) + bytes(buf))
+
+
+class SimUart(Uart):
+    """
+    In-process UART connected to an emulated device.
+
+    Device replies are queued to the receive buffer on write, reads return at most what is available.
+    With timeout_ms, a short read waits on the clock for the device to produce data, as a read with timeout would.
+    Transfer time at baudrate is spent on the clock.
+    With error_rate > 0, written frames are randomly lost on the line, so the device does not respond.
+    pyserial-style aliases allow using it in place of serial.Serial.
+    """
+
+    def __init__(
+        self,
+        device: SimDevice,
+        clock=None,
+        baudrate: int = 9600,
+        latency_us: int = 0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        timeout_ms: int = 0,
+    ):
+        super().__init__()
+        self.device = device
+        self.clock = clock or RealClock()
+        self.baudrate = baudrate
+        self.latency_us = latency_us
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.timeout_ms = timeout_ms
+        self.rx = bytearray()
+        self.transactions = 0
+        self.errors = 0
+        device.attach(self.clock)
+
+    def _transfer(self, nbytes: int):
+        self.transactions += 1
+        # Start bit, 8 data bits, stop bit
+        self.clock.advance_us(self.latency_us + nbytes * 10_000_000 // self.baudrate)
+
+    def _poll(self):
+        self.rx.extend(self.device.on_poll())
+
+    def read(self, nbytes: int) -> bytes:
+        self._poll()
+        waited = 0
+        while len(self.rx) < nbytes and waited < self.timeout_ms:
+            self.clock.advance_us(1_000)
+            waited += 1
+            self._poll()
+
+        data = bytes(self.rx[:nbytes])
+        del self.rx[:nbytes]
+        self._transfer(len(data))
+        return data
+
+    def readinto(self, buf) -> int:
+        self._poll()
+        nbytes = min(len(self.rx), len(buf))
+        buf[0:nbytes] = self.rx[:nbytes]
+        del self.rx[:nbytes]
+        if nbytes:
+            self._transfer(nbytes)
+        return nbytes
+
+    def write(self, buff):
+        data = bytes(buff)
+        self._transfer(len(data))
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.errors += 1
+            return len(data)
+
+        self.rx.extend(self.device.on_write(data) or b"")
+        return len(data)
+
+    def flush_input(self):
+        self._poll()
+        self.rx.clear()
+
+    @property
+    def in_waiting(self) -> int:
+        self._poll()
+        return len(self.rx)
+
+    def inWaiting(self) -> int:
+        return self.in_waiting
+
+    def flushInput(self):
+        self.flush_input()
+
+    def flushOutput(self):
+        self.flush_output()
+
+    def close(self):
+        pass
@@ -0,0 +1,235 @@
+"""
+Capture of raw I2C and UART traffic, for replay with ph4_sense_py.sim.replay.
+
+The capture file starts with a header, magic, version and the wall time of the capture start.
+Records follow, each is op, channel, microseconds since the previous record, payload length and payload.
+I2C channels are device addresses, UART channels are numbered from 0x80 and named by a NAME record.
+Files ending with .gz are compressed.
+
+I2C transactions are recorded as plain writes and reads, i.e., writeto_then_readfrom is a write and a read
+and readfrom_mem_into writes the register address first. Failed transactions are recorded as errors.
+Only non-empty UART reads are recorded.
+"""
+
+import gzip
+import json
+import struct
+import time
+
+from ph4_sense.support.uart import Uart
+from ph4_sense_py.sim.clock import RealClock
+
+try:
+    from typing import Iterator, Optional, Tuple
+except ImportError:
+    pass
+
+
+MAGIC = b"PH4CAP"
+VERSION = 1
+HEADER = struct.Struct("<6sBd")
+RECORD = struct.Struct("<BBIH")
+
+OP_I2C_WRITE = ord("W")
+OP_I2C_READ = ord("R")
+OP_UART_TX = ord("T")
+OP_UART_RX = ord("X")
+OP_ERROR = ord("E")
+OP_NAME = ord("N")
+OP_CONFIG = ord("C")
+
+UART_CHANNEL_BASE = 0x80
+
+
+def open_capture(path: str, mode: str = "rb"):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def _slice(buf, start: int = 0, end: Optional[int] = None) -> bytes:
+    return bytes(buf[start : len(buf) if end is None else end])
+
+
+class CaptureWriter:
+    def __init__(self, fh, clock=None, flush_ms: int = 1_000, epoch: Optional[float] = None):
+        self.fh = fh
+        self.clock = clock or RealClock()
+        self.flush_ms = flush_ms
+        self.channels = {}
+        self.records = 0
+        self.started = self.clock.ticks_us()
+        self.last_ts = 0
+        self.last_flush = self.started
+        self.fh.write(HEADER.pack(MAGIC, VERSION, time.time() if epoch is None else epoch))
+
+    @classmethod
+    def open(cls, path: str, **kwargs) -> "CaptureWriter":
+        return cls(open_capture(path, "wb"), **kwargs)
+
+    def channel(self, name: str) -> int:
+        """UART channel for the given name, registered on first use"""
+        channel = self.channels.get(name)
+        if channel is None:
+            channel = self.channels[name] = UART_CHANNEL_BASE + len(self.channels)
+            self.record(OP_NAME, channel, name.encode())
+        return channel
+
+    def record(self, op: int, channel: int, data: bytes = b""):
+        now = self.clock.ticks_us()
+        ts = now - self.started
+        self.fh.write(RECORD.pack(op, channel, min(0xFFFFFFFF, max(0, ts - self.last_ts)), len(data)))
+        self.fh.write(data)
+        self.last_ts = ts
+        self.records += 1
+        if (now - self.last_flush) // 1000 >= self.flush_ms:
+            self.fh.flush()
+            self.last_flush = now
+
+    def record_config(self, config: dict):
+        self.record(OP_CONFIG, 0, json.dumps(config).encode())
+
+    def close(self):
+        self.fh.close()
+
+
+class CaptureReader:
+    def __init__(self, fh):
+        self.fh = fh
+        header = fh.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError("Not a capture file")
+        magic, version, self.epoch = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a capture file or unsupported version {}".format(version))
+
+    @classmethod
+    def open(cls, path: str) -> "CaptureReader":
+        return cls(open_capture(path, "rb"))
+
+    def __iter__(self) -> Iterator[Tuple[int, int, int, bytes]]:
+        """Yields (op, channel, timestamp_us, data), timestamps relative to the capture start"""
+        ts = 0
+        while True:
+            try:
+                rec = self.fh.read(RECORD.size)
+                op, channel, delta, length = RECORD.unpack(rec)
+                data = self.fh.read(length)
+            except (EOFError, struct.error):
+                return  # capture of an interrupted run ends with the last complete record
+            if len(data) < length:
+                return
+            ts += delta
+            yield op, channel, ts, data
+
+    def close(self):
+        self.fh.close()
+
+
+class CaptureI2C:
+    """
+    I2C bus wrapper recording every transaction, machine.I2C and busio.I2C compatible.
+    Only the methods of the wrapped bus are exposed, drivers choose the transfer path by their presence.
+    """
+
+    def __init__(self, i2c, writer: CaptureWriter):
+        self.i2c = i2c
+        self.writer = writer
+        for name in ("writevto", "readfrom_mem_into", "writeto_mem", "writeto_then_readfrom"):
+            if hasattr(i2c, name):
+                setattr(self, name, getattr(self, "_" + name))
+
+    def __getattr__(self, name):
+        return getattr(self.i2c, name)
+
+    def _call(self, address: int, fnc, *args, **kwargs):
+        try:
+            return fnc(*args, **kwargs)
+        except OSError as e:
+            self.writer.record(OP_ERROR, address, bytes([(e.errno or 0) & 0xFF]))
+            raise
+
+    def writeto(self, address: int, buffer, *args, start: int = 0, end: Optional[int] = None, **kwargs):
+        if start or end is not None:
+            kwargs.update(start=start, end=end)
+        res = self._call(address, self.i2c.writeto, address, buffer, *args, **kwargs)
+        self.writer.record(OP_I2C_WRITE, address, _slice(buffer, start, end))
+        return res
+
+    def readfrom_into(self, address: int, buffer, *args, start: int = 0, end: Optional[int] = None, **kwargs):
+        if start or end is not None:
+            kwargs.update(start=start, end=end)
+        res = self._call(address, self.i2c.readfrom_into, address, buffer, *args, **kwargs)
+        self.writer.record(OP_I2C_READ, address, _slice(buffer, start, end))
+        return res
+
+    def _writevto(self, address: int, vector, *args, **kwargs):
+        res = self._call(address, self.i2c.writevto, address, vector, *args, **kwargs)
+        self.writer.record(OP_I2C_WRITE, address, b"".join(bytes(x) for x in vector))
+        return res
+
+    def _readfrom_mem_into(self, address: int, memaddr: int, buffer, *args, **kwargs):
+        res = self._call(address, self.i2c.readfrom_mem_into, address, memaddr, buffer, *args, **kwargs)
+        self.writer.record(OP_I2C_WRITE, address, bytes([memaddr]))
+        self.writer.record(OP_I2C_READ, address, bytes(buffer))
+        return res
+
+    def _writeto_mem(self, address: int, memaddr: int, buffer, *args, **kwargs):
+        res = self._call(address, self.i2c.writeto_mem, address, memaddr, buffer, *args, **kwargs)
+        self.writer.record(OP_I2C_WRITE, address, bytes([memaddr]) + bytes(buffer))
+        return res
+
+    def _writeto_then_readfrom(
+        self,
+        address: int,
+        buffer_out,
+        buffer_in,
+        *args,
+        out_start: int = 0,
+        out_end: Optional[int] = None,
+        in_start: int = 0,
+        in_end: Optional[int] = None,
+        **kwargs,
+    ):
+        if out_start or out_end is not None or in_start or in_end is not None:
+            kwargs.update(out_start=out_start, out_end=out_end, in_start=in_start, in_end=in_end)
+        res = self._call(address, self.i2c.writeto_then_readfrom, address, buffer_out, buffer_in, *args, **kwargs)
+        self.writer.record(OP_I2C_WRITE, address, _slice(buffer_out, out_start, out_end))
+        self.writer.record(OP_I2C_READ, address, _slice(buffer_in, in_start, in_end))
+        return res
+
+
+class CaptureUart(Uart):
+    """Uart or pyserial object wrapper recording transmitted and received data"""
+
+    def __init__(self, uart, writer: CaptureWriter, name: str):
+        super().__init__()
+        self.uart = uart
+        self.writer = writer
+        self.channel = writer.channel(name)
+
+    def __getattr__(self, name):
+        return getattr(self.uart, name)
+
+    def read(self, nbytes: int) -> bytes:
+        data = self.uart.read(nbytes)
+        if data:
+            self.writer.record(OP_UART_RX, self.channel, bytes(data))
+        return data
+
+    def readinto(self, buf) -> int:
+        nbytes = self.uart.readinto(buf)
+        if nbytes:
+            self.writer.record(OP_UART_RX, self.channel, bytes(buf[:nbytes]))
+        return nbytes
+
+    def write(self, buff):
+        res = self.uart.write(buff)
+        self.writer.record(OP_UART_TX, self.channel, bytes(buff))
+        return res
+
+    def flush_input(self):
+        return self.uart.flush_input()
+
+    def flush_output(self):
+        return self.uart.flush_output()
@@ -0,0 +1,117 @@
+"""
+Clocks for simulated runs.
+
+Emulated buses and devices read time with clock.ticks_ms() and spend bus transfer time with clock.advance_us().
+RealClock follows the wall clock. VirtualClock advances only on sleeps and bus transfers, so a complete
+Sensei loop runs faster than real time and deterministically. VirtualClock.install() patches sleep_ms,
+ticks_ms and time in loaded ph4_sense and ph4_sense_py modules, uninstall() restores them.
+"""
+
+import importlib
+import sys
+import time
+
+from ph4_sense import adapters
+
+# Imported before patching, so the lazily imported sensor drivers use the virtual clock too
+SIM_MODULES = (
+    "ph4_sense.sense",
+    "ph4_sense.sensirion",
+    "ph4_sense.support.state_store",
+    "ph4_sense.sensors.athx0",
+    "ph4_sense.sensors.ccs811",
+    "ph4_sense.sensors.hdc1080",
+    "ph4_sense.sensors.scd4x",
+    "ph4_sense.sensors.sgp30",
+    "ph4_sense.sensors.sgp41",
+    "ph4_sense.sensors.sps30",
+    "ph4_sense.sensors.zh03b_uart_base",
+    "ph4_sense_py.sensors.sps30_uart_ada",
+)
+
+
+class RealClock:
+    def ticks_ms(self) -> int:
+        return time.monotonic_ns() // 1_000_000
+
+    def ticks_us(self) -> int:
+        return time.monotonic_ns() // 1_000
+
+    def advance_us(self, us: int):
+        if us > 0:
+            time.sleep(us / 1_000_000)
+
+
+class VirtualTime:
+    """time module replacement following the virtual clock"""
+
+    def __init__(self, clock: "VirtualClock"):
+        self.clock = clock
+
+    def time(self) -> float:
+        return self.clock.epoch + self.clock.now_us / 1_000_000
+
+    def monotonic(self) -> float:
+        return self.clock.now_us / 1_000_000
+
+    def sleep(self, secs: float):
+        self.clock.advance_us(int(secs * 1_000_000))
+
+    def localtime(self, secs=None):
+        return time.localtime(self.time() if secs is None else secs)
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+class VirtualClock:
+    def __init__(self, epoch=None):
+        self.now_us = 0
+        self.epoch = time.time() if epoch is None else epoch
+        self.time = VirtualTime(self)
+        self.patched = []
+
+    def ticks_ms(self) -> int:
+        return self.now_us // 1_000
+
+    def ticks_us(self) -> int:
+        return self.now_us
+
+    def advance_us(self, us: int):
+        if us > 0:
+            self.now_us += int(us)
+
+    def sleep_ms(self, ms: int):
+        self.advance_us(ms * 1_000)
+
+    def install(self) -> "VirtualClock":
+        for name in SIM_MODULES:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                pass
+
+        originals = (
+            ("sleep_ms", adapters.sleep_ms, self.sleep_ms),
+            ("ticks_ms", adapters.ticks_ms, self.ticks_ms),
+            ("time", adapters.time, self.time),
+        )
+        for name, module in list(sys.modules.items()):
+            if module is None or not name.startswith("ph4_sense") or name.startswith("ph4_sense_py.sim"):
+                continue
+            for attr, original, replacement in originals:
+                if getattr(module, attr, None) is original:
+                    setattr(module, attr, replacement)
+                    self.patched.append((module, attr, original))
+        return self
+
+    def uninstall(self):
+        for module, attr, original in reversed(self.patched):
+            setattr(module, attr, original)
+        self.patched = []
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.uninstall()
@@ -0,0 +1,812 @@
+"""
+Protocol-level emulators of the supported sensors, see bus.SimDevice.
+
+Emulators follow the datasheets where the drivers depend on them: command sets, CRCs and checksums,
+execution times (reads during execution are not acknowledged), periodic sampling and data-ready flags.
+"""
+
+import errno
+import struct
+
+from ph4_sense.sensors.zh03b_uart_base import zh03b_checksum
+from ph4_sense.support.crc import crc8
+from ph4_sense.support.shdlc import shdlc_checksum
+from ph4_sense_py.sim.bus import SimDevice
+
+try:
+    from typing import List, Optional
+except ImportError:
+    pass
+
+
+def word(value: float) -> int:
+    return min(max(int(round(value)), 0), 0xFFFF)
+
+
+def float_words(value: float) -> List[int]:
+    raw = struct.pack(">f", value)
+    return [(raw[0] << 8) | raw[1], (raw[2] << 8) | raw[3]]
+
+
+def ascii_words(text: str) -> List[int]:
+    """Null-terminated ASCII string as big-endian words"""
+    raw = text.encode() + b"\x00"
+    if len(raw) % 2:
+        raw += b"\x00"
+    return [(raw[i] << 8) | raw[i + 1] for i in range(0, len(raw), 2)]
+
+
+class SensirionDevice(SimDevice):
+    """
+    Sensirion command-word protocol: 16-bit command followed by argument words, reply words,
+    each word followed by CRC-8.
+
+    COMMANDS maps command -> (handler name, number of argument words, execution time in ms),
+    -1 argument words accepts any number of complete words. Bytes after the arguments are ignored.
+    Unknown commands, argument CRC mismatch and reads during command execution are not acknowledged (OSError).
+    Handlers receive the argument words and return reply words, or None.
+    """
+
+    COMMANDS = {}
+
+    def __init__(self, serial=(0x0000, 0x0123, 0x4567), **kwargs):
+        super().__init__(**kwargs)
+        self.serial = list(serial)
+        self.reply = b""
+        self.busy_until = 0
+
+    def on_write(self, data: bytes):
+        if len(data) < 2:
+            raise OSError(errno.EIO, "Incomplete command")
+
+        command = (data[0] << 8) | data[1]
+        spec = self.COMMANDS.get(command)
+        if spec is None:
+            raise OSError(errno.EIO, "Unknown command {}".format(hex(command)))
+
+        handler, nargs, exec_ms = spec
+        if nargs < 0:
+            nargs = (len(data) - 2) // 3
+        if len(data) < 2 + 3 * nargs:
+            raise OSError(errno.EIO, "Missing command arguments")
+
+        args = []
+        for idx in range(2, 2 + 3 * nargs, 3):
+            if crc8(data, idx, idx + 2) != data[idx + 2]:
+                raise OSError(errno.EIO, "Argument CRC mismatch")
+            args.append((data[idx] << 8) | data[idx + 1])
+
+        words = getattr(self, handler)(args)
+        self.reply = self.encode(words) if words else b""
+        self.busy_until = self.clock.ticks_ms() + exec_ms
+
+    def on_read(self, nbytes: int) -> bytes:
+        if self.clock.ticks_ms() < self.busy_until:
+            raise OSError(errno.EIO, "Command in progress")
+
+        reply, self.reply = self.reply, b""
+        return reply
+
+    def encode(self, words: List[int]) -> bytes:
+        buf = bytearray(3 * len(words))
+        for idx, value in enumerate(words):
+            offset = 3 * idx
+            buf[offset] = (value >> 8) & 0xFF
+            buf[offset + 1] = value & 0xFF
+            buf[offset + 2] = crc8(buf, offset, offset + 2)
+
+        if self.inject_crc_error():
+            buf[2] ^= 0xFF
+        return bytes(buf)
+
+    def cmd_get_serial(self, args):
+        return self.serial
+
+
+class SimSgp30(SensirionDevice):
+    ADDRESS = 0x58
+    COMMANDS = {
+        0x2003: ("cmd_iaq_init", 0, 10),
+        0x2008: ("cmd_measure_iaq", 0, 12),
+        0x2015: ("cmd_get_baseline", 0, 10),
+        0x201E: ("cmd_set_baseline", 2, 10),
+        0x2061: ("cmd_set_humidity", 1, 10),
+        0x2032: ("cmd_measure_test", 0, 200),
+        0x202F: ("cmd_get_feature_set", 0, 10),
+        0x2050: ("cmd_measure_raw", 0, 25),
+        0x3682: ("cmd_get_serial", 0, 1),
+    }
+    IAQ_INIT_MS = 15_000  # fixed 400 ppm, 0 ppb readings after iaq_init
+    FEATURE_SET = 0x0022
+
+    def __init__(self, co2eq=450, tvoc=20, h2=13_000, ethanol=18_000, **kwargs):
+        super().__init__(**kwargs)
+        self.co2eq = co2eq
+        self.tvoc = tvoc
+        self.h2 = h2
+        self.ethanol = ethanol
+        self.baseline = [0x8973, 0x8AAE]  # co2eq, tvoc
+        self.absolute_humidity = 0
+        self.iaq_init_at = None
+
+    def cmd_iaq_init(self, args):
+        self.iaq_init_at = self.clock.ticks_ms()
+
+    def cmd_measure_iaq(self, args):
+        if self.iaq_init_at is None or self.clock.ticks_ms() - self.iaq_init_at < self.IAQ_INIT_MS:
+            return [400, 0]
+        return [word(self.value(self.co2eq)), word(self.value(self.tvoc))]
+
+    def cmd_get_baseline(self, args):
+        return self.baseline
+
+    def cmd_set_baseline(self, args):
+        self.baseline = [args[1], args[0]]  # sent as tvoc, co2eq
+
+    def cmd_set_humidity(self, args):
+        self.absolute_humidity = args[0]
+
+    def cmd_measure_test(self, args):
+        return [0xD400]
+
+    def cmd_get_feature_set(self, args):
+        return [self.FEATURE_SET]
+
+    def cmd_measure_raw(self, args):
+        return [word(self.value(self.h2)), word(self.value(self.ethanol))]
+
+
+class SimSgp41(SensirionDevice):
+    ADDRESS = 0x59
+    COMMANDS = {
+        0x2612: ("cmd_conditioning", 2, 50),
+        0x2619: ("cmd_measure_raw", 2, 50),
+        0x280E: ("cmd_self_test", 0, 320),
+        0x3615: ("cmd_heater_off", 0, 1),
+        0x3682: ("cmd_get_serial", 0, 1),
+    }
+
+    def __init__(self, sraw_voc=30_000, sraw_nox=15_000, **kwargs):
+        super().__init__(**kwargs)
+        self.sraw_voc = sraw_voc
+        self.sraw_nox = sraw_nox
+        self.compensation = [0x8000, 0x6666]  # rh, t ticks
+        self.heater_on = False
+
+    def cmd_conditioning(self, args):
+        self.compensation = args
+        self.heater_on = True
+        # Datasheet reply is SRAW_VOC only, the driver reads two words
+        return [word(self.value(self.sraw_voc)), 0]
+
+    def cmd_measure_raw(self, args):
+        self.compensation = args
+        self.heater_on = True
+        return [word(self.value(self.sraw_voc)), word(self.value(self.sraw_nox))]
+
+    def cmd_self_test(self, args):
+        return [0xD400]
+
+    def cmd_heater_off(self, args):
+        self.heater_on = False
+
+
+class SimScd4x(SensirionDevice):
+    ADDRESS = 0x62
+    COMMANDS = {
+        0x21B1: ("cmd_start_periodic", 0, 0),
+        0x21AC: ("cmd_start_low_periodic", 0, 0),
+        0x3F86: ("cmd_stop_periodic", 0, 500),
+        0xE4B8: ("cmd_data_ready", 0, 1),
+        0xEC05: ("cmd_read_measurement", 0, 1),
+        0xE000: ("cmd_set_pressure", 1, 1),
+        0x3682: ("cmd_get_serial", 0, 1),
+        0x2313: ("cmd_get_asc", 0, 1),
+        0x2416: ("cmd_set_asc", 1, 1),
+        0x2318: ("cmd_get_temp_offset", 0, 1),
+        0x241D: ("cmd_set_temp_offset", 1, 1),
+        0x2322: ("cmd_get_altitude", 0, 1),
+        0x2427: ("cmd_set_altitude", 1, 1),
+        0x362F: ("cmd_forced_recalibration", 1, 400),
+        0x3615: ("cmd_noop", 0, 800),  # persist settings
+        0x3639: ("cmd_self_test", 0, 10_000),
+        0x3632: ("cmd_noop", 0, 1200),  # factory reset
+        0x3646: ("cmd_noop", 0, 20),  # reinit
+    }
+    # Other commands are not acknowledged during periodic measurement
+    PERIODIC_COMMANDS = (0x3F86, 0xE4B8, 0xEC05, 0xE000)
+    PERIODIC_MS = 5_000
+    LOW_POWER_PERIODIC_MS = 30_000
+
+    def __init__(self, co2=600, temperature=22.5, humidity=45.0, **kwargs):
+        super().__init__(**kwargs)
+        self.co2 = co2
+        self.temperature = temperature
+        self.humidity = humidity
+        self.asc_enabled = 1
+        self.temp_offset = 1498  # 4 C in ticks
+        self.altitude = 0
+        self.pressure = 0
+
+    def on_write(self, data: bytes):
+        if self.sample_interval and len(data) >= 2 and ((data[0] << 8) | data[1]) not in self.PERIODIC_COMMANDS:
+            raise OSError(errno.EIO, "Command not allowed during periodic measurement")
+        super().on_write(data)
+
+    def cmd_noop(self, args):
+        pass
+
+    def cmd_start_periodic(self, args):
+        self.start_sampling(self.PERIODIC_MS)
+
+    def cmd_start_low_periodic(self, args):
+        self.start_sampling(self.LOW_POWER_PERIODIC_MS)
+
+    def cmd_stop_periodic(self, args):
+        self.stop_sampling()
+
+    def cmd_data_ready(self, args):
+        return [0x8006 if self.sample_ready() else 0x8000]
+
+    def cmd_read_measurement(self, args):
+        self.sample_consume()
+        return [
+            word(self.value(self.co2)),
+            word((self.value(self.temperature) + 45) * 65536 / 175),
+            word(self.value(self.humidity) * 65536 / 100),
+        ]
+
+    def cmd_set_pressure(self, args):
+        self.pressure = args[0]
+
+    def cmd_get_asc(self, args):
+        return [self.asc_enabled]
+
+    def cmd_set_asc(self, args):
+        self.asc_enabled = args[0]
+
+    def cmd_get_temp_offset(self, args):
+        return [self.temp_offset]
+
+    def cmd_set_temp_offset(self, args):
+        self.temp_offset = args[0]
+
+    def cmd_get_altitude(self, args):
+        return [self.altitude]
+
+    def cmd_set_altitude(self, args):
+        self.altitude = args[0]
+
+    def cmd_forced_recalibration(self, args):
+        return [0x8000 + args[0] - self.co2]
+
+    def cmd_self_test(self, args):
+        return [0]
+
+
+# Mass concentrations (PM1.0, PM2.5, PM4.0, PM10), number concentrations (PM0.5 .. PM10), typical particle size
+SPS30_VALUES = (3.2, 5.1, 6.0, 6.4, 22.0, 26.0, 26.5, 26.6, 26.7, 0.55)
+
+
+class SimSps30(SensirionDevice):
+    ADDRESS = 0x69
+    COMMANDS = {
+        0x0010: ("cmd_start", 1, 20),
+        0x0104: ("cmd_stop", 0, 20),
+        0x0202: ("cmd_data_ready", 0, 0),
+        0x0300: ("cmd_read_values", 0, 0),
+        0x1001: ("cmd_sleep", 0, 5),
+        0x1103: ("cmd_wakeup", 0, 5),
+        0x5607: ("cmd_fan_clean", 0, 0),
+        0x8004: ("cmd_auto_cleaning", -1, 5),
+        0xD002: ("cmd_product_type", 0, 0),
+        0xD033: ("cmd_serial_number", 0, 0),
+        0xD100: ("cmd_version", 0, 0),
+        0xD206: ("cmd_read_status", 0, 0),
+        0xD210: ("cmd_clear_status", 0, 5),
+        0xD304: ("cmd_reset", 0, 100),
+    }
+    SAMPLE_MS = 1_000
+    PRODUCT_TYPE = "00080000"
+
+    def __init__(self, values=SPS30_VALUES, **kwargs):
+        super().__init__(**kwargs)
+        self.values = list(values)
+        self.fp_mode = True
+        self.sleeping = False
+        self.interface_awake = False
+        self.auto_cleaning_interval = 604_800
+        self.status = 0
+
+    def cmd_start(self, args):
+        if self.sleeping or self.sample_interval:
+            raise OSError(errno.EIO, "Start not allowed in the current state")
+        self.fp_mode = args[0] == 0x0300
+        self.start_sampling(self.SAMPLE_MS)
+
+    def cmd_stop(self, args):
+        self.stop_sampling()
+
+    def cmd_data_ready(self, args):
+        return [1 if self.sample_ready() else 0]
+
+    def cmd_read_values(self, args):
+        if not self.sample_interval:
+            raise OSError(errno.EIO, "Not measuring")
+
+        self.sample_consume()
+        res = []
+        for value in self.values:
+            value = self.value(value)
+            if self.fp_mode:
+                res.extend(float_words(value))
+            else:
+                res.append(word(value))
+        return res
+
+    def cmd_sleep(self, args):
+        if self.sample_interval:
+            raise OSError(errno.EIO, "Sleep allowed only in idle mode")
+        self.sleeping = True
+        self.interface_awake = False
+
+    def cmd_wakeup(self, args):
+        # The first wake-up only activates the interface and is not acknowledged
+        if self.sleeping and not self.interface_awake:
+            self.interface_awake = True
+            raise OSError(errno.EIO, "Interface woken up")
+        self.sleeping = False
+
+    def cmd_fan_clean(self, args):
+        pass
+
+    def cmd_auto_cleaning(self, args):
+        if len(args) >= 2:
+            self.auto_cleaning_interval = (args[0] << 16) | args[1]
+            return None
+        return [(self.auto_cleaning_interval >> 16) & 0xFFFF, self.auto_cleaning_interval & 0xFFFF]
+
+    def cmd_product_type(self, args):
+        return ascii_words(self.PRODUCT_TYPE)
+
+    def cmd_serial_number(self, args):
+        return ascii_words("".join("{:04X}".format(x) for x in self.serial))
+
+    def cmd_version(self, args):
+        return [0x0203]  # firmware 2.3
+
+    def cmd_read_status(self, args):
+        return [(self.status >> 16) & 0xFFFF, self.status & 0xFFFF]
+
+    def cmd_clear_status(self, args):
+        self.status = 0
+
+    def cmd_reset(self, args):
+        self.stop_sampling()
+        self.sleeping = False
+
+
+def shdlc_stuff(data) -> bytes:
+    res = bytearray()
+    for byte in data:
+        if byte in (0x7E, 0x7D, 0x11, 0x13):
+            res.append(0x7D)
+            res.append(byte ^ 0x20)
+        else:
+            res.append(byte)
+    return bytes(res)
+
+
+def shdlc_unstuff(data) -> bytes:
+    res = bytearray()
+    escaped = False
+    for byte in data:
+        if escaped:
+            res.append(byte ^ 0x20)
+            escaped = False
+        elif byte == 0x7D:
+            escaped = True
+        else:
+            res.append(byte)
+    return bytes(res)
+
+
+class SimSps30Shdlc(SimDevice):
+    """
+    SPS30 on UART, SHDLC framing: 0x7E, address, command, length, data, checksum, 0x7E, byte-stuffed.
+    Response frames carry a state byte after the command. Frames with a wrong checksum are discarded.
+    Reading measured values returns an empty frame if there is no new measurement.
+    """
+
+    STATE_OK = 0x00
+    STATE_UNKNOWN_COMMAND = 0x02
+    STATE_NOT_ALLOWED = 0x43
+    SAMPLE_MS = 1_000
+    PRODUCT_TYPE = "00080000"
+    SERIAL_NUMBER = "0123456789ABCDEF"
+    VERSION = bytes([2, 3, 0, 7, 0, 2, 0])  # firmware 2.3, hardware 7, SHDLC 2.0
+
+    def __init__(self, values=SPS30_VALUES, **kwargs):
+        super().__init__(**kwargs)
+        self.values = list(values)
+        self.fp_mode = True
+        self.sleeping = False
+        self.auto_cleaning_interval = 604_800
+        self.status = 0
+        self.frame = bytearray()
+
+    def on_write(self, data: bytes) -> bytes:
+        reply = bytearray()
+        for byte in data:
+            if byte != 0x7E:
+                self.frame.append(byte)
+            elif self.frame:
+                reply.extend(self.handle_frame(shdlc_unstuff(self.frame)))
+                self.frame = bytearray()
+        return bytes(reply)
+
+    def handle_frame(self, frame: bytes) -> bytes:
+        if len(frame) < 4 or len(frame) != 4 + frame[2] or shdlc_checksum(frame[:-1]) != frame[-1]:
+            return b""
+
+        address, command, data = frame[0], frame[1], frame[3:-1]
+        handler = getattr(self, "cmd_{:02x}".format(command), None)
+        if handler is None:
+            return self.response(address, command, self.STATE_UNKNOWN_COMMAND)
+
+        res = handler(data)
+        if res is None:
+            return self.response(address, command, self.STATE_NOT_ALLOWED)
+        return self.response(address, command, self.STATE_OK, res)
+
+    def response(self, address: int, command: int, state: int, data: bytes = b"") -> bytes:
+        frame = bytearray([address, command, state, len(data)])
+        frame.extend(data)
+        checksum = shdlc_checksum(frame)
+        if self.inject_crc_error():
+            checksum ^= 0xFF
+        frame.append(checksum)
+        return b"\x7e" + shdlc_stuff(frame) + b"\x7e"
+
+    def cmd_00(self, data) -> Optional[bytes]:
+        """Start measurement, data: 0x01, output format (0x03 float, 0x05 integer)"""
+        if self.sleeping or self.sample_interval:
+            return None
+        self.fp_mode = len(data) < 2 or data[1] == 0x03
+        self.start_sampling(self.SAMPLE_MS)
+        return b""
+
+    def cmd_01(self, data) -> Optional[bytes]:
+        """Stop measurement"""
+        self.stop_sampling()
+        return b""
+
+    def cmd_03(self, data) -> Optional[bytes]:
+        """Read measured values"""
+        if not self.sample_interval:
+            return None
+        if not self.sample_ready():
+            return b""
+
+        self.sample_consume()
+        fmt = ">f" if self.fp_mode else ">H"
+        return b"".join(struct.pack(fmt, self.value(x) if self.fp_mode else word(self.value(x))) for x in self.values)
+
+    def cmd_10(self, data) -> Optional[bytes]:
+        """Sleep"""
+        if self.sample_interval:
+            return None
+        self.sleeping = True
+        return b""
+
+    def cmd_11(self, data) -> Optional[bytes]:
+        """Wake-up"""
+        self.sleeping = False
+        return b""
+
+    def cmd_56(self, data) -> Optional[bytes]:
+        """Start fan cleaning"""
+        return b"" if self.sample_interval else None
+
+    def cmd_80(self, data) -> Optional[bytes]:
+        """Read / write auto cleaning interval"""
+        if len(data) >= 5:
+            self.auto_cleaning_interval = struct.unpack(">I", data[1:5])[0]
+            return b""
+        return struct.pack(">I", self.auto_cleaning_interval)
+
+    def cmd_d0(self, data) -> Optional[bytes]:
+        """Device information, data: 0x00 product type, 0x03 serial number"""
+        info = {0x00: self.PRODUCT_TYPE, 0x03: self.SERIAL_NUMBER}.get(data[0] if data else 0)
+        return None if info is None else info.encode() + b"\x00"
+
+    def cmd_d1(self, data) -> Optional[bytes]:
+        """Read version"""
+        return self.VERSION
+
+    def cmd_d2(self, data) -> Optional[bytes]:
+        """Read device status register, data: clear flag"""
+        status = self.status
+        if data and data[0]:
+            self.status = 0
+        return struct.pack(">IB", status, 0)
+
+    def cmd_d3(self, data) -> Optional[bytes]:
+        """Device reset"""
+        self.stop_sampling()
+        self.sleeping = False
+        return b""
+
+
+class SimAhtx0(SimDevice):
+    ADDRESS = 0x38
+    MEASURE_MS = 80
+    STATUS_BUSY = 0x80
+    STATUS_CALIBRATED = 0x08
+
+    def __init__(self, temperature=22.0, humidity=45.0, **kwargs):
+        super().__init__(**kwargs)
+        self.temperature = temperature
+        self.humidity = humidity
+        self.calibrated = True
+        self.busy_until = 0
+        self.data = bytearray(7)  # status, 20-bit humidity, 20-bit temperature, CRC
+
+    def on_write(self, data: bytes):
+        now = self.clock.ticks_ms()
+        if data[0] == 0xBA:  # soft reset
+            self.busy_until = now + 20
+        elif data[0] == 0xE1:  # calibrate
+            self.calibrated = True
+            self.busy_until = now + 10
+        elif data[0] == 0xAC:  # trigger measurement
+            self.busy_until = now + self.MEASURE_MS
+            self.latch()
+
+    def latch(self):
+        hum = min(int(self.value(self.humidity) * 0x100000 / 100), 0xFFFFF)
+        temp = min(max(int((self.value(self.temperature) + 50) * 0x100000 / 200), 0), 0xFFFFF)
+        data = self.data
+        data[1] = (hum >> 12) & 0xFF
+        data[2] = (hum >> 4) & 0xFF
+        data[3] = ((hum & 0xF) << 4) | ((temp >> 16) & 0xF)
+        data[4] = (temp >> 8) & 0xFF
+        data[5] = temp & 0xFF
+
+    def on_read(self, nbytes: int) -> bytes:
+        status = 0x10
+        if self.calibrated:
+            status |= self.STATUS_CALIBRATED
+        if self.clock.ticks_ms() < self.busy_until:
+            status |= self.STATUS_BUSY
+
+        self.data[0] = status
+        self.data[6] = crc8(self.data, 0, 6)
+        if self.inject_crc_error():
+            self.data[6] ^= 0xFF
+        return bytes(self.data)
+
+
+class SimHdc1080(SimDevice):
+    """Register pointer device, pointing to temperature / humidity register triggers a conversion"""
+
+    ADDRESS = 0x40
+    CONVERSION_MS = 13  # temperature and humidity at 14-bit resolution
+    CONFIG_DEFAULT = 0x1000  # temperature and humidity acquired in sequence
+    REGISTERS = {0xFB: 0x0123, 0xFC: 0x4567, 0xFD: 0x8900, 0xFE: 0x5449, 0xFF: 0x1050}
+
+    def __init__(self, temperature=22.0, humidity=45.0, **kwargs):
+        super().__init__(**kwargs)
+        self.temperature = temperature
+        self.humidity = humidity
+        self.pointer = 0
+        self.config = self.CONFIG_DEFAULT
+        self.ready_at = None
+        self.raw = (0, 0)
+
+    def on_write(self, data: bytes):
+        self.pointer = data[0]
+        if self.pointer == 0x02 and len(data) >= 3:
+            value = (data[1] << 8) | data[2]
+            self.config = self.CONFIG_DEFAULT if value & 0x8000 else value
+        elif self.pointer in (0x00, 0x01) and len(data) == 1:
+            self.ready_at = self.clock.ticks_ms() + self.CONVERSION_MS
+            self.raw = (
+                word((self.value(self.temperature) + 40) * 65536 / 165),
+                word(self.value(self.humidity) * 65536 / 100),
+            )
+
+    def on_read(self, nbytes: int) -> bytes:
+        if self.pointer in (0x00, 0x01):
+            if self.ready_at is None or self.clock.ticks_ms() < self.ready_at:
+                raise OSError(errno.EIO, "Conversion in progress")
+            if self.pointer == 0x00 and self.config & 0x1000:
+                return struct.pack(">HH", *self.raw)
+            return struct.pack(">H", self.raw[self.pointer])
+
+        value = self.config if self.pointer == 0x02 else self.REGISTERS.get(self.pointer, 0xFFFF)
+        return struct.pack(">H", value)
+
+
+class SimCcs811(SimDevice):
+    """Register pointer device with boot and application modes, samples according to the drive mode"""
+
+    ADDRESS = 0x5A
+    HW_ID = 0x81
+    RESET_SEQUENCE = b"\x11\xe5\x72\x8a"
+    DRIVE_MODE_MS = {1: 1_000, 2: 10_000, 3: 60_000, 4: 250}
+    ERROR_WRITE_REG_INVALID = 0x01
+    ERROR_READ_REG_INVALID = 0x02
+    REGISTERS = {0x20: b"\x81", 0x21: b"\x12", 0x23: b"\x10\x00", 0x24: b"\x20\x00"}
+
+    def __init__(self, eco2=600, tvoc=30, raw_current=20, raw_voltage=500, **kwargs):
+        super().__init__(**kwargs)
+        self.eco2 = eco2
+        self.tvoc = tvoc
+        self.raw_current = raw_current  # uA
+        self.raw_voltage = raw_voltage  # ADC value, 1.65 V full scale
+        self.pointer = 0
+        self.app_mode = False
+        self.meas_mode = 0
+        self.error_id = 0
+        self.env_data = b"\x64\x00\x64\x00"
+        self.baseline = b"\x84\x7b"
+        self.result = bytearray(8)
+
+    @property
+    def status(self) -> int:
+        status = 0x10  # valid application firmware
+        if self.app_mode:
+            status |= 0x80
+        if self.sample_ready():
+            status |= 0x08
+        if self.error_id:
+            status |= 0x01
+        return status
+
+    def on_write(self, data: bytes):
+        self.pointer = data[0]
+        payload = data[1:]
+        if self.pointer == 0xFF:
+            if payload == self.RESET_SEQUENCE:
+                self.app_mode = False
+                self.meas_mode = 0
+                self.error_id = 0
+                self.stop_sampling()
+            return
+        if self.pointer == 0xF4:
+            self.app_mode = True
+            return
+        if not payload:
+            return
+        if not self.app_mode:
+            self.error_id |= self.ERROR_WRITE_REG_INVALID
+            return
+
+        if self.pointer == 0x01:
+            self.meas_mode = payload[0]
+            interval = self.DRIVE_MODE_MS.get((self.meas_mode >> 4) & 0x7)
+            if interval:
+                self.start_sampling(interval)
+            else:
+                self.stop_sampling()
+        elif self.pointer == 0x05:
+            self.env_data = bytes(payload[:4])
+        elif self.pointer == 0x11:
+            self.baseline = bytes(payload[:2])
+        elif self.pointer != 0x10:  # thresholds
+            self.error_id |= self.ERROR_WRITE_REG_INVALID
+
+    def on_read(self, nbytes: int) -> bytes:
+        pointer = self.pointer
+        if pointer == 0x00:
+            return bytes([self.status])
+        if pointer == 0x01:
+            return bytes([self.meas_mode])
+        if pointer == 0x02:
+            return self.read_result()
+        if pointer == 0x03:
+            return bytes(self.result[6:8])
+        if pointer == 0x11:
+            return self.baseline
+        if pointer == 0xE0:
+            error_id, self.error_id = self.error_id, 0
+            return bytes([error_id])
+        if pointer in self.REGISTERS:
+            return self.REGISTERS[pointer]
+
+        self.error_id |= self.ERROR_READ_REG_INVALID
+        return b""
+
+    def read_result(self) -> bytes:
+        if self.sample_ready():
+            struct.pack_into(">HH", self.result, 0, word(self.value(self.eco2)), word(self.value(self.tvoc)))
+            self.result[4] = self.status
+            self.result[5] = self.error_id
+            self.result[6] = ((self.raw_current & 0x3F) << 2) | ((self.raw_voltage >> 8) & 0x3)
+            self.result[7] = self.raw_voltage & 0xFF
+            self.sample_consume()
+        return bytes(self.result)
+
+
+class SimZh03b(SimDevice):
+    """
+    Winsen ZH03B laser dust sensor on UART. Streams a frame every second after power-up,
+    answers 9-byte commands in Q&A mode. Commands with a wrong checksum are ignored.
+    """
+
+    STREAM_MS = 1_000
+    STREAM_MAX_FRAMES = 4  # receive FIFO holds a few frames only
+
+    def __init__(self, pm10=4, pm25=7, pm100=9, **kwargs):
+        super().__init__(**kwargs)
+        self.pm10 = pm10
+        self.pm25 = pm25
+        self.pm100 = pm100
+        self.qa_mode = False
+        self.dormant = False
+        self.last_frame_at = None
+
+    def on_write(self, data: bytes) -> bytes:
+        if len(data) != 9 or data[0] != 0xFF or zh03b_checksum(data) != data[8]:
+            return b""
+
+        command = data[2]
+        if command == 0x78:
+            self.qa_mode = data[3] == 0x41
+            self.last_frame_at = None
+        elif command == 0xA7:
+            self.dormant = data[3] == 0x01
+            return self.frame(b"\xff\xa7\x01\x00\x00\x00\x00\x00\x00")
+        elif command == 0x86 and self.qa_mode and not self.dormant:
+            return self.frame(
+                struct.pack(
+                    ">BBHHHB",
+                    0xFF,
+                    0x86,
+                    word(self.value(self.pm25)),
+                    word(self.value(self.pm100)),
+                    word(self.value(self.pm10)),
+                    0,
+                )
+            )
+        return b""
+
+    def frame(self, data: bytes) -> bytes:
+        data = bytearray(data)
+        data[8] = zh03b_checksum(data)
+        if self.inject_crc_error():
+            data[8] ^= 0xFF
+        return bytes(data)
+
+    def on_poll(self) -> bytes:
+        if self.qa_mode or self.dormant:
+            return b""
+
+        now = self.clock.ticks_ms()
+        if self.last_frame_at is None:
+            self.last_frame_at = now
+            return b""
+
+        count = (now - self.last_frame_at) // self.STREAM_MS
+        self.last_frame_at += count * self.STREAM_MS
+        return b"".join(self.stream_frame() for _ in range(min(count, self.STREAM_MAX_FRAMES)))
+
+    def stream_frame(self) -> bytes:
+        frame = bytearray(24)
+        struct.pack_into(
+            ">BBH6xHHH6x",
+            frame,
+            0,
+            0x42,
+            0x4D,
+            0x14,
+            word(self.value(self.pm10)),
+            word(self.value(self.pm25)),
+            word(self.value(self.pm100)),
+        )
+        checksum = sum(frame[:22])
+        if self.inject_crc_error():
+            checksum ^= 0xFF
+        struct.pack_into(">H", frame, 22, checksum & 0xFFFF)
+        return bytes(frame)
@@ -0,0 +1,310 @@
+"""
+Replay of captured I2C and UART traffic, see ph4_sense_py.sim.capture.
+
+Replay buses serve recorded reads to the drivers in order, per device address or UART.
+The virtual clock jumps forward to the recorded time of each served record, so Sensei sees the original
+timing while idle waits cost no real time. Written data is compared with the capture, differences are counted
+as mismatches. When a device runs out of records the replay is finished and the device stops responding.
+
+    python -m ph4_sense_py.sim.replay capture.bin.gz
+"""
+
+import argparse
+import collections
+import errno
+import json
+import sys
+
+from ph4_sense.support.uart import Uart
+from ph4_sense_py.sim.bench import Bench, SimSensei
+from ph4_sense_py.sim.capture import (
+    OP_CONFIG,
+    OP_ERROR,
+    OP_I2C_READ,
+    OP_I2C_WRITE,
+    OP_NAME,
+    OP_UART_RX,
+    OP_UART_TX,
+    UART_CHANNEL_BASE,
+    CaptureReader,
+)
+from ph4_sense_py.sim.clock import RealClock, VirtualClock
+
+try:
+    from typing import Dict, Optional
+except ImportError:
+    pass
+
+
+class ReplayTraffic:
+    """Capture loaded to per-channel queues of (op, timestamp_us, data)"""
+
+    def __init__(self, reader: CaptureReader):
+        self.epoch = reader.epoch
+        self.config = None
+        self.names = {}
+        self.channels = collections.defaultdict(collections.deque)
+        for op, channel, ts, data in reader:
+            if op == OP_CONFIG:
+                self.config = json.loads(data)
+            elif op == OP_NAME:
+                self.names[data.decode()] = channel
+            else:
+                self.channels[channel].append((op, ts, data))
+
+    @classmethod
+    def load(cls, path: str) -> "ReplayTraffic":
+        reader = CaptureReader.open(path)
+        try:
+            return cls(reader)
+        finally:
+            reader.close()
+
+    def uart_names(self):
+        return list(self.names)
+
+
+class ReplayChannel:
+    def __init__(self, traffic: ReplayTraffic, channel: int, clock):
+        self.queue = traffic.channels[channel]
+        self.clock = clock
+        self.mismatches = 0
+        self.finished = False
+
+    def next(self, *ops) -> Optional[tuple]:
+        """Next record of the given ops or an error, records the driver skipped are dropped as mismatches"""
+        queue = self.queue
+        while queue and queue[0][0] not in ops and queue[0][0] != OP_ERROR:
+            queue.popleft()
+            self.mismatches += 1
+        if not queue:
+            self.finished = True
+            return None
+
+        op, ts, data = queue.popleft()
+        self.clock.advance_us(ts - self.clock.ticks_us())
+        if op == OP_ERROR:
+            raise OSError(data[0] if data else errno.EIO, "Replayed bus error")
+        return op, ts, data
+
+
+class ReplayI2C:
+    """I2C bus replaying a capture, machine.I2C compatible"""
+
+    def __init__(self, traffic: ReplayTraffic, clock=None):
+        self.traffic = traffic
+        self.clock = clock or RealClock()
+        self.devices: Dict[int, ReplayChannel] = {
+            ch: ReplayChannel(traffic, ch, self.clock) for ch in list(traffic.channels) if ch < UART_CHANNEL_BASE
+        }
+        self.transactions = 0
+        self.errors = 0
+
+    @property
+    def finished(self) -> bool:
+        return any(x.finished for x in self.devices.values())
+
+    @property
+    def mismatches(self) -> int:
+        return sum(x.mismatches for x in self.devices.values())
+
+    def scan(self):
+        return sorted(self.devices)
+
+    def _next(self, address: int, op: int) -> bytes:
+        self.transactions += 1
+        device = self.devices.get(address)
+        try:
+            rec = device.next(op) if device else None
+        except OSError:
+            self.errors += 1
+            raise
+        if rec is None:
+            raise OSError(errno.ENODEV, "No replayed traffic for {}".format(hex(address)))
+        return rec[2]
+
+    def _write(self, address: int, data: bytes):
+        if self._next(address, OP_I2C_WRITE) != data:
+            self.devices[address].mismatches += 1
+
+    def _read(self, address: int, buf):
+        data = self._next(address, OP_I2C_READ)
+        nbytes = len(buf)
+        if len(data) != nbytes:
+            self.devices[address].mismatches += 1
+            data = (bytes(data) + b"\xff" * nbytes)[:nbytes]
+        buf[:] = data
+
+    def writeto(self, addr: int, buf, stop: bool = True) -> int:
+        self._write(addr, bytes(buf))
+        return len(buf)
+
+    def writevto(self, addr: int, vector, stop: bool = True) -> int:
+        return self.writeto(addr, b"".join(bytes(x) for x in vector), stop)
+
+    def readfrom_into(self, addr: int, buf, stop: bool = True):
+        self._read(addr, buf)
+
+    def readfrom(self, addr: int, nbytes: int, stop: bool = True) -> bytes:
+        buf = bytearray(nbytes)
+        self._read(addr, buf)
+        return bytes(buf)
+
+    def readfrom_mem_into(self, addr: int, memaddr: int, buf, addrsize: int = 8):
+        self._write(addr, bytes([memaddr]))
+        self._read(addr, buf)
+
+    def writeto_mem(self, addr: int, memaddr: int, buf, addrsize: int = 8):
+        self._write(addr, bytes([memaddr]) + bytes(buf))
+
+
+class ReplayUart(Uart):
+    """
+    UART replaying a capture. Recorded data becomes available at its recorded time, once the driver has sent
+    everything that preceded it in the capture. Reads wait for the data, readinto() does not.
+    pyserial-style aliases allow using it in place of serial.Serial.
+    """
+
+    def __init__(self, traffic: ReplayTraffic, name: str, clock=None):
+        super().__init__()
+        self.clock = clock or RealClock()
+        self.channel = ReplayChannel(traffic, traffic.names[name], self.clock)
+        self.rx = bytearray()
+        self.transactions = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.channel.finished
+
+    def _receive(self, wait: bool = False):
+        """Receives recorded data up to now, with wait also data received later, as a read with timeout would"""
+        queue = self.channel.queue
+        while queue and queue[0][0] == OP_UART_RX and (wait or queue[0][1] <= self.clock.ticks_us()):
+            self.rx.extend(self.channel.next(OP_UART_RX)[2])
+
+    def read(self, nbytes: int) -> bytes:
+        self.transactions += 1
+        if len(self.rx) < nbytes:
+            self._receive(wait=True)
+            if len(self.rx) < nbytes and not self.channel.queue:
+                self.channel.finished = True
+        data = bytes(self.rx[:nbytes])
+        del self.rx[:nbytes]
+        return data
+
+    def readinto(self, buf) -> int:
+        self.transactions += 1
+        self._receive()
+        if not self.rx and not self.channel.queue:
+            self.channel.finished = True
+        nbytes = min(len(self.rx), len(buf))
+        buf[0:nbytes] = self.rx[:nbytes]
+        del self.rx[:nbytes]
+        return nbytes
+
+    def write(self, buff):
+        self.transactions += 1
+        data = bytes(buff)
+        try:
+            rec = self.channel.next(OP_UART_TX)
+        except OSError:
+            return len(data)
+        if rec is not None and rec[2] != data:
+            self.channel.mismatches += 1
+        return len(data)
+
+    def flush_input(self):
+        self.rx.clear()
+
+    @property
+    def in_waiting(self) -> int:
+        self._receive()
+        return len(self.rx)
+
+    def inWaiting(self) -> int:
+        return self.in_waiting
+
+    def flushInput(self):
+        self.flush_input()
+
+    def flushOutput(self):
+        self.flush_output()
+
+    def close(self):
+        pass
+
+
+def replay_config(traffic: ReplayTraffic, config: Optional[dict] = None) -> dict:
+    """Captured config with the network removed and UARTs mapped to the replayed ones"""
+    config = dict(config or traffic.config or {})
+    for key in ("wifi", "udpLogger", "stateFile", "dutyCycle", "lightSleep", "irqPins"):
+        config.pop(key, None)
+    if "sps30_uart" in config:
+        config["sps30_uart"] = "sps30"
+    if "zh03b_uart" in config:
+        config["zh03b_uart"] = dict(config["zh03b_uart"], type="replay", port="zh03b")
+    return config
+
+
+class ReplayBench(Bench):
+    def finished(self) -> bool:
+        buses = [self.sensei.sim_i2c] + list(self.sensei.sim_uarts.values())
+        return any(x.finished for x in buses)
+
+    def run(self, cycles: int = 0) -> dict:
+        """Runs until the capture is exhausted, or for the given number of cycles"""
+        while not self.finished() and (not cycles or len(self.cpu_us) < cycles):
+            self.run_cycle()
+        if self.finished():
+            # The last cycle ran out of the captured traffic
+            last = len(self.cpu_us) - 1
+            for samples in (self.cpu_us, self.wall_us, self.loop_ms):
+                del samples[last:]
+        return self.report()
+
+    def report(self) -> dict:
+        res = super().report()
+        res["mismatches"] = self.sensei.sim_i2c.mismatches + sum(
+            x.channel.mismatches for x in self.sensei.sim_uarts.values()
+        )
+        return res
+
+
+def run_replay(
+    path: str, config: Optional[dict] = None, cycles: int = 0, track_alloc: bool = True, verbose: bool = False
+) -> dict:
+    traffic = ReplayTraffic.load(path)
+    with VirtualClock(epoch=traffic.epoch) as clock:
+        i2c = ReplayI2C(traffic, clock)
+        uarts = {name: ReplayUart(traffic, name, clock) for name in traffic.uart_names()}
+        sensei = SimSensei(i2c, uarts, replay_config(traffic, config), verbose=verbose)
+        sensei.init_config()
+        sensei.init_network()
+        sensei.init_sensors()
+        return ReplayBench(sensei, clock, track_alloc).run(cycles)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Sensei loop replay of captured sensor traffic")
+    parser.add_argument("capture", help="capture file, recorded by ph4-sensei --capture")
+    parser.add_argument("-c", "--config", dest="config", help="Sensei config file, defaults to the captured one")
+    parser.add_argument("--cycles", dest="cycles", type=int, default=0, help="measure loop cycles, 0 for all")
+    parser.add_argument(
+        "--no-alloc", dest="no_alloc", action="store_const", const=True, help="disables allocation tracking"
+    )
+    parser.add_argument("--verbose", dest="verbose", action="store_const", const=True, help="prints Sensei output")
+    args = parser.parse_args(args)
+
+    config = None
+    if args.config:
+        with open(args.config) as fh:
+            config = json.load(fh)
+
+    res = run_replay(
+        args.capture, config=config, cycles=args.cycles, track_alloc=not args.no_alloc, verbose=bool(args.verbose)
+    )
+    print(json.dumps(res, indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
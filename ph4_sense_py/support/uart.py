@@ -13,6 +13,12 @@ class UartSerial(Uart):
     def read(self, nbytes: int) -> bytes:
         return self.uart.read(nbytes)
 
+    def readinto(self, buf) -> int:
+        nbytes = min(self.uart.in_waiting, len(buf))
+        if not nbytes:
+            return 0
+        return self.uart.readinto(memoryview(buf)[:nbytes]) or 0
+
     def write(self, buff):
         self.uart.write(buff)
 
@@ -0,0 +1,73 @@
+import argparse
+import json
+import logging
+import sys
+
+import coloredlogs
+import paho.mqtt.client as mqtt  # paho-mqtt
+
+from ph4_sense.telemetry import decode_telemetry
+
+logger = logging.getLogger(__name__)
+coloredlogs.install(level=logging.INFO)
+
+
+class TelemetryBridge:
+    """
+    Subscribes to packed telemetry published by sensors in "packed" publish mode and re-publishes
+    decoded readings as JSON to the per-sensor topics, e.g., sensors/sgp30_<sensorId>, so Home Assistant
+    and other consumers work unchanged.
+    """
+
+    PACKED_PREFIX = "sensors/packed"
+
+    def __init__(self, host: str, port: int = 1883, with_timestamp: bool = False):
+        self.host = host
+        self.port = port
+        self.with_timestamp = with_timestamp
+        self.client = None
+
+    def on_connect(self, client, userdata, flags, rc):
+        logger.info("Connected to %s:%s, rc: %s", self.host, self.port, rc)
+        client.subscribe(f"{self.PACKED_PREFIX}_+")
+        client.subscribe(self.PACKED_PREFIX)
+
+    def on_message(self, client, userdata, msg):
+        try:
+            for topic, payload in self.decode(msg.topic, msg.payload):
+                client.publish(topic, payload)
+        except Exception as e:
+            logger.warning("Could not decode message on %s: %s", msg.topic, e)
+
+    def decode(self, topic: str, data: bytes):
+        """Returns list of (topic, JSON payload) for the packed message"""
+        suffix = topic[len(self.PACKED_PREFIX) :]
+        ts, readings = decode_telemetry(data)
+        res = []
+        for name, values in readings.items():
+            if self.with_timestamp:
+                values["ts"] = ts
+            res.append((f"sensors/{name}{suffix}", json.dumps(values)))
+        return res
+
+    def main(self):
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, "ph4_telemetry_bridge")
+        self.client.on_connect = self.on_connect
+        self.client.on_message = self.on_message
+        self.client.connect(self.host, self.port, keepalive=60)
+        self.client.loop_forever()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Packed telemetry to JSON MQTT bridge")
+    parser.add_argument("--host", dest="host", default="localhost", help="MQTT broker host")
+    parser.add_argument("--port", dest="port", type=int, default=1883, help="MQTT broker port")
+    parser.add_argument(
+        "--timestamp", dest="timestamp", action="store_const", const=True, help="adds ts field to the payloads"
+    )
+    args = parser.parse_args(args)
+    TelemetryBridge(args.host, args.port, bool(args.timestamp)).main()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -42,6 +42,10 @@ test_extras = [
     "types-ujson",
 ]
 
+batch_extras = [
+    "numpy",
+]
+
 docs_extras = [
     "Sphinx>=1.0",  # autodoc_member_order = 'bysource', autodoc_default_flags
     "sphinx_rtd_theme",
@@ -89,10 +93,15 @@ setup(
         "dev": dev_extras,
         "test": test_extras,
         "docs": docs_extras,
+        "batch": batch_extras,
     },
     entry_points={
         "console_scripts": [
             "ph4-sensei = ph4_sense.sense_py:main",
+            "ph4-telemetry-bridge = ph4_sense_py.telemetry_bridge:main",
+            "ph4-sense-bench = ph4_sense_py.sim.bench:main",
+            "ph4-sense-replay = ph4_sense_py.sim.replay:main",
+            "ph4-sense-freeze = ph4_sense_py.freeze:main",
         ],
     },
 )
@@ -0,0 +1,41 @@
+import pytest
+
+from ph4_sense.support.allocator import BufferPool, PreallocatedBuffer
+
+
+def test_preallocated_buffer_write():
+    buf = PreallocatedBuffer(8)
+    buf.write(b"\x01\x02\x03\x04", offset=1, length=2, offset_dst=3)
+    assert buf.get_raw() == bytearray([0, 0, 0, 2, 3, 0, 0, 0])
+
+    buf.write([9, 8, 7], offset_dst=5)
+    assert buf.get_raw() == bytearray([0, 0, 0, 2, 3, 9, 8, 7])
+    assert bytes(buf.get(4)) == b"\x00\x00\x00\x02"
+
+
+def test_buffer_pool():
+    pool = BufferPool(((8, 2), (32, 1)))
+    a = pool.lease(4)
+    b = pool.lease(8)
+    assert len(a.buffer) == 4 and len(b.buffer) == 8
+
+    # 8-byte class exhausted, next lease uses the larger class
+    with pool.lease(6) as c:
+        assert len(c) == 6
+        assert pool.stats()[32] == (1, 1)
+    assert pool.stats()[32] == (0, 1)
+
+    a.release()
+    a.release()  # double release is ignored
+    d = pool.lease(8)
+    assert d.slot is a.slot
+    assert pool.stats() == {"fallbacks": 0, 8: (2, 2), 32: (0, 1)}
+
+    with pool.lease(64) as e:
+        assert len(e) == 64
+    assert pool.stats()["fallbacks"] == 1
+
+    strict = BufferPool(((8, 1),), strict=True)
+    strict.lease(8)
+    with pytest.raises(MemoryError):
+        strict.lease(8)
@@ -0,0 +1,35 @@
+import asyncio
+import threading
+
+from ph4_sense.scheduler import Scheduler
+from ph4_sense.sense import Sensei
+from ph4_sense.sense_async import AsyncRuntime
+
+
+def test_async_io_worker():
+    threads = {}
+
+    def record(name):
+        return lambda *args: threads.setdefault(name, set()).add(threading.current_thread().name)
+
+    sensei = Sensei()
+    sensei.measure_loop_ms = 20
+    sensei.report_log = lambda: None
+    sensei.publish = record("publish")
+    sensei.connect_mqtt = record("reconnect")
+    sensei.scheduler = Scheduler()
+    sensei.scheduler.add("sensor", 10, record("sensor"))
+    sensei.scheduler.add("backfill", 10, record("backfill"))
+    sensei.scheduler.add("state", 10, record("state"))
+
+    runtime = AsyncRuntime(sensei)
+    try:
+        asyncio.run(asyncio.wait_for(runtime.main(), 0.3))
+    except asyncio.TimeoutError:
+        pass
+
+    loop_thread = threading.current_thread().name
+    assert threads["sensor"] == {loop_thread}
+    io_threads = threads["publish"] | threads["backfill"] | threads["state"] | threads["reconnect"]
+    assert len(io_threads) == 1 and loop_thread not in io_threads
+    runtime.executor.shutdown()
@@ -0,0 +1,34 @@
+import pytest
+
+from ph4_sense.support.crc import crc8, crc8_check, crc8_strip
+
+
+def crc8_bitwise(data):
+    crc = 0xFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc << 1) ^ 0x31 if crc & 0x80 else crc << 1
+    return crc & 0xFF
+
+
+def test_crc8():
+    assert crc8(b"\xbe\xef") == 0x92  # datasheet example
+    assert crc8(b"\x00\xbe\xef\x00", 1, 3) == 0x92
+    for i in range(256):
+        for j in (0x00, 0x5A, 0xFF):
+            assert crc8(bytes([i, j])) == crc8_bitwise([i, j])
+
+
+def test_crc8_strip():
+    buf = bytearray(b"\xbe\xef\x92\x12\x34\x00\xff")
+    buf[5] = crc8(buf, 3, 5)
+    crc8_check(buf, 6)
+    assert crc8_strip(buf, 6) == 4
+    assert buf[:4] == b"\xbe\xef\x12\x34"
+
+    buf = bytearray(b"\xbe\xef\x93")
+    with pytest.raises(RuntimeError):
+        crc8_check(buf)
+    with pytest.raises(RuntimeError):
+        crc8_strip(buf, 2)
@@ -0,0 +1,81 @@
+import math
+import random
+import statistics
+
+import pytest
+
+from ph4_sense.filters import FloatingMedian, SensorFilter
+from ph4_sense.sensirion import GasIndexAlgorithm
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def test_floating_median():
+    rnd = random.Random(42)
+    for window in (1, 2, 5, 8, 31):
+        flt = FloatingMedian(window)
+        values = []
+        for _ in range(200):
+            value = rnd.randint(0, 20)  # duplicates are intentional
+            values.append(value)
+            assert flt.update(value) == statistics.median(values[-window:])
+            assert flt.cur == statistics.median(values[-window:])
+
+    flt = FloatingMedian(3)
+    assert flt.cur is None
+    assert flt.update(None) is None
+    assert flt.update(4) == 4
+    assert flt.update(None) == 4
+
+
+def test_sensor_filter_update_many():
+    np = pytest.importorskip("numpy")
+    rnd = random.Random(7)
+    values = [rnd.uniform(400, 2000) for _ in range(500)]
+    values[0] = values[17] = values[250] = None
+
+    for window in (1, 4, 9):
+        seq = SensorFilter(median_window=window, alpha=0.2)
+        expected = [seq.update(x) for x in values]
+
+        flt = SensorFilter(median_window=window, alpha=0.2)
+        assert flt.update_many(values) == expected
+
+        # numpy input, processed in chunks resumed from the saved state
+        data = np.array([np.nan if x is None else x for x in values])
+        state = SensorFilter(median_window=window, alpha=0.2).get_state()
+        res = []
+        bounds = (0, 3, 100, 101, 400, len(data))
+        for start, stop in zip(bounds, bounds[1:]):
+            flt = SensorFilter(median_window=window, alpha=0.2)
+            flt.set_state(state)
+            res.extend(flt.update_many(data[start:stop]).tolist())
+            state = flt.get_state()
+        assert res[1:] == expected[1:]
+        assert math.isnan(res[0])
+
+
+@pytest.mark.parametrize("algorithm_type", [GasIndexAlgorithm.ALGORITHM_TYPE_VOC, GasIndexAlgorithm.ALGORITHM_TYPE_NOX])
+def test_gas_index_process_many(algorithm_type):
+    rnd = random.Random(algorithm_type)
+    base = 30000 if algorithm_type == GasIndexAlgorithm.ALGORITHM_TYPE_VOC else 15000
+    values = []
+    for ix in range(6000):
+        base = max(1000, min(64000, base + rnd.randint(-300, 300)))
+        values.append(0 if ix % 997 == 0 else base)  # occasional invalid sample
+
+    seq = GasIndexAlgorithm(algorithm_type)
+    expected = [seq.process(x) for x in values]
+
+    alg = GasIndexAlgorithm(algorithm_type)
+    res = alg.process_many(values[:20]) + alg.process_many(values[20:3000])
+    if np is not None:
+        res += alg.process_many(np.array(values[3000:])).tolist()
+    else:
+        res += alg.process_many(values[3000:])
+
+    assert res == expected
+    assert alg.x3 == seq.x3 and alg.mean == seq.mean and alg.std == seq.std
@@ -0,0 +1,67 @@
+import pytest
+
+from ph4_sense.support.i2c_base import BitRegister, RWBit, RWBits
+
+
+class FakeI2C:
+    def __init__(self, regs):
+        self.regs = regs
+        self.pointer = None
+        self.ops = []
+
+    def writeto(self, address, buf, stop=True):
+        self.ops.append(("w", bytes(buf)))
+        self.pointer = buf[0]
+        for i, b in enumerate(buf[1:]):
+            self.regs[self.pointer][i] = b
+
+    def readfrom_into(self, address, buf):
+        self.ops.append(("r", self.pointer))
+        buf[:] = self.regs[self.pointer][: len(buf)]
+
+
+class FakeI2CMp(FakeI2C):
+    def writevto(self, address, vector):
+        self.writeto(address, b"".join(bytes(x) for x in vector))
+
+    def readfrom_mem_into(self, address, memaddr, buf):
+        self.pointer = memaddr
+        self.readfrom_into(address, buf)
+
+
+def test_bit_register_transaction(monkeypatch):
+    monkeypatch.setattr("ph4_sense.support.i2c_base.sleep_ms", lambda x: None)
+    bus = FakeI2C({0x01: bytearray([0b1000])})
+    register = BitRegister(bus, 0x5A, 0x01, 1, cacheable=True)
+    interrupt = RWBit(register, 3)
+    drive_mode = RWBits(register, 3, 4)
+
+    with register.transaction():
+        interrupt.set(False)
+        drive_mode.set(1)
+    assert bus.ops == [("w", b"\x01"), ("r", 0x01), ("w", b"\x01\x10")]
+
+    # Served from the cache, unchanged value is not written
+    bus.ops.clear()
+    assert drive_mode.get() == 1 and not interrupt.get()
+    drive_mode.set(1)
+    assert bus.ops == []
+
+    # Failed transaction discards staged changes
+    with pytest.raises(ValueError):
+        with register.transaction():
+            drive_mode.set(3)
+            raise ValueError()
+    assert bus.ops == []
+    assert drive_mode.get() == 1
+    assert bus.ops == [("w", b"\x01"), ("r", 0x01)]
+
+
+def test_bit_register_combined_transfers():
+    bus = FakeI2CMp({0x02: bytearray([0x00, 0x00])})
+    register = BitRegister(bus, 0x40, 0x02, 2, read_delay_ms=0)
+    mode = RWBit(register, 12, False)
+
+    mode.set(True)
+    assert bus.ops == [("r", 0x02), ("w", b"\x02\x10\x00")]
+    assert bus.regs[0x02] == bytearray([0x10, 0x00])
@@ -0,0 +1,47 @@
+from ph4_sense.logger_mp import MpLogger
+from ph4_sense.support.sensor_helper import SensorHelper
+
+
+class Formatted:
+    """Counts str() calls, i.e., message formatting"""
+
+    count = 0
+
+    def __str__(self):
+        Formatted.count += 1
+        return "formatted"
+
+
+def test_mp_logger_lazy():
+    events = []
+    logger = MpLogger(lambda level, msg, *args, **kwargs: events.append((level, msg % args)), level=30)
+    arg = Formatted()
+
+    logger.info("info %s", arg)
+    logger.debug("debug %s", arg)
+    assert not events and Formatted.count == 0
+    assert not logger.isEnabledFor(20) and logger.isEnabledFor(40)
+
+    logger.error("error %s", arg)
+    logger.warn("warn %s", arg)
+    assert events == [(40, "error formatted"), (30, "warn formatted")]
+
+    # Debug is compiled out, even with the level enabled
+    logger.setLevel(0)
+    logger.debug("debug %s", arg)
+    logger.info("info %s", arg)
+    assert events[-1] == (20, "info formatted") and len(events) == 3
+    assert not logger.isEnabledFor(10)
+
+
+def test_sensor_helper_logging(capsys):
+    SensorHelper().log_info("CCS811 app ver: %x.%x", 1, 2)
+    SensorHelper().log_error("CRC mismatch, dl %s", 3)
+    out = capsys.readouterr().out
+    assert "Info: CCS811 app ver: 1.2" in out and "Error: CRC mismatch, dl 3" in out
+
+    events = []
+    helper = SensorHelper(logger=MpLogger(lambda level, msg, *args, **kwargs: events.append(msg % args), level=40))
+    helper.log_info("skipped %s", Formatted())
+    helper.log_error("Measurement fail: %s", "x")
+    assert events == ["Measurement fail: x"]
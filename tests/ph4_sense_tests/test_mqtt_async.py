@@ -0,0 +1,90 @@
+import asyncio
+
+from ph4_sense.sense import Sensei
+from ph4_sense.support.mqtt_async import AsyncMqttClient
+
+
+async def read_packet(reader):
+    header = (await reader.readexactly(1))[0]
+    remaining, shift = 0, 0
+    while True:
+        byte = (await reader.readexactly(1))[0]
+        remaining |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            break
+    return header, await reader.readexactly(remaining)
+
+
+def test_async_mqtt_client():
+    received = []
+
+    async def broker(reader, writer):
+        while True:
+            try:
+                header, body = await read_packet(reader)
+            except asyncio.IncompleteReadError:
+                break
+            received.append((header, body))
+            if header == 0x10:
+                writer.write(b"\x20\x02\x00\x00")
+            elif header == 0x82:
+                writer.write(b"\x90\x03" + body[:2] + b"\x00")
+            await writer.drain()
+        writer.close()
+
+    async def run():
+        server = await asyncio.start_server(broker, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        client = AsyncMqttClient("esp32_client/test", "127.0.0.1", port)
+        await client.connect()
+        await client.subscribe("sensors/cmd")
+        await client.publish("sensors/sgp41_test", '{"TVOC": 100}')
+        await client.publish("sensors/packed_test", b"\x01" * 200)
+        client.disconnect()
+        await asyncio.sleep(0.05)
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(run())
+    headers = [header for header, _ in received]
+    assert headers == [0x10, 0x82, 0x30, 0x30, 0xE0]
+    assert received[0][1][:6] == b"\x00\x04MQTT" and received[0][1].endswith(b"esp32_client/test")
+    assert received[2][1] == b"\x00\x12sensors/sgp41_test" + b'{"TVOC": 100}'
+    assert received[3][1] == b"\x00\x13sensors/packed_test" + b"\x01" * 200
+
+
+def test_mqtt_outbox():
+    class FlakyClient:
+        def __init__(self):
+            self.published = []
+            self.fail = 1
+
+        async def publish(self, topic, message):
+            if self.fail:
+                self.fail -= 1
+                raise OSError("Connection reset")
+            self.published.append((topic, message))
+
+    sensei = Sensei()
+    sensei.mqtt_outbox = []
+    sensei.mqtt_outbox_size = 3
+    sensei.mqtt_client = FlakyClient()
+    sensei.mqtt_online = True
+
+    buffer = bytearray(b"packed")
+    sensei.queue_mqtt_msg("sensors/a", "1")
+    sensei.queue_mqtt_msg("sensors/b", memoryview(buffer))
+    buffer[:] = b"reused"
+
+    asyncio.run(sensei.flush_mqtt_outbox())
+    assert not sensei.is_online() and len(sensei.mqtt_outbox) == 2
+
+    sensei.queue_mqtt_msg("sensors/c", "3")
+    sensei.queue_mqtt_msg("sensors/d", "4")
+    assert sensei.mqtt_outbox_dropped == 1
+
+    sensei.mqtt_online = True
+    asyncio.run(sensei.flush_mqtt_outbox())
+    assert sensei.mqtt_client.published == [("sensors/b", b"packed"), ("sensors/c", "3"), ("sensors/d", "4")]
+    assert not sensei.mqtt_outbox
@@ -0,0 +1,55 @@
+import json
+
+from ph4_sense.scheduler import Scheduler
+from ph4_sense.support.perf import PerfStats, StageStats
+
+
+def test_stage_stats():
+    stage = StageStats("x", window=20)
+    assert stage.summary() is None
+    for ix in range(1, 41):
+        stage.record(ix)
+
+    # Statistics cover the last window samples only
+    assert stage.summary() == [40, 21, 30, 40, 40]
+    assert stage.call(lambda: 5) == 5
+    assert stage.count == 41
+
+
+def test_perf_scheduler():
+    perf = PerfStats(window=8, track_alloc=True)
+    scheduler = Scheduler()
+    started = []
+    task = scheduler.add("sensor", 1000, lambda: [0] * 100, start=lambda: started.append(1))
+    scheduler.set_perf(perf)
+    scheduler.add("report", 1000, lambda: None)
+
+    scheduler.run_due(task.next_due)
+    scheduler.run_due(task.next_due)
+    summary = perf.summary()
+    assert set(summary) == {"sensor", "sensor_start", "report"}
+    assert summary["sensor"]["n"] == 2 and summary["sensor"]["max"] >= summary["sensor"]["min"] >= 0
+    assert summary["sensor"]["alloc"] >= 0
+
+    scheduler.set_perf(None)
+    scheduler.run_due(task.next_due)
+    assert perf.stage("sensor").count == 2 and len(started) == 3
+
+
+def test_perf_sensei():
+    from ph4_sense_py.sim.bench import Bench, SimSensei, build_devices, default_config
+    from ph4_sense_py.sim.clock import VirtualClock
+
+    with VirtualClock() as clock:
+        config = dict(default_config(), perf={"period": 60, "alloc": True})
+        sensei = SimSensei(*build_devices(clock), config)
+        sensei.init_config()
+        sensei.init_network()
+        sensei.init_sensors()
+        Bench(sensei, clock, track_alloc=False).run(150)
+
+    perf = [json.loads(msg) for topic, msg in sensei.mqtt_client.published if topic == "sensors/esp32_sim_perf"]
+    assert len(perf) == 2
+    stages = perf[-1]["stages"]
+    assert {"cycle", "temp", "temp_start", "sgp41", "scd4x", "report", "pub_sgp30"} <= set(stages)
+    assert stages["cycle"]["p95"] >= stages["sgp41"]["p95"] > 0
@@ -0,0 +1,52 @@
+from ph4_sense.support.record_queue import RecordQueue
+
+
+def test_record_queue():
+    queue = RecordQueue(64)
+    assert not queue.pending
+    assert queue.push(1, 1, b"\x04abcd")
+    assert queue.push(2, 2, bytearray(b"\x07efgh"))
+    assert queue.peek(10) == [(1, 1, b"\x04abcd"), (2, 2, b"\x07efgh")]
+
+    queue.commit(1)
+    assert queue.peek(10) == [(2, 2, b"\x07efgh")]
+
+    # Ring wraps around, oldest records are dropped when full
+    for ix in range(3, 10):
+        queue.push(ix, 3, b"sensor block %d" % ix)
+    assert queue.dropped > 0
+    assert [x[0] for x in queue.peek(10)] == list(range(10 - len(queue), 10))
+    assert not queue.push(10, 3, b"x" * 100)
+
+
+def test_record_queue_spill(tmp_path):
+    path = str(tmp_path / "queue.bin")
+    queue = RecordQueue(40, spill_path=path)
+    for ix in range(10):
+        queue.push(ix, 0, b"%d" % ix)
+    assert queue.dropped == 0
+    assert [x[0] for x in queue.peek(20)] == list(range(10))
+
+    queue.commit(3)
+    assert [x[0] for x in queue.peek(4)] == [3, 4, 5, 6]
+    queue.commit(7)
+    assert not queue.pending
+    assert queue.spill_size == 0
+
+
+def test_record_queue_spill_reopen(tmp_path):
+    path = str(tmp_path / "queue.bin")
+    queue = RecordQueue(40, spill_path=path)
+    for ix in range(10):
+        queue.push(ix, 0, b"%d" % ix)
+    spilled = [x[0] for x in queue.peek(20)][: -len(queue)]
+    queue.commit(2)
+
+    # Reboot, RAM ring is lost, spilled records resume after the committed ones
+    queue = RecordQueue(40, spill_path=path)
+    assert [x[0] for x in queue.peek(20)] == spilled[2:]
+    queue.commit(len(spilled) - 2)
+    assert not queue.pending
+
+    queue = RecordQueue(40, spill_path=path)
+    assert not queue.pending
@@ -0,0 +1,27 @@
+from ph4_sense.scheduler import Scheduler
+
+
+def test_event_task():
+    runs = []
+    scheduler = Scheduler()
+    periodic = scheduler.add("periodic", 1000, lambda: runs.append("periodic"))
+    event = scheduler.add("event", 1000, lambda: runs.append("event"))
+    scheduler.set_event(event, 5000)
+
+    now = periodic.next_due
+    assert scheduler.run_due(now) == 2
+    assert event.next_due == now + 5000
+
+    # Event task runs only when signaled, or after the fallback timeout
+    assert scheduler.run_due(now + 1000) == 1
+    assert scheduler.time_to_next_ms(now + 1500) == 500
+    scheduler.signal(event)
+    assert scheduler.has_signaled()
+    assert scheduler.time_to_next_ms(now + 1500) == 0
+    assert scheduler.run_due(now + 1500) == 1
+    assert not scheduler.has_signaled()
+    assert runs == ["periodic", "event", "periodic", "event"]
+
+    runs.clear()
+    scheduler.run_due(now + 6500)
+    assert runs == ["periodic", "event"]
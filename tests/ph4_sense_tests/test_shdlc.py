@@ -0,0 +1,36 @@
+from ph4_sense.support.shdlc import ShdlcParser, shdlc_checksum, shdlc_frame
+from ph4_sense_py.sim.devices import shdlc_stuff
+
+
+def response(command: int, data: bytes, state: int = 0) -> bytes:
+    frame = bytearray([0, command, state, len(data)]) + data
+    frame.append(shdlc_checksum(frame))
+    return b"\x7e" + shdlc_stuff(frame) + b"\x7e"
+
+
+def test_shdlc_frame():
+    assert shdlc_frame(0, 0x03) == bytes([0x7E, 0x00, 0x03, 0x00, 0xFC, 0x7E])
+    assert shdlc_frame(0, 0x00, b"\x01\x03") == bytes([0x7E, 0x00, 0x00, 0x02, 0x01, 0x03, 0xF9, 0x7E])
+    assert shdlc_frame(0, 0x80, b"\x00\x7e") == bytes([0x7E, 0x00, 0x80, 0x02, 0x00, 0x7D, 0x5E, 0xFF, 0x7E])
+
+
+def test_shdlc_parser():
+    data = bytes([0x7E, 0x7D, 0x11, 0x13, 0x01])
+    stream = b"\x55\x00" + response(0x03, data) + response(0x03, b"\x01")[:-3] + b"\x7e" + response(0xD1, b"\x02\x03")
+
+    parser = ShdlcParser(max_data=8)
+    frames = []
+    for byte in stream:  # byte by byte, as received
+        parser.feed(bytes([byte]))
+        if parser.ready:
+            frames.append((parser.command, parser.state, bytes(parser.data())))
+    assert frames == [(0x03, 0, data), (0xD1, 0, b"\x02\x03")]
+    assert parser.errors == 1
+
+    # Parser stops after a complete frame, the rest is fed afterwards
+    parser = ShdlcParser()
+    stream = response(0x01, b"") + response(0x03, data)
+    consumed = parser.feed(stream)
+    assert parser.ready and parser.command == 0x01 and parser.length == 0
+    assert parser.feed(stream, consumed) == len(stream) - consumed
+    assert parser.ready and bytes(parser.data()) == data
@@ -0,0 +1,321 @@
+import io
+
+import pytest
+
+from ph4_sense.sensors.zh03b_uart_base import Zh03bUartBase
+from ph4_sense_py.sim.bench import run_bench
+from ph4_sense_py.sim.bus import SimI2C, SimUart
+from ph4_sense_py.sim.clock import VirtualClock
+from ph4_sense_py.sim.devices import (
+    SimAhtx0,
+    SimCcs811,
+    SimHdc1080,
+    SimScd4x,
+    SimSgp30,
+    SimSgp41,
+    SimSps30,
+    SimSps30Shdlc,
+    SimZh03b,
+)
+
+
+def test_sim_i2c_drivers():
+    from ph4_sense.sensors.athx0 import ahtx0_factory
+    from ph4_sense.sensors.ccs811 import css811_factory
+    from ph4_sense.sensors.hdc1080_mp import HDC1080
+    from ph4_sense.sensors.scd4x import scd4x_factory
+    from ph4_sense.sensors.sgp30 import sgp30_factory
+    from ph4_sense.sensors.sgp41 import sgp41_factory
+    from ph4_sense.sensors.sps30 import sps30_factory
+
+    with VirtualClock() as clock:
+        i2c = SimI2C(clock=clock, latency_us=20)
+        for cls in (SimSgp30, SimSgp41, SimAhtx0, SimHdc1080, SimCcs811, SimScd4x, SimSps30):
+            i2c.add(cls())
+
+        sgp30 = sgp30_factory(i2c, measure_test=True)
+        assert sgp30.co2eq_tvoc() == [400, 0]  # fixed values after iaq_init
+        clock.sleep_ms(15_000)
+        assert sgp30.co2eq_tvoc() == [450, 20]
+        assert sgp30.raw_h2_ethanol() == [13_000, 18_000]
+        sgp30.set_iaq_baseline(0x1234, 0x5678)
+        assert sgp30.baseline_co2eq_tvoc() == [0x1234, 0x5678]
+
+        sgp41 = sgp41_factory(i2c, iaq_init=True)
+        assert sgp41.measure_raw(45.0, 22.0) == [30_000, 15_000]
+
+        aht = ahtx0_factory(i2c)
+        temp, hum = aht.read_temperature_humidity()
+        assert temp == pytest.approx(22.0, abs=0.01) and hum == pytest.approx(45.0, abs=0.01)
+
+        hdc = HDC1080(i2c)
+        temp, hum = hdc.measurements
+        assert temp == pytest.approx(22.0, abs=0.01) and hum == pytest.approx(45.0, abs=0.01)
+
+        ccs = css811_factory(i2c)
+        assert ccs.get_fw_mode() and ccs.read_data() == (None, None)
+        clock.sleep_ms(1_000)
+        assert ccs.read_data() == (600, 30)
+        ccs.baseline = 0x1234
+        assert ccs.baseline == 0x1234
+        ccs.set_environmental_data(45.0, 22.5)
+        assert ccs.sensor_helper.get_pool().stats() == {"fallbacks": 0, 16: (0, 1), 64: (0, 0), 256: (0, 0)}
+
+        scd = scd4x_factory(i2c)
+        scd.start_periodic_measurement()
+        assert not scd.data_ready
+        clock.sleep_ms(5_000)
+        assert scd.data_ready and scd.CO2 == 600 and not scd.data_ready
+        assert scd.temperature == pytest.approx(22.5, abs=0.01)
+        with pytest.raises(RuntimeError):
+            scd.self_calibration_enabled  # not allowed during periodic measurement
+
+        sps = sps30_factory(i2c)
+        assert sps.firmware_version == (2, 3)
+        assert sps.data_available
+        assert sps.read()["pm25"] == pytest.approx(5.1)
+        assert sps.data_available is False
+
+
+def test_sim_error_injection():
+    from ph4_sense.sensors.sgp30_mp import SGP30
+
+    with VirtualClock() as clock:
+        i2c = SimI2C([SimSgp30(crc_error_rate=1.0)], clock=clock)
+        with pytest.raises(RuntimeError):
+            SGP30(i2c)
+
+        i2c = SimI2C([SimSgp30()], clock=clock, error_rate=1.0)
+        with pytest.raises(OSError):
+            SGP30(i2c)
+        assert i2c.errors == 1
+
+
+def test_sps30_fused_read():
+    from ph4_sense.sensors.sps30_mp import SPS30_I2C
+
+    with VirtualClock() as clock:
+        i2c = SimI2C([SimSps30()], clock=clock)
+        sps = SPS30_I2C(i2c)
+        values = sps.read_values()  # first read checks the data-ready flag
+        assert values[1] == pytest.approx(5.1) and values[9] == pytest.approx(0.55)
+        assert sps.read_values() is None  # within the sample period
+
+        clock.sleep_ms(1_000)
+        transactions = i2c.transactions
+        assert sps.read_values() is values  # data-ready flag skipped, single read into the same array
+        assert i2c.transactions - transactions == 2  # command write, data read
+        assert sps.reading(values)["pm25"] == pytest.approx(5.1)
+
+
+def test_sgp30_learning_time(tmp_path):
+    from ph4_sense.sense import Sensei
+    from ph4_sense.support.state_store import StateStore
+
+    with VirtualClock() as clock:
+        sensei = Sensei()
+        sensei.i2c = SimI2C([SimSgp30()], clock=clock)
+        sensei.has_sgp30 = True
+        sensei.state_store = StateStore(str(tmp_path / "state.json"))
+        sensei.connect_sgp30()
+
+        clock.sleep_ms(60_000)
+        clock.epoch += 13 * 3600  # NTP sync after a late WiFi connect
+        assert not sensei.save_sgp30_baseline()
+
+        state = sensei.get_runtime_state()["sgp30"]  # deep sleep and wake-up, iaq_init() again
+        sensei.connect_sgp30()
+        sensei.set_runtime_state({"sgp30": state})
+        clock.sleep_ms(12 * 3600 * 1000 - 60_000)
+        assert sensei.save_sgp30_baseline()
+
+
+def test_duty_cycle_gas_index():
+    import json
+
+    from ph4_sense_py.sim.bench import SimSensei
+
+    class DeepSleep(Exception):
+        pass
+
+    class DutySensei(SimSensei):
+        rtc = None
+
+        def load_sleep_state(self):
+            return DutySensei.rtc
+
+        def store_sleep_state(self, data: bytes):
+            DutySensei.rtc = data
+
+        def deep_sleep(self, ms: int):
+            clock.sleep_ms(ms)
+            raise DeepSleep()
+
+    config = {"sensors": ["aht21", "sgp41"], "publishMode": "combined"}
+    config["dutyCycle"] = {"period": 600, "warmup": 30, "samples": 3}
+    with VirtualClock() as clock:
+        i2c = SimI2C([SimAhtx0(), SimSgp41(noise=0.02, seed=1)], clock=clock)
+        indices = []
+        for _ in range(4):
+            sensei = DutySensei(i2c, config=config)
+            sensei.init_config()
+            with pytest.raises(DeepSleep):
+                sensei.main_duty_cycle()
+            combined = json.loads(sensei.mqtt_client.published[-1][1])
+            indices.append(combined["sgp41"]["TVOC"])
+
+    assert indices[0] == 0  # initial blackout, the wake-up is shorter
+    assert all(x > 0 for x in indices[1:])
+
+
+def test_sim_uart_devices():
+    with VirtualClock() as clock:
+        uart = SimUart(SimZh03b(), clock, timeout_ms=1_500)
+        zh03b = Zh03bUartBase(uart)
+        clock.sleep_ms(2_000)
+        assert zh03b.read_sample() == (4, 7, 9)  # streaming after power-up
+
+        assert zh03b.dormant_mode(to_dormant=False)
+        zh03b.set_qa()
+        assert zh03b.qa_read_sample() == (4, 7, 9)
+
+        pytest.importorskip("serial")
+        from ph4_sense_py.sensors.sps30_uart_ada import SPS30AdaUart
+
+        sps = SPS30AdaUart(SimUart(SimSps30Shdlc(), clock, 115200))
+        assert sps.read_firmware_version() == "2.3"
+        assert sps.read_serial_number() == "0123456789ABCDEF"
+        sps.start()
+        assert sps.read_values() is None  # no measurement yet
+        clock.sleep_ms(1_000)
+        assert sps.read()["pm100"] == pytest.approx(6.4)
+
+
+def test_zh03b_stream_scanner():
+    with VirtualClock() as clock:
+        device = SimZh03b()
+        uart = SimUart(device, clock)
+        zh03b = Zh03bUartBase(uart, history=2)
+        zh03b.set_stream()
+        assert zh03b.stream_poll() == 0 and zh03b.latest is None
+
+        frame = device.stream_frame()
+        corrupted = bytearray(frame)
+        corrupted[12] ^= 0x01
+        # Garbage, a frame split across polls, a corrupted frame and a truncated one followed by a valid frame
+        uart.rx.extend(b"\x4d\x42\x00" + frame[:10])
+        assert zh03b.stream_poll() == 0
+        uart.rx.extend(frame[10:] + corrupted + frame[:7] + frame)
+        assert zh03b.stream_poll() == 2
+        assert zh03b.latest == (4, 7, 9)
+        assert zh03b.errors == 2  # corrupted and truncated frames
+
+        device.pm25 = 8
+        clock.sleep_ms(1_000)
+        assert zh03b.stream_poll() == 1
+        assert zh03b.get_history() == [(4, 7, 9), (4, 8, 9)]
+
+
+def test_sim_bench():
+    res = run_bench(cycles=150, error_rate=0.01, noise=0.05, seed=1)
+    assert res["cycles"] == 150
+    assert res["published"] > 0
+    assert res["i2c_errors"] > 0
+    assert res["cpu_us"]["p95"] > 0 and res["loop_ms"]["max"] > 0
+
+
+def test_sim_capture_replay(tmp_path):
+    from ph4_sense_py.sim.capture import CaptureReader
+    from ph4_sense_py.sim.replay import run_replay
+
+    path = str(tmp_path / "capture.bin.gz")
+    recorded = run_bench(cycles=120, noise=0.05, error_rate=0.01, seed=3, sps30_uart=True, capture=path)
+    replayed = run_replay(path)
+    assert replayed["mismatches"] == 0
+    assert replayed["cycles"] == recorded["cycles"]
+    assert replayed["published"] == recorded["published"] > 0
+    assert replayed["i2c_errors"] == recorded["i2c_errors"] > 0
+
+    # Capture of an interrupted run is read up to the last complete record
+    raw = tmp_path / "capture.bin"
+    run_bench(cycles=10, capture=str(raw))
+    data = raw.read_bytes()
+    raw.write_bytes(data[:-3])
+    reader = CaptureReader.open(str(raw))
+    assert 0 < len(list(reader)) < len(list(CaptureReader(io.BytesIO(data))))
+    reader.close()
+
+
+def test_offline_queue_backfill():
+    import json
+
+    from ph4_sense_py.sim.bench import Bench, SimMqttClient, SimSensei
+
+    class FlakyMqttClient(SimMqttClient):
+        down = False
+
+        def publish(self, topic: str, message):
+            if FlakyMqttClient.down:
+                raise OSError("MQTT down")
+            super().publish(topic, message)
+
+    class OutageSensei(SimSensei):
+        def create_mqtt_client(self):
+            if FlakyMqttClient.down:
+                raise OSError("Broker unreachable")
+            return FlakyMqttClient()
+
+    config = {"sensorId": "sim", "sensors": ["aht21", "sgp41"], "offlineQueue": {"size": 4096, "period": 500}}
+    with VirtualClock() as clock:
+        i2c = SimI2C([SimAhtx0(), SimSgp41(noise=0.02, seed=1)], clock=clock)
+        sensei = OutageSensei(i2c, config=config)
+        sensei.init_config()
+        sensei.init_network()
+        sensei.init_sensors()
+        sensei.readings_publish_timeout = 5
+        bench = Bench(sensei, clock, track_alloc=False)
+
+        FlakyMqttClient.down = True
+        bench.run(200)
+        assert sensei.offline_queue.pending
+        live_before = len(sensei.mqtt_client.published)
+
+        FlakyMqttClient.down = False
+        sensei.maybe_reconnect_mqtt(force=True)
+        bench.run(300)
+
+    assert not sensei.offline_queue.pending
+    published = [(topic, json.loads(msg)) for topic, msg in sensei.mqtt_client.published[live_before:]]
+    backfilled = [(topic, msg) for topic, msg in published if "ts" in msg]
+    assert {topic for topic, _ in backfilled} == {"sensors/sgp41_sim"}
+    assert all("TVOC" in msg and "NOX" in msg for _, msg in backfilled)
+    timestamps = [msg["ts"] for _, msg in backfilled]
+    assert timestamps == sorted(timestamps) and len(timestamps) > 1
+
+    # Live readings are published during the backfill, the latest reading is the last one on the topic
+    live = [msg for topic, msg in published if topic == "sensors/sgp41_sim" and "ts" not in msg]
+    assert live and published[-1][1] == live[-1]
+
+
+def test_irq_sensors():
+    from ph4_sense_py.sim.bench import SimSensei
+
+    class IrqSensei(SimSensei):
+        attached = []
+
+        def attach_irq(self, pin: int, task) -> bool:
+            self.attached.append((pin, task.name))
+            return True
+
+    config = {"sensors": ["aht21", "ccs811", "sgp41"], "irqPins": {"ccs811": 4, "sgp41": 5, "aht21": 6}}
+    with VirtualClock() as clock:
+        i2c = SimI2C([SimAhtx0(), SimCcs811(), SimSgp41()], clock=clock)
+        sensei = IrqSensei(i2c, config=config)
+        sensei.init_config()
+        sensei.init_sensors()
+
+    # Sensors without a data-ready output keep polling
+    assert sensei.attached == [(4, "ccs811")]
+    assert sensei.irq_active
+    assert sensei.scheduler.get("ccs811").event
+    assert not sensei.scheduler.get("sgp41").event
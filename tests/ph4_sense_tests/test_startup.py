@@ -0,0 +1,55 @@
+import os
+import sys
+
+from ph4_sense.adapters import ticks_ms
+from ph4_sense.sense import Sensei
+from ph4_sense.support.startup import StartupProfile
+from ph4_sense_py.freeze import (
+    REPO_ROOT,
+    build_manifest,
+    collect_modules,
+    config_modules,
+)
+
+
+def test_startup_profile():
+    sys.modules.pop("ph4_sense.support.crc", None)
+    profile = StartupProfile(ticks_ms())
+    profile.import_modules(["ph4_sense.support.crc", "ph4_sense.nonexistent"])
+    profile.mark("sensors")
+
+    report = profile.report()
+    assert list(report["imports"]) == ["ph4_sense.support.crc"]
+    assert report["imports"]["ph4_sense.support.crc"][0] > 0
+    assert report["marks"]["sensors"][0] >= 0
+    assert len(profile.lines()) == 2
+
+
+def test_startup_modules():
+    sensei = Sensei()
+    sensei.load_config_data = lambda: {"sensors": ["aht21", "sgp41"], "perf": {"period": 60}}
+    sensei.load_config()
+    modules = sensei.get_startup_modules()
+    assert "ph4_sense.sensirion" in modules
+    assert "ph4_sense.support.perf" in modules
+    assert "ph4_sense.filters" not in modules
+    assert "ph4_sense.sensors.ccs811" not in modules
+    assert "ph4_sense.support.startup" not in modules
+
+    sensei.load_config_data = lambda: {"sensors": ["aht21"], "startupProfile": True}
+    sensei.load_config()
+    assert "ph4_sense.support.startup" in sensei.get_startup_modules()
+
+
+def test_freeze_manifest():
+    config = {"sensors": ["aht21", "scd41", "sgp41"], "publishMode": "combined"}
+    modules = collect_modules("ph4_sense.sense_mp", config_modules(config))
+    assert "ph4_sense.sensors.sgp41_mp" in modules  # module-level import of the sensor factory
+    assert "ph4_sense.support.uart_mp" in modules  # lazy import of the entry module
+    assert "ph4_sense.sensors" in modules
+    assert "ph4_sense.sensors.ccs811" not in modules
+    assert "ph4_sense.udplogger" not in modules
+
+    manifest = build_manifest(modules, os.path.join(REPO_ROOT, "isense_esp32_plant"))
+    assert '"sensors/sgp41_mp.py",' in manifest
+    assert 'base_path="..",' in manifest
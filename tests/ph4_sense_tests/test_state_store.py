@@ -0,0 +1,56 @@
+import json
+
+from ph4_sense.sense import Sensei
+from ph4_sense.sensirion import NoxGasIndexAlgorithm, VocGasIndexAlgorithm
+from ph4_sense.support.state_store import StateStore
+
+
+def test_state_store(tmp_path):
+    path = str(tmp_path / "state.json")
+    store = StateStore(path)
+    assert store.get("sgp41_voc") is None
+    assert store.put("sgp41_voc", {"mean": 1.0, "std": 2.0})
+
+    store = StateStore(path)
+    assert store.get("sgp41_voc") == {"mean": 1.0, "std": 2.0}
+    assert store.get("sgp41_voc", max_age=3600) == {"mean": 1.0, "std": 2.0}
+    assert 0 <= store.age("sgp41_voc") < 60
+
+    store.data["sgp41_voc"]["ts"] -= 7200
+    assert store.get("sgp41_voc", max_age=3600) is None
+
+
+def test_gas_index_state():
+    alg = VocGasIndexAlgorithm()
+    for ix in range(200):
+        alg.process(30000 + (ix % 7) * 50)
+    assert not alg.is_state_valid()
+
+    restored = VocGasIndexAlgorithm()
+    restored.set_state(alg.get_state())
+    assert restored.is_state_valid()
+    assert restored.get_state() == alg.get_state()
+
+
+def test_gas_index_runtime_state():
+    alg = VocGasIndexAlgorithm()
+    for ix in range(100):
+        alg.process(30000 + (ix % 7) * 50)
+
+    restored = VocGasIndexAlgorithm()
+    restored.set_runtime_state(json.loads(json.dumps(alg.get_runtime_state())))
+    assert [alg.process(31000 + ix) for ix in range(50)] == [restored.process(31000 + ix) for ix in range(50)]
+
+
+def test_sgp41_state_voc_only(tmp_path):
+    sensei = Sensei()
+    sensei.state_store = StateStore(str(tmp_path / "state.json"))
+    sensei.sgp41 = object()
+    sensei.sgp41_filter_voc = VocGasIndexAlgorithm()
+    sensei.sgp41_filter_nox = NoxGasIndexAlgorithm()
+    for alg in (sensei.sgp41_filter_voc, sensei.sgp41_filter_nox):
+        alg.set_state({"mean": 30000.0, "std": 60.0})
+
+    assert sensei.save_sgp41_state()
+    assert sensei.state_store.get("sgp41_voc") is not None
+    assert sensei.state_store.get("sgp41_nox") is None  # NOx relearns after restart
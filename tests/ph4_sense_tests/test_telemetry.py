@@ -0,0 +1,23 @@
+import json
+
+from ph4_sense.telemetry import TelemetryEncoder, decode_telemetry
+
+
+def test_telemetry_roundtrip():
+    readings = {
+        "sgp30": {"eCO2": 612.5, "TVOC": 12.25, "Eth": 18000, "H2": 13000, "temp": 21.5, "humidity": 45.25},
+        "sgp41": {"NOX": 1, "TVOC": 100, "sraw_voc": 30000, "sraw_nox": 16000, "temp": 21.5, "humidity": None},
+        "scd40": {"eCO2": 812, "temp": 22.1, "humidity": 40.3},
+        "unknown": {"x": 1},
+    }
+
+    message = bytes(TelemetryEncoder().encode(readings, 1700000000))
+    ts, decoded = decode_telemetry(message)
+    assert ts == 1700000000
+    assert list(decoded) == ["sgp30", "sgp41", "scd40"]
+    assert decoded["sgp30"] == readings["sgp30"]
+    assert decoded["sgp41"] == readings["sgp41"]
+    assert decoded["scd40"] == readings["scd40"]
+
+    json_size = sum(len(json.dumps(readings[name])) for name in decoded)
+    assert len(message) * 3 < json_size
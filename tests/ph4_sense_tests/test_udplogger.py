@@ -0,0 +1,67 @@
+import socket
+
+from ph4_sense.udplogger import UdpLogger
+
+
+def receive_all(sock):
+    res = []
+    while True:
+        try:
+            res.append(sock.recv(2048))
+        except OSError:
+            return res
+
+
+def test_udplogger_buffered():
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(0.2)
+    port = receiver.getsockname()[1]
+
+    logger = UdpLogger.from_config(
+        {"host": f"127.0.0.1:{port}", "level": "info", "buffer": 64, "mtu": 24, "datagrams": 2}, is_esp32=False
+    )
+    assert logger.buffered
+    logger.log(10, "debug", object())  # filtered out before formatting
+    for ix in range(5):
+        logger.log_msg("line", ix)  # 7 B each
+    assert logger.used == 35 and not logger.dropped
+
+    # Datagrams are cut at line ends, at most 2 per flush
+    assert logger.flush() == 2
+    assert receive_all(receiver) == [b"line 0\nline 1\nline 2\n", b"line 3\nline 4\n"]
+    assert logger.used == 0
+
+    # Ring wraps around, lines not fitting are dropped and reported with the next flush
+    for ix in range(12):
+        logger.log_msg("wrap", ix)
+    assert logger.dropped == 3
+    while logger.flush():
+        pass
+    data = b"".join(receive_all(receiver))
+    assert data.startswith(b"wrap 0\n") and b"wrap 8\n" in data and b"wrap 9\n" not in data
+    assert data.endswith(b"udplogger: dropped 3 lines\n")
+    receiver.close()
+
+
+def test_sensei_log_levels():
+    from ph4_sense.sense import Sensei
+
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(0.2)
+    port = receiver.getsockname()[1]
+
+    sensei = Sensei()
+    sensei.print_cli = lambda msg, *args: None
+    sensei.udp_logger = UdpLogger.from_config({"host": f"127.0.0.1:{port}", "level": "warning"}, is_esp32=False)
+    sensei.print("Reading:", 1)
+    sensei.print_error("Publish err:", 2)
+    assert receive_all(receiver) == [b"Publish err: 2\n"]
+
+    # Async runtime queues lines with their level
+    sensei.log_queue = []
+    sensei.print("Reading:", 3)
+    sensei.print_error("Task err:", 4)
+    assert sensei.log_queue == [(Sensei.LEVEL_ERROR, "Task err:", (4,))]
+    receiver.close()